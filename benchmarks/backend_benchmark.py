@@ -0,0 +1,220 @@
+# benchmarks/backend_benchmark.py
+"""
+Conformance check and benchmark for the storage backends.
+
+Every backend runs the same scenario through the shared method surface and the
+normalized results are compared; then startup time, per-operation latency and
+memory (client RSS, plus mongod resident memory) are reported.
+MongoDB runs against a scratch database and is skipped if no server is reachable.
+Any conformance mismatch exits with status 1.
+
+Run from the project root:
+    python -m benchmarks.backend_benchmark
+    python -m benchmarks.backend_benchmark --conformance   # check only; fails if no mongod
+"""
+import json
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRATCH_DB = 'home_assistant_benchmark'
+VOLATILE_FIELDS = {'_id', 'date', 'created_at', 'added_at', 'due_date', 'completed_at'}
+# Steps returning a backend-specific id; only success is compared
+ID_RESULTS = {'add_user'}
+
+
+def open_backend(name, path=None):
+    """Returns a fresh, empty backend instance"""
+    if name == 'sqlite':
+        from modules.data.SQLiteDatabaseManager import SQLiteDatabaseManager
+        return SQLiteDatabaseManager(path or os.path.join(tempfile.mkdtemp(), 'benchmark.db'))
+
+    from modules.data.DatabaseManager import DatabaseManager
+    from modules.data.DatabaseSetup import DatabaseSetup
+    # A scratch database name also gives it its own search index, never the production one
+    manager = DatabaseManager(db_name=SCRATCH_DB)
+    manager.client.drop_database(SCRATCH_DB)
+    shutil.rmtree(manager._search_index_path(), ignore_errors=True)
+    DatabaseSetup(manager.client, SCRATCH_DB).setup(force=True)
+    return manager
+
+
+def mongodb_available():
+    try:
+        from pymongo import MongoClient
+        MongoClient('mongodb://localhost:27017/', serverSelectionTimeoutMS=1000).admin.command('ping')
+        return True
+    except Exception:
+        return False
+
+
+def normalize(value):
+    """Drops ids and timestamps so results from different backends are comparable"""
+    if isinstance(value, dict):
+        return {k: normalize(v) for k, v in value.items() if k not in VOLATILE_FIELDS}
+    if isinstance(value, list):
+        return [normalize(v) for v in value]
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+SCENARIO = [
+    ('add_user', ('John', 'father', 35)),
+    ('update_user_health', ('John', 'sick', {'type': 'cold', 'symptoms': 'fever'})),
+    ('get_user_health', ('John',)),
+    ('get_user', ('John',), {'fields': ['name', 'health_status']}),
+    ('get_user', ('John',), {'fields': 'role'}),
+    ('get_user_health', ('John',), {'limit': None}),
+    ('update_user_health', ('Nobody', None, {'type': 'cold'})),
+    ('add_inventory_item', ('Süt', 'food', 5)),
+    ('add_inventory_item', ('Eggs', 'food', 2), {'threshold': 6}),
+    ('get_inventory_item', ('sut ',)),
+    ('update_inventory_quantity', ('süt', 1)),
+    ('update_inventory_quantity', ('sutt', 9)),
+    ('set_inventory_threshold', ('eggs', 1)),
+    # Dotted and dotless i: 'I' must match 'i' on both backends
+    ('add_inventory_item', ('MILK', 'food', 4)),
+    ('update_inventory_quantity', ('milk', 8)),
+    ('get_inventory_item', ('Milk',)),
+    ('get_low_stock_items', ()),
+    ('get_low_stock_items', (), {'threshold': 10, 'fields': ['name']}),
+    ('add_to_shopping_list', ({'name': 'Bread'},)),
+    ('update_shopping_item_status', ('bread', 'bought')),
+    ('add_to_shopping_list', ({'name': 'ice cream'},)),
+    ('update_shopping_item_status', ('ICE CREAM', 'bought')),
+    ('add_to_shopping_list', ({'name': 'Kırmızı biber'},)),
+    ('update_shopping_item_status', ('KIRMIZI BİBER', 'bought')),
+    ('get_shopping_list', ()),
+    ('add_task', ('Take out trash', 'John', '2020-01-01 10:00')),
+    ('add_task', ('Clean room',)),
+    ('get_overdue_tasks', (), {'fields': ['name', 'assigned_to']}),
+    ('complete_task', ('take out trash',)),
+    ('add_task', ('Water plants',)),
+    ('complete_task', ('WATER PLANTS',)),
+    ('get_pending_tasks', (), {'fields': ['name', 'status']}),
+    ('add_daily_log', ('Dinner', 'Had pizza')),
+    ('get_today_logs', (), {'fields': ['title', 'details']}),
+    ('delete_daily_log', ('Dinner',)),
+    ('get_today_logs', ()),
+    ('get_household_briefing', ()),
+]
+
+
+def run_scenario(manager):
+    results = []
+    for step in SCENARIO:
+        name, args, kwargs = step if len(step) == 3 else (*step, {})
+        result = getattr(manager, name)(*args, **kwargs)
+        results.append((name, bool(result) if name in ID_RESULTS else normalize(result)))
+    return results
+
+
+def check_conformance(backends):
+    """Runs the scenario on every backend; returns the number of mismatching steps"""
+    failures = 0
+    reference, expected = None, None
+    for backend in backends:
+        manager = open_backend(backend)
+        try:
+            results = run_scenario(manager)
+        finally:
+            manager.close()
+        if expected is None:
+            reference, expected = backend, results
+            continue
+        mismatches = [
+            (name, want, got) for (name, want), (_, got) in zip(expected, results) if want != got
+        ]
+        print(f"conformance {backend} vs {reference}: {'OK' if not mismatches else 'FAILED'}")
+        for name, want, got in mismatches:
+            print(f"  {name}: {reference}={json.dumps(want, default=str)} {backend}={json.dumps(got, default=str)}")
+        failures += len(mismatches)
+    return failures
+
+
+def measure(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def benchmark_worker(backend, repeat=200):
+    """Runs in a subprocess so that RSS reflects a single backend"""
+    start = time.perf_counter()
+    manager = open_backend(backend)
+    manager.get_pending_tasks()
+    startup = (time.perf_counter() - start) * 1000
+
+    for i in range(repeat):
+        manager.add_task(f"task {i}")
+        manager.add_inventory_item(f"item {i}", 'food', i % 10)
+        manager.add_daily_log(f"log {i}")
+
+    counter = iter(range(10 ** 9))
+    operations = {
+        'add_task': lambda: manager.add_task(f"bench {next(counter)}"),
+        'get_pending_tasks': manager.get_pending_tasks,
+        'update_inventory_quantity': lambda: manager.update_inventory_quantity('item 7', next(counter) % 10),
+        'get_low_stock_items': manager.get_low_stock_items,
+        'get_inventory_item': lambda: manager.get_inventory_item('ITEM 7'),
+        'add_daily_log': lambda: manager.add_daily_log(f"bench {next(counter)}"),
+        'get_today_logs': manager.get_today_logs,
+        'get_household_briefing': manager.get_household_briefing,
+    }
+    latencies = {name: measure(func, 50) for name, func in operations.items()}
+
+    server_rss_mb = None
+    if backend == 'mongodb':
+        server_rss_mb = manager.client.admin.command('serverStatus')['mem']['resident']
+        manager.client.drop_database(SCRATCH_DB)
+    manager.close()
+
+    # ru_maxrss is reported in kilobytes on Linux
+    client_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({
+        'startup_ms': startup,
+        'client_rss_mb': client_rss_mb,
+        'server_rss_mb': server_rss_mb,
+        'latency_ms': latencies
+    }))
+
+
+def run():
+    backends = ['sqlite'] + (['mongodb'] if mongodb_available() else [])
+    if len(backends) > 1:
+        if check_conformance(backends):
+            sys.exit(1)
+    else:
+        print("MongoDB not reachable, benchmarking sqlite only")
+
+    for backend in backends:
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.backend_benchmark', '--worker', backend],
+            capture_output=True, text=True, check=True
+        ).stdout
+        report = json.loads(output.strip().splitlines()[-1])
+        server = f"{report['server_rss_mb']} MB" if report['server_rss_mb'] is not None else "n/a"
+        print(f"\n{backend}: startup={report['startup_ms']:.1f} ms  "
+              f"client RSS={report['client_rss_mb']:.1f} MB  server RSS={server}")
+        for name, latency in report['latency_ms'].items():
+            print(f"  {name:28s} {latency:8.3f} ms")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == '--worker':
+        benchmark_worker(sys.argv[2])
+    elif sys.argv[1:] == ['--conformance']:
+        if not mongodb_available():
+            sys.exit("MongoDB not reachable, cannot check conformance")
+        sys.exit(1 if check_conformance(['sqlite', 'mongodb']) else 0)
+    else:
+        run()
@@ -0,0 +1,82 @@
+# benchmarks/briefing_benchmark.py
+"""
+Latency of get_household_briefing() versus the five separate reads it replaces.
+Needs a running MongoDB; data is seeded into a scratch database that is dropped afterwards.
+
+Run from the project root:
+    python -m benchmarks.briefing_benchmark
+"""
+import statistics
+import time
+from datetime import datetime, timedelta
+from modules.data.DatabaseManager import DatabaseManager, low_stock_entry, low_stock_key
+
+SCRATCH_DB = 'home_assistant_benchmark'
+
+
+def seed(db, tasks=500, shopping=200, inventory=500, logs=2000):
+    now = datetime.now()
+    db.tasks.insert_one({'tasks': [
+        {'name': f"task {i}", 'status': 'pending' if i % 3 else 'completed',
+         'due_date': now + timedelta(hours=i - tasks // 2), 'info': {}}
+        for i in range(tasks)
+    ]})
+    db.shopping_list.insert_one({'items': [
+        {'name': f"product {i}", 'status': 'pending' if i % 2 else 'bought',
+         'added_at': now, 'info': {}}
+        for i in range(shopping)
+    ]})
+    items = [
+        {'name': f"item {i}", 'category': 'food', 'quantity': i % 20, 'info': {}}
+        for i in range(inventory)
+    ]
+    low_stock = {
+        low_stock_key(item['name']): entry
+        for item in items
+        if (entry := low_stock_entry(item, {})) is not None
+    }
+    db.inventory.insert_one({'items': items, 'low_stock': low_stock})
+    db.daily_log.insert_one({'logs': [
+        {'title': f"log {i}", 'date': now - timedelta(minutes=10 * i), 'details': {}}
+        for i in range(logs)
+    ]})
+
+
+def measure(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+def run(repeat=50):
+    manager = DatabaseManager()
+    manager.client.drop_database(SCRATCH_DB)
+    manager.db = manager.client[SCRATCH_DB]
+    try:
+        seed(manager.db)
+
+        def separate():
+            manager.get_pending_tasks()
+            manager.get_overdue_tasks()
+            manager.get_pending_shopping_items()
+            manager.get_low_stock_items()
+            manager.get_today_logs()
+
+        cases = {
+            'five separate calls': separate,
+            'briefing ($facet)': manager.get_household_briefing,
+            'briefing (fan-out)': lambda: manager._briefing_fan_out(10),
+        }
+        for label, func in cases.items():
+            median, worst = measure(func, repeat)
+            print(f"{label:22s} median={median:7.2f} ms  max={worst:7.2f} ms")
+    finally:
+        manager.client.drop_database(SCRATCH_DB)
+        manager.close()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,67 @@
+# benchmarks/history_persistence_benchmark.py
+"""
+Per-turn cost of persisting the conversation history: the previous full-file
+JSON rewrite (system prompt included) vs. the append-only journal.
+
+Run from the project root:
+    python -m benchmarks.history_persistence_benchmark
+"""
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from modules.conversation_journal import ConversationJournal
+
+SYSTEM_PROMPT = "You are an AI assistant for a smart home system.\n" + "- light.kitchen: on\n" * 400
+TURNS = 500
+MAX_HISTORY = 15
+
+
+def simulate_turns():
+    """Yields the history after each turn, trimmed the way MainClass does"""
+    history = [{'role': 'system', 'content': SYSTEM_PROMPT}]
+    for turn in range(TURNS):
+        history.append({'role': 'user', 'content': f"Turn on the kitchen light, turn {turn}"})
+        history.append({'role': 'assistant', 'content': json.dumps({'message': 'Done.', 'need_response': False})})
+        if len(history) > MAX_HISTORY:
+            history = [history[0]] + history[-(MAX_HISTORY - 1):]
+        yield history
+
+
+def full_rewrite(path):
+    def save(history):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(history, f, ensure_ascii=False, indent=2)
+    return save
+
+
+def measure(save, written_path):
+    timings = []
+    for history in simulate_turns():
+        start = time.perf_counter()
+        save(history)
+        timings.append((time.perf_counter() - start) * 1e6)
+    return timings, written_path()
+
+
+def report(label, timings, bytes_written):
+    print(f"{label:14s} median={statistics.median(timings):8.1f} us  "
+          f"p95={sorted(timings)[int(len(timings) * 0.95)]:8.1f} us  "
+          f"on disk={bytes_written / 1024:7.1f} KiB")
+
+
+if __name__ == "__main__":
+    directory = tempfile.mkdtemp()
+    rewrite_path = os.path.join(directory, 'rewrite.json')
+    journal = ConversationJournal(os.path.join(directory, 'journal.json'),
+                                  max_messages=MAX_HISTORY - 1, fsync=False)
+    journal.load()
+
+    def journal_size():
+        return sum(os.path.getsize(p) for p in (journal.snapshot_path, journal.journal_path) if p.exists())
+
+    print(f"{TURNS} turns, system prompt {len(SYSTEM_PROMPT) / 1024:.1f} KiB")
+    report("full rewrite", *measure(full_rewrite(rewrite_path), lambda: os.path.getsize(rewrite_path)))
+    report("journal", *measure(journal.save, journal_size))
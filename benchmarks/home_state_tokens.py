@@ -0,0 +1,148 @@
+# benchmarks/home_state_tokens.py
+"""
+Before/after token counts of the home state in the system prompt: the verbose
+format_home_structure() vs. the compact encoding (HA_CONFIG['state_encoding']).
+
+Snapshots can be get_ha_states() output saved as JSON, recordings written by
+the recorder (every captured HA state fetch is measured), or the live Home
+Assistant. Without arguments a representative 67-entity home is used.
+Tokens are exact when tiktoken and its encoding are available, else estimated.
+
+Run from the project root:
+    python -m benchmarks.home_state_tokens
+    python -m benchmarks.home_state_tokens logs/recordings.jsonl snapshot.json
+    python -m benchmarks.home_state_tokens --live --show
+"""
+import argparse
+import json
+import random
+
+from modules.state_encoding import compare_encodings, encode_compact
+
+SERVICES = {
+    'homeassistant': ['save_persistent_states', 'turn_off', 'turn_on', 'toggle', 'stop', 'restart',
+                      'check_config', 'update_entity', 'reload_core_config', 'set_location',
+                      'reload_custom_templates', 'reload_config_entry', 'reload_all'],
+    'logger': ['set_default_level', 'set_level'],
+    'system_log': ['clear', 'write'],
+    'recorder': ['purge', 'purge_entities', 'enable', 'disable'],
+    'frontend': ['set_theme', 'reload_themes'],
+    'backup': ['create'],
+    'cloud': ['remote_connect', 'remote_disconnect'],
+    'scene': ['reload', 'apply', 'create', 'turn_on'],
+    'group': ['reload', 'set', 'remove'],
+    'notify': ['mobile_app_phone', 'notify', 'persistent_notification'],
+    'camera': ['enable_motion_detection', 'disable_motion_detection', 'turn_off', 'turn_on',
+               'snapshot', 'play_stream', 'record'],
+    'conversation': ['process', 'reload'],
+    'shopping_list': ['add_item', 'remove_item', 'complete_item', 'incomplete_item',
+                      'complete_all', 'incomplete_all', 'clear_completed_items', 'sort'],
+    'counter': ['increment', 'decrement', 'reset', 'set_value'],
+    'timer': ['start', 'pause', 'cancel', 'finish', 'change', 'reload'],
+    'lock': ['unlock', 'lock', 'open'],
+    'vacuum': ['start', 'pause', 'stop', 'return_to_base', 'clean_spot', 'locate', 'send_command'],
+    'button': ['press'],
+    'number': ['set_value'],
+    'select': ['select_first', 'select_last', 'select_next', 'select_option', 'select_previous'],
+    'update': ['install', 'skip', 'clear_skipped'],
+    'light': ['turn_on', 'turn_off', 'toggle'],
+    'switch': ['turn_off', 'turn_on', 'toggle'],
+    'climate': ['turn_on', 'turn_off', 'set_hvac_mode', 'set_preset_mode', 'set_aux_heat',
+                'set_temperature', 'set_humidity', 'set_fan_mode', 'set_swing_mode'],
+    'cover': ['open_cover', 'close_cover', 'set_cover_position', 'stop_cover', 'toggle',
+              'open_cover_tilt', 'close_cover_tilt', 'stop_cover_tilt', 'set_cover_tilt_position',
+              'toggle_cover_tilt'],
+    'media_player': ['turn_on', 'turn_off', 'toggle', 'volume_up', 'volume_down', 'media_play_pause',
+                     'media_play', 'media_pause', 'media_stop', 'media_next_track',
+                     'media_previous_track', 'clear_playlist', 'volume_set', 'volume_mute',
+                     'media_seek', 'join', 'select_source', 'select_sound_mode', 'play_media',
+                     'shuffle_set', 'unjoin', 'repeat_set'],
+    'fan': ['turn_on', 'turn_off', 'toggle', 'increase_speed', 'decrease_speed', 'oscillate',
+            'set_direction', 'set_percentage', 'set_preset_mode']
+}
+ROOMS = ['living_room', 'kitchen', 'bedroom', 'kids_room', 'bathroom', 'hallway', 'office', 'balcony']
+
+
+def sample_snapshot():
+    """A representative home in the shape get_ha_states() returns"""
+    rng = random.Random(5)
+    entities = []
+
+    def add(domain, object_id, state, **attributes):
+        attributes.setdefault('friendly_name', object_id.replace('_', ' ').title())
+        entities.append({'entity_id': f"{domain}.{object_id}", 'state': state,
+                         'domain': domain, 'attributes': attributes})
+
+    for room in ROOMS:
+        on = rng.random() < 0.3
+        add('light', f"{room}_ceiling", 'on' if on else 'off', brightness=rng.randint(60, 255) if on else None)
+        add('light', f"{room}_lamp", 'off', brightness=None)
+        add('sensor', f"{room}_temperature", f"{rng.uniform(19, 24):.1f}", unit_of_measurement='°C')
+        add('sensor', f"{room}_humidity", str(rng.randint(35, 60)), unit_of_measurement='%')
+        add('binary_sensor', f"{room}_motion", 'on' if rng.random() < 0.2 else 'off')
+        add('binary_sensor', f"{room}_window", 'off')
+    for room in ROOMS[:3]:
+        add('climate', f"{room}_thermostat", 'heat', current_temperature=round(rng.uniform(19, 23), 1),
+            temperature=21.5, hvac_action='heating', hvac_modes=['off', 'heat', 'auto'], min_temp=7, max_temp=35)
+        add('cover', f"{room}_blinds", 'open', current_position=rng.choice([0, 50, 100]))
+        add('media_player', f"{room}_tv", 'off')
+    for name in ('coffee_machine', 'kettle', 'washing_machine_plug', 'dishwasher_plug', 'desk_fan'):
+        add('switch', name, rng.choice(['on', 'off']))
+    add('sensor', 'washing_machine_power', '0.0', unit_of_measurement='W')
+    add('sensor', 'house_energy_today', '7.42', unit_of_measurement='kWh')
+    add('lock', 'front_door', 'locked', friendly_name='Ön Kapı')
+    add('vacuum', 'robot', 'docked', friendly_name='Robot Süpürge')
+    add('fan', 'bedroom_fan', 'off')
+    return {'services': SERVICES, 'entities': entities}
+
+
+def load_snapshots(path):
+    """get_ha_states() JSON, or every HA state fetch in a recording"""
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    try:
+        return [json.loads(text)]
+    except json.JSONDecodeError:
+        pass
+    snapshots = []
+    for line in text.splitlines():
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        events = record.get('events', []) if record.get('type') == 'turn' else [record]
+        snapshots.extend(event['data'] for event in events if event.get('kind') == 'ha_states' and event.get('data'))
+    return snapshots
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('snapshots', nargs='*', help='get_ha_states() JSON files or recordings')
+    parser.add_argument('--live', action='store_true', help='also measure the configured Home Assistant')
+    parser.add_argument('--show', action='store_true', help='print the compact encoding of each snapshot')
+    args = parser.parse_args()
+
+    snapshots = []
+    for path in args.snapshots:
+        snapshots.extend((f"{path}#{i}", data) for i, data in enumerate(load_snapshots(path)))
+    if args.live:
+        from modules.home_assistant import get_ha_states
+        snapshots.append(('live', get_ha_states()))
+    if not snapshots:
+        snapshots.append(('sample', sample_snapshot()))
+
+    for label, data in snapshots:
+        if not data:
+            print(f"{label}: no data")
+            continue
+        report = compare_encodings(data)
+        print(f"{label}: {report['entities']} entities  "
+              f"verbose={report['verbose_tokens']} tokens ({report['verbose_chars']} chars)  "
+              f"compact={report['compact_tokens']} tokens ({report['compact_chars']} chars)  "
+              f"-{report['reduction_pct']}%  [{report['counter']}]")
+        if args.show:
+            print(encode_compact(data))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,165 @@
+# benchmarks/household_benchmark.py
+"""
+Aggregate throughput of one server process serving many households.
+
+Every home gets its own fake Home Assistant (one URL each, fixed latency) and
+scratch SQLite database. The fake LLM turns on the light named in the home
+state of its system prompt, so each turn fetches that home's state, builds
+its prompt and posts a service call to its HA. The run fails if a call
+reaches another home's HA. Requests go through httpx's in-process ASGI
+transport.
+
+Run from the project root:
+    python -m benchmarks.household_benchmark
+"""
+import asyncio
+import json
+import os
+import re
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+import httpx
+
+LLM_LATENCY = 0.30
+HA_LATENCY = 0.02
+HOMES = (1, 10, 50)
+USERS_PER_HOME = 4
+TURNS_PER_USER = 3
+
+ha_requests = Counter()
+ha_lock = threading.Lock()
+
+
+class FakeResponse:
+    def __init__(self, body, status_code=200):
+        self.status_code = status_code
+        self.content = json.dumps(body).encode()
+        self.text = self.content.decode()
+        self._body = body
+
+    def json(self):
+        return self._body
+
+    def raise_for_status(self):
+        pass
+
+
+def home_of(url):
+    match = re.match(r'http://(\w+)\.bench', url)
+    return match.group(1) if match else 'default'
+
+
+def fake_get(url, headers=None, timeout=None):
+    time.sleep(HA_LATENCY)
+    home = home_of(url)
+    with ha_lock:
+        ha_requests[(home, 'get')] += 1
+    if url.endswith('/states'):
+        return FakeResponse([
+            {'entity_id': f'light.{home}_kitchen', 'state': 'off', 'attributes': {'friendly_name': f'{home} kitchen'}},
+            {'entity_id': f'sensor.{home}_temperature', 'state': '21.5', 'attributes': {}}
+        ])
+    return FakeResponse([{'domain': 'light', 'services': {'turn_on': {'fields': {}}, 'turn_off': {'fields': {}}}}])
+
+
+def fake_post(url, headers=None, json=None, timeout=None):
+    time.sleep(HA_LATENCY)
+    home = home_of(url)
+    # The entity must belong to the home whose HA received the call
+    assert json['entity_id'] == f'light.{home}_kitchen', f"{json['entity_id']} posted to {home}"
+    with ha_lock:
+        ha_requests[(home, 'post')] += 1
+    return FakeResponse([])
+
+
+def fake_send_to_gpt(conversation_history, name, location, message, date):
+    time.sleep(LLM_LATENCY)
+    entity_id = 'light.' + re.search(r'\w+_kitchen', conversation_history[0]['content']).group(0)
+    response = json.dumps({
+        'message': f'Okay {name}, kitchen light on.',
+        'api_calls': [{'action': 'light.turn_on', 'entity_id': entity_id, 'parameters': {}}],
+        'db_calls': None,
+        'need_response': False
+    })
+    conversation_history.append({'role': 'user', 'content': message})
+    conversation_history.append({'role': 'assistant', 'content': response})
+    return response
+
+
+def patch_environment():
+    from config.config import APP_CONFIG, HA_DEBOUNCE_CONFIG, HOUSEHOLD_CONFIG, SERVER_CONFIG, STORAGE_CONFIG
+    import modules.home_assistant as home_assistant
+    import modules.household as household
+    import modules.openai_integration as openai_integration
+
+    scratch = tempfile.mkdtemp()
+    STORAGE_CONFIG['backend'] = 'sqlite'
+    STORAGE_CONFIG['sqlite_path'] = os.path.join(scratch, 'default.db')
+    household.DATA_DIR = Path(scratch)
+    APP_CONFIG['io_workers'] = SERVER_CONFIG['max_concurrent_turns'] * 2
+    # Each turn sends one call per entity; merging is not what is measured here
+    HA_DEBOUNCE_CONFIG['enabled'] = False
+    HOUSEHOLD_CONFIG['homes'] = {
+        f'home{i}': {'ha_url': f'http://home{i}.bench/api', 'ha_token': 'token',
+                     'sqlite_path': os.path.join(scratch, f'home{i}.db')}
+        for i in range(max(HOMES))
+    }
+    home_assistant.ha_session.get = fake_get
+    home_assistant.ha_session.post = fake_post
+    openai_integration.send_to_gpt = fake_send_to_gpt
+
+    import server
+    return server
+
+
+async def simulate_user(client, home, user, latencies):
+    response = await client.post('/sessions', json={'user': user, 'location': 'Kitchen', 'household': home})
+    session_id = response.json()['session_id']
+    for turn in range(TURNS_PER_USER):
+        start = time.perf_counter()
+        response = await client.post('/chat', json={'session_id': session_id, 'household': home,
+                                                    'message': f'turn {turn}'})
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+    await client.delete(f'/sessions/{session_id}?household={home}')
+
+
+async def run_load(server, homes):
+    app = server.AssistantServer()
+    await app.startup()
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            simulate_user(client, f'home{h}', f'user{h}_{u}', latencies)
+            for h in range(homes) for u in range(USERS_PER_HOME)
+        ))
+        elapsed = time.perf_counter() - start
+        health = (await client.get('/health')).json()['households']
+    await app.shutdown()
+    return latencies, elapsed, health
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+if __name__ == "__main__":
+    server = patch_environment()
+    print(f"LLM latency {LLM_LATENCY * 1000:.0f} ms, HA latency {HA_LATENCY * 1000:.0f} ms, "
+          f"{USERS_PER_HOME} users x {TURNS_PER_USER} turns per home, "
+          f"{server.SERVER_CONFIG['max_concurrent_turns']} concurrent turn slots")
+    for homes in HOMES:
+        ha_requests.clear()
+        latencies, elapsed, health = asyncio.run(run_load(server, homes))
+        posts = [ha_requests[(f'home{h}', 'post')] for h in range(homes)]
+        assert posts == [USERS_PER_HOME * TURNS_PER_USER] * homes, posts
+        print(f"{homes:4d} homes  {health['active']:3d} loaded  {len(latencies) / elapsed:7.1f} turns/s  "
+              f"p50={statistics.median(latencies):7.1f} ms  p95={percentile(latencies, 95):7.1f} ms")
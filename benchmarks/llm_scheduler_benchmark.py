@@ -0,0 +1,130 @@
+# benchmarks/llm_scheduler_benchmark.py
+"""
+Interactive LLM latency while a background job floods the same API key.
+
+A fake completions API allows RATE_LIMIT requests per second (further calls
+get a 429 with Retry-After: 1) and answers after LLM_LATENCY. A background
+job runs BACKGROUND_WORKERS threads back to back; meanwhile each of
+INTERACTIVE_SESSIONS sessions sends a turn every THINK_TIME seconds. Calls go
+through openai_integration._create_completion() in three setups:
+
+    direct    scheduler disabled, every call hits the API
+    fifo      scheduler, but background calls share the interactive class
+    priority  scheduler with background calls in the 'background' class
+
+Run from the project root:
+    python -m benchmarks.llm_scheduler_benchmark
+"""
+import statistics
+import threading
+import time
+from types import SimpleNamespace
+
+import httpx
+from openai import RateLimitError
+
+LLM_LATENCY = 0.20
+RATE_LIMIT = 20           # requests per second the fake API accepts
+BACKGROUND_WORKERS = 12
+INTERACTIVE_SESSIONS = 8
+TURNS_PER_SESSION = 6
+THINK_TIME = 0.5
+PROMPT = [{'role': 'system', 'content': 'x' * 4000}, {'role': 'user', 'content': 'Turn on the kitchen light'}]
+
+
+class FakeCompletions:
+    """Fixed-rate API: RATE_LIMIT calls per second, 429 beyond that"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.allowance = RATE_LIMIT
+        self.updated = time.monotonic()
+        self.rate_limited = 0
+
+    def create(self, messages, model, max_tokens, temperature):
+        with self.lock:
+            now = time.monotonic()
+            self.allowance = min(RATE_LIMIT, self.allowance + (now - self.updated) * RATE_LIMIT)
+            self.updated = now
+            if self.allowance < 1:
+                self.rate_limited += 1
+                response = httpx.Response(429, headers={'retry-after': '1'},
+                                          request=httpx.Request('POST', 'https://api.invalid/v1/chat/completions'))
+                raise RateLimitError('Rate limit reached', response=response, body=None)
+            self.allowance -= 1
+        time.sleep(LLM_LATENCY)
+        usage = SimpleNamespace(prompt_tokens=1000, completion_tokens=50, total_tokens=1050)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content='{}'))], usage=usage)
+
+
+def run(setup):
+    import modules.openai_integration as openai_integration
+    from config.config import LLM_SCHEDULER_CONFIG
+    from modules.llm_scheduler import LLMScheduler, llm_context
+
+    config = dict(LLM_SCHEDULER_CONFIG, enabled=setup != 'direct', requests_per_minute=RATE_LIMIT * 60,
+                  tokens_per_minute=10 ** 9, burst_seconds=1)
+    openai_integration.llm_scheduler = LLMScheduler(config)
+    completions = FakeCompletions()
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    stop = threading.Event()
+    latencies, failures, background_done = [], [], []
+
+    def call():
+        started = time.perf_counter()
+        try:
+            openai_integration._create_completion(client, PROMPT)
+        except RateLimitError:
+            return None
+        return (time.perf_counter() - started) * 1000
+
+    def background(worker):
+        priority = 'background' if setup == 'priority' else 'interactive'
+        with llm_context(priority=priority, session=f'batch{worker}'):
+            while not stop.is_set():
+                if call() is None:
+                    # Out of retries: back off like a client honouring Retry-After
+                    time.sleep(1)
+                else:
+                    background_done.append(1)
+
+    def interactive(session):
+        with llm_context(priority='interactive', session=f'session{session}'):
+            for _ in range(TURNS_PER_SESSION):
+                latency = call()
+                if latency is None:
+                    failures.append(1)
+                else:
+                    latencies.append(latency)
+                time.sleep(THINK_TIME)
+
+    workers = [threading.Thread(target=background, args=(i,)) for i in range(BACKGROUND_WORKERS)]
+    sessions = [threading.Thread(target=interactive, args=(i,)) for i in range(INTERACTIVE_SESSIONS)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    time.sleep(0.5)
+    for thread in sessions:
+        thread.start()
+    for thread in sessions:
+        thread.join()
+    stop.set()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return latencies, len(failures), completions.rate_limited, len(background_done) / elapsed
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else float('nan')
+
+
+if __name__ == "__main__":
+    print(f"API: {RATE_LIMIT} req/s, {LLM_LATENCY * 1000:.0f} ms per call; {BACKGROUND_WORKERS} background workers, "
+          f"{INTERACTIVE_SESSIONS} interactive sessions x {TURNS_PER_SESSION} turns")
+    for setup in ('direct', 'fifo', 'priority'):
+        latencies, failures, rate_limited, background_rate = run(setup)
+        print(f"{setup:9s} interactive p50={statistics.median(latencies) if latencies else float('nan'):7.1f} ms  "
+              f"p95={percentile(latencies, 95):7.1f} ms  interactive failed={failures:2d}  429s={rate_limited:4d}  "
+              f"background {background_rate:5.1f} calls/s")
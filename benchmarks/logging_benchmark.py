@@ -0,0 +1,98 @@
+# benchmarks/logging_benchmark.py
+"""
+Logging cost paid by the turn itself: the previous synchronous rotating-file
+setup (full payloads at INFO) vs. the queue-based pipeline in modules/logger.py.
+
+A turn logs roughly what main.py, openai_integration.py and home_assistant.py
+log for one request with a 4 KB LLM response, a handful of DB calls and a
+50-entity state dump. Only time spent in the calling thread is measured.
+
+Run from the project root:
+    python -m benchmarks.logging_benchmark
+"""
+import json
+import logging
+import os
+import statistics
+import tempfile
+import time
+from logging.handlers import RotatingFileHandler
+
+TURNS = 2000
+
+RESPONSE = json.dumps({
+    'message': 'Welcome back! ' * 40,
+    'api_calls': [{'action': 'light.turn_on', 'entity_id': f'light.room_{i}', 'parameters': {}} for i in range(5)],
+    'db_calls': [{'function': 'add_daily_log', 'parameters': {'title': 'Arrival', 'details': 'x' * 200}}] * 5,
+    'need_response': True
+}) + ' ' * 2000
+PARSED = json.loads(RESPONSE)
+STATES = [{'entity_id': f'sensor.s{i}', 'state': '21.5', 'attributes': {'friendly_name': f'Sensor {i}'}} for i in range(50)]
+DB_RESULTS = [{'function': 'get_today_logs', 'result': [{'title': 'Arrival', 'details': 'x' * 200}] * 10}]
+
+
+def legacy_logger(name, log_file):
+    """The former setup_logger(): synchronous RotatingFileHandler, text format"""
+    handler = RotatingFileHandler(log_file, maxBytes=100*1024*1024, backupCount=5)
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s', '%Y-%m-%d %H:%M:%S'))
+    logger = logging.getLogger(f'legacy.{name}')
+    logger.setLevel(logging.INFO)
+    logger.handlers = [handler]
+    logger.propagate = False
+    return logger
+
+
+def legacy_turn(app, openai, ha):
+    ha.info("Fetching Home Assistant data")
+    ha.debug(f"Retrieved HA States: {STATES}")
+    openai.info("User Request - Name: Ali, Location: Living Room")
+    openai.info(f"GPT Response received - Length: {len(RESPONSE)} characters")
+    openai.info(f"GPT Response: {RESPONSE}")
+    app.info(f"Successfully parsed response: {PARSED}")
+    app.info(f"Processing API calls: {PARSED['api_calls']}")
+    app.info(f"Processing database calls: {PARSED['db_calls']}")
+    for call in PARSED['db_calls']:
+        app.info(f"Successfully executed DB call: {call['function']}")
+    app.info(f"Database operation results: {DB_RESULTS}")
+
+
+def pipeline_turn(app, openai, ha):
+    ha.info("Fetching Home Assistant data")
+    ha.debug("Retrieved %d HA states: %s", len(STATES), STATES)
+    openai.info("User Request - Name: Ali, Location: Living Room")
+    openai.info(f"GPT Response received - Length: {len(RESPONSE)} characters")
+    openai.debug("GPT Response: %s", RESPONSE)
+    app.info("Successfully parsed response")
+    app.debug("Parsed response: %s", PARSED)
+    app.info(f"Processing {len(PARSED['api_calls'])} API calls")
+    app.debug("API calls: %s", PARSED['api_calls'])
+    app.info(f"Processing {len(PARSED['db_calls'])} database calls")
+    app.debug("Database calls: %s", PARSED['db_calls'])
+    for call in PARSED['db_calls']:
+        app.info(f"Successfully executed DB call: {call['function']}")
+    app.debug("Database operation results: %s", DB_RESULTS)
+
+
+def measure(turn, loggers):
+    timings = []
+    for _ in range(TURNS):
+        start = time.perf_counter()
+        turn(*loggers)
+        timings.append((time.perf_counter() - start) * 1e6)
+    return timings
+
+
+def report(label, timings):
+    print(f"{label:10s} median={statistics.median(timings):7.1f} us/turn  "
+          f"p99={sorted(timings)[int(len(timings) * 0.99)]:7.1f} us/turn")
+
+
+if __name__ == "__main__":
+    directory = tempfile.mkdtemp()
+    legacy = [legacy_logger(name, os.path.join(directory, f'{name}.log')) for name in ('app', 'openai', 'ha')]
+    report("legacy", measure(legacy_turn, legacy))
+
+    from modules.logger import setup_logger
+    pipeline = [setup_logger(f'bench.{name}', os.path.join(directory, f'bench_{name}.log'))
+                for name in ('app', 'openai', 'ha')]
+    report("pipeline", measure(pipeline_turn, pipeline))
@@ -0,0 +1,218 @@
+# benchmarks/replay_load.py
+"""
+Re-drives recorded turns (RECORD_CONFIG, modules/recorder.py) against the
+current code. LLM responses, HA state fetches and HA service calls are served
+back from the recording with their recorded latency; DB calls really run, by
+default against a scratch SQLite database.
+
+Each of --concurrency virtual households replays the whole recording on its
+own schedule (arrival times divided by --speedup, with a deterministic
+per-household offset). Turn latency is measured from the scheduled arrival,
+so queueing under load shows up in the tail; it also includes rendering the
+system prompt, which the recorded turn durations do not.
+
+Run from the project root:
+    python -m benchmarks.replay_load logs/recordings.jsonl --speedup 10 --concurrency 20
+    python -m benchmarks.replay_load recording.jsonl --json > before.json
+"""
+import argparse
+import asyncio
+import contextvars
+import datetime
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+_replay_turn = contextvars.ContextVar('replay_turn', default=None)
+
+
+class ReplayTurn:
+    """Recorded responses of one turn, handed out in call order"""
+
+    def __init__(self, record, speedup):
+        self.speedup = speedup
+        events = record.get('events', [])
+        self.llm = [e for e in events if e['kind'] == 'llm']
+        self.api_calls = [e for e in events if e['kind'] == 'api_call']
+        self.states = [e for e in events if e['kind'] == 'ha_states']
+        self.diverged = False
+
+    def sleep(self, event):
+        if event:
+            time.sleep(event['duration_ms'] / 1000 / self.speedup)
+
+
+class Replayer:
+    def __init__(self, turns, state_events, speedup, concurrency):
+        self.turns = turns
+        self.state_events = sorted(state_events, key=lambda e: e['at_s'])
+        self.speedup = speedup
+        self.concurrency = concurrency
+        self.latencies = []
+        self.service_times = []
+        self.divergences = 0
+        self.errors = 0
+
+    # Fakes installed over the real integrations
+    def send_to_gpt(self, conversation_history, name, location, message, date):
+        turn = _replay_turn.get()
+        conversation_history.append({"role": "user", "content": message})
+        if turn.llm:
+            event = turn.llm.pop(0)
+            turn.sleep(event)
+            response = event['response']
+        else:
+            # The code under test asked for more rounds than were recorded
+            turn.diverged = True
+            response = json.dumps({'message': '', 'api_calls': None, 'db_calls': None, 'need_response': False})
+        conversation_history.append({"role": "assistant", "content": response})
+        return response
+
+    def process_api_call(self, api_call):
+        turn = _replay_turn.get()
+        entity_id = api_call.get('entity_id')
+        for index, event in enumerate(turn.api_calls):
+            if event['call'].get('entity_id') == entity_id:
+                turn.sleep(turn.api_calls.pop(index))
+                return
+        turn.diverged = True
+
+    def get_ha_states(self):
+        turn = _replay_turn.get()
+        if turn is not None and turn.states:
+            event = turn.states.pop(0)
+        else:
+            event = self._latest_state
+        if event:
+            time.sleep(event['duration_ms'] / 1000 / self.speedup)
+            return event['data']
+        return None
+
+    def install(self):
+        import modules.conversation_history as conversation_history
+        import modules.home_assistant as home_assistant
+        import modules.openai_integration as openai_integration
+
+        openai_integration.send_to_gpt = self.send_to_gpt
+        home_assistant.process_api_call = self.process_api_call
+        conversation_history.get_ha_states = self.get_ha_states
+        self.get_system_prompt = conversation_history.get_system_prompt
+        self._latest_state = self.state_events[-1] if self.state_events else None
+
+    async def run_household(self, household, main, db, async_db, start):
+        rng = random.Random(household)
+        gaps = [b['at_s'] - a['at_s'] for a, b in zip(self.turns, self.turns[1:])]
+        offset = rng.uniform(0, statistics.mean(gaps) if gaps else 1.0) / self.speedup
+        first_arrival = self.turns[0]['at_s']
+        assistants = {}
+
+        for record in self.turns:
+            arrival = start + offset + (record['at_s'] - first_arrival) / self.speedup
+            await asyncio.sleep(max(0.0, arrival - time.perf_counter()))
+
+            key = (record['user'], record['location'])
+            if key not in assistants:
+                assistants[key] = main.MainClass(
+                    db=db, async_db=async_db,
+                    conversation_history=[{"role": "system", "content": ""}],
+                    name=record['user'], location=record['location']
+                )
+                assistants[key].speak = lambda message: None
+            assistant = assistants[key]
+
+            turn = ReplayTurn(record, self.speedup)
+            _replay_turn.set(turn)
+            service_start = time.perf_counter()
+            try:
+                prompt = await asyncio.to_thread(self.get_system_prompt)
+                assistant.conversation_history = main.refresh_system_prompt(assistant.conversation_history, prompt)
+                date = datetime.datetime.now().strftime("%Y-%m-%d %H:%M %A")
+                await assistant.run_turn_async(record['message'], date)
+                assistant.trim_history()
+            except Exception:
+                self.errors += 1
+            done = time.perf_counter()
+            self.latencies.append((done - arrival) * 1000)
+            self.service_times.append((done - service_start) * 1000)
+            self.divergences += turn.diverged
+
+    async def run(self, main):
+        from modules.data.AsyncDatabaseManager import AsyncDatabaseManager
+        from modules.data.DatabaseFactory import create_database_manager
+
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=self.concurrency * 2 + 4, thread_name_prefix='replay')
+        )
+        db = create_database_manager()
+        async_db = AsyncDatabaseManager(db, max_workers=self.concurrency + 4)
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            self.run_household(household, main, db, async_db, start)
+            for household in range(self.concurrency)
+        ))
+        elapsed = time.perf_counter() - start
+        await async_db.close()
+        return elapsed
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('recording', help='JSONL file written by the recorder')
+    parser.add_argument('--speedup', type=float, default=1.0, help='divide recorded latencies and gaps by this')
+    parser.add_argument('--concurrency', type=int, default=1, help='virtual households replaying in parallel')
+    parser.add_argument('--limit', type=int, default=None, help='replay only the first N turns')
+    parser.add_argument('--storage', choices=('scratch', 'configured'), default='scratch',
+                        help='scratch SQLite database or the configured STORAGE_CONFIG')
+    parser.add_argument('--json', action='store_true', help='print the summary as JSON')
+    args = parser.parse_args()
+
+    from modules.recorder import load_recording
+    turns, state_events = load_recording(args.recording)
+    turns = turns[:args.limit] if args.limit else turns
+    if not turns:
+        parser.error("recording contains no turns")
+
+    if args.storage == 'scratch':
+        from config.config import STORAGE_CONFIG
+        STORAGE_CONFIG['backend'] = 'sqlite'
+        STORAGE_CONFIG['sqlite_path'] = os.path.join(tempfile.mkdtemp(), 'replay.db')
+
+    replayer = Replayer(turns, state_events, args.speedup, args.concurrency)
+    replayer.install()
+    import main
+    elapsed = asyncio.run(replayer.run(main))
+
+    recorded = [t['duration_ms'] / args.speedup for t in turns]
+    summary = {
+        'turns': len(replayer.latencies),
+        'concurrency': args.concurrency,
+        'speedup': args.speedup,
+        'throughput_tps': round(len(replayer.latencies) / elapsed, 2),
+        'latency_ms': {p: round(percentile(replayer.latencies, p), 1) for p in (50, 95, 99)},
+        'service_ms': {p: round(percentile(replayer.service_times, p), 1) for p in (50, 95, 99)},
+        'recorded_ms': {p: round(percentile(recorded, p), 1) for p in (50, 95, 99)},
+        'divergent_turns': replayer.divergences,
+        'errors': replayer.errors
+    }
+    if args.json:
+        print(json.dumps(summary))
+        return
+    print(f"{summary['turns']} turns, {args.concurrency} households, speedup x{args.speedup:g}: "
+          f"{summary['throughput_tps']} turns/s")
+    for label in ('latency_ms', 'service_ms', 'recorded_ms'):
+        values = summary[label]
+        print(f"  {label:12s} p50={values[50]:8.1f}  p95={values[95]:8.1f}  p99={values[99]:8.1f}")
+    print(f"  divergent turns: {summary['divergent_turns']}, errors: {summary['errors']}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,63 @@
+# benchmarks/rollup_benchmark.py
+"""
+"What did we do last month?": 30 get_date_logs calls versus one
+get_log_rollup read, by latency and by the JSON payload handed to the LLM.
+Uses a scratch SQLite database with 20 logs a day for a year.
+
+Run from the project root:
+    python -m benchmarks.rollup_benchmark
+"""
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from modules.data.SQLiteDatabaseManager import SQLiteDatabaseManager
+
+DAYS = 365
+LOGS_PER_DAY = 20
+RUNS = 20
+TITLES = ['Family dinner', 'Movie night', 'Anna arrived home', 'Anna left home', 'Front door opened',
+          'Washer finished', 'Kids went to school', 'Grocery shopping', 'Garden watered', 'Football practice']
+
+
+def measure(function):
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        result = function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), len(json.dumps(result, ensure_ascii=False, default=str))
+
+
+if __name__ == "__main__":
+    db = SQLiteDatabaseManager(os.path.join(tempfile.mkdtemp(), 'rollups.db'))
+    rng = random.Random(3)
+    start = datetime.now() - timedelta(days=DAYS)
+    db.add_daily_logs([
+        {'title': rng.choice(TITLES), 'details': 'x' * rng.randint(10, 80),
+         'date': start + timedelta(days=day, minutes=rng.randint(0, 1439))}
+        for day in range(DAYS) for _ in range(LOGS_PER_DAY)
+    ])
+
+    month = (datetime.now().replace(day=1) - timedelta(days=1)).replace(day=1)
+    days = [(month + timedelta(days=d)).strftime('%Y-%m-%d') for d in range(30)]
+    per_day = lambda: [db.get_date_logs(day) for day in days]
+    rollup = lambda: db.get_log_rollup('month', month.strftime('%Y-%m-%d'))
+    compact = lambda: db.get_log_rollup('month', month.strftime('%Y-%m-%d'), compact=True)
+
+    for label, function in (('get_date_logs x 30', per_day), ('get_log_rollup', rollup),
+                            ('get_log_rollup compact', compact)):
+        latency, payload = measure(function)
+        print(f"{label:24s} median={latency:8.3f} ms  payload={payload:7d} bytes")
+
+    timings = []
+    for i in range(200):
+        begin = time.perf_counter()
+        db.add_daily_log(f"Benchmark entry {i % 10}", 'details')
+        timings.append((time.perf_counter() - begin) * 1000)
+    print(f"add_daily_log (with rollups)  median={statistics.median(timings):.3f} ms")
+    db.close()
@@ -0,0 +1,81 @@
+# benchmarks/search_benchmark.py
+"""
+Finding past events in 100k daily logs and health records: the previous
+approach (get_date_logs day after day, 90 days back) vs. search_records on the
+local hashed TF-IDF index. Uses a scratch SQLite database.
+
+Run from the project root:
+    python -m benchmarks.search_benchmark
+"""
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from modules.data.SQLiteDatabaseManager import SQLiteDatabaseManager
+
+ENTRIES = 100_000
+HEALTH_EVERY = 20
+QUERIES = ['fever', 'when did the kids last have a fever', 'front door opened', 'washing machine finished',
+           'pizza dinner', 'headache medicine', 'movie night with popcorn', 'dentist appointment']
+RUNS = 50
+
+TITLES = ['Family dinner', 'Movie night', 'Front door opened', 'Washing machine finished', 'Kids went to school',
+          'Grocery shopping', 'Garden watered', 'Guests arrived', 'Dentist appointment', 'Football practice']
+DETAILS = ['had pizza together', 'watched a movie with popcorn', 'opened 3 times', 'laundry is ready',
+           'left at 8', 'bought milk and eggs', 'tomatoes look good', 'grandparents visited', 'checkup', 'won 2-1']
+SYMPTOMS = ['fever', 'cough', 'headache', 'sore throat', 'stomach ache', 'rash']
+
+
+def populate(db):
+    rng = random.Random(7)
+    start = datetime.now() - timedelta(days=365)
+    logs = []
+    for i in range(ENTRIES):
+        date = start + timedelta(minutes=i * 5)
+        if i % HEALTH_EVERY == 0:
+            db.conn.execute(
+                "INSERT INTO health_records (user, date, record) VALUES (?, ?, ?)",
+                (rng.choice(['Ali', 'Ayse', 'Mert']), str(date),
+                 f'{{"type": "checkup", "symptoms": "{rng.choice(SYMPTOMS)}", "date": "{date}"}}')
+            )
+        else:
+            logs.append({'title': rng.choice(TITLES), 'date': date, 'details': rng.choice(DETAILS)})
+    db.add_daily_logs(logs)
+
+
+def timed(function, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), sorted(timings)[int(len(timings) * 0.95)]
+
+
+if __name__ == "__main__":
+    path = os.path.join(tempfile.mkdtemp(), 'search.db')
+    db = SQLiteDatabaseManager(path)
+    populate(db)
+
+    today = datetime.now()
+    scan = lambda: [db.get_date_logs((today - timedelta(days=d)).strftime('%Y-%m-%d')) for d in range(90)]
+    median, p95 = timed(scan, 5)
+    print(f"get_date_logs x 90 days    median={median:8.2f} ms  p95={p95:8.2f} ms")
+
+    start = time.perf_counter()
+    db.search_records('fever')
+    print(f"first search (index build) {(time.perf_counter() - start) * 1000:8.0f} ms for {ENTRIES} entries")
+    db.close()
+
+    start = time.perf_counter()
+    db = SQLiteDatabaseManager(path)
+    db.search_records('fever')
+    print(f"reopen + first search      {(time.perf_counter() - start) * 1000:8.0f} ms")
+
+    for query in QUERIES:
+        median, p95 = timed(lambda: db.search_records(query, limit=10), RUNS)
+        print(f"search_records {query!r:40s} median={median:6.2f} ms  p95={p95:6.2f} ms")
+    db.close()
@@ -0,0 +1,74 @@
+# benchmarks/serialize_benchmark.py
+"""
+Micro-benchmark for MongoDB document serialization.
+
+Run from the project root:
+    python -m benchmarks.serialize_benchmark
+"""
+import timeit
+from datetime import datetime, timedelta
+from bson import ObjectId
+from modules.data.DatabaseManager import serialize_document
+
+
+def legacy_serialize(doc):
+    """Previous recursive comprehension-based implementation, kept for comparison"""
+    if isinstance(doc, dict):
+        return {
+            k: str(v) if isinstance(v, (ObjectId, datetime)) else
+            legacy_serialize(v) if isinstance(v, (dict, list)) else v
+            for k, v in doc.items()
+        }
+    elif isinstance(doc, list):
+        return [legacy_serialize(item) for item in doc]
+    return doc
+
+
+def make_users(user_count=5, records_per_user=2000):
+    """Builds users with large health_records histories"""
+    start = datetime(2024, 1, 1)
+    return [
+        {
+            '_id': ObjectId(),
+            'name': f"user_{u}",
+            'role': 'member',
+            'age': 30 + u,
+            'health_status': 'healthy',
+            'health_records': [
+                {
+                    'type': 'checkup',
+                    'symptoms': ['cough', 'fever'] if i % 7 == 0 else [],
+                    'notes': {'text': f"record {i}", 'tags': ['routine', 'clinic']},
+                    'date': start + timedelta(hours=i)
+                }
+                for i in range(records_per_user)
+            ]
+        }
+        for u in range(user_count)
+    ]
+
+
+def make_scalar_items(item_count=5000):
+    """Builds documents without ObjectId/datetime values (nothing to convert)"""
+    return [
+        {'name': f"item_{i}", 'category': 'food', 'quantity': i % 10,
+         'info': {'brand': 'X', 'tags': ['a', 'b', 'c']}}
+        for i in range(item_count)
+    ]
+
+
+def run(number=20):
+    cases = {
+        'users with health_records': make_users(),
+        'scalar-only items': make_scalar_items(),
+    }
+    for label, docs in cases.items():
+        assert serialize_document(docs) == legacy_serialize(docs)
+        legacy = timeit.timeit(lambda: legacy_serialize(docs), number=number) / number
+        fast = timeit.timeit(lambda: serialize_document(docs), number=number) / number
+        print(f"{label:28s} legacy={legacy * 1000:8.2f} ms  "
+              f"fast={fast * 1000:8.2f} ms  speedup={legacy / fast:5.2f}x")
+
+
+if __name__ == "__main__":
+    run()
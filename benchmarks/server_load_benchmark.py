@@ -0,0 +1,94 @@
+# benchmarks/server_load_benchmark.py
+"""
+Throughput and turn latency of server.py with many concurrent sessions.
+
+Each simulated user owns one session and sends a few messages in a row.
+Home Assistant and the LLM are fixed-latency fakes and storage is a scratch
+SQLite database, so the numbers reflect the server's concurrency, not the
+network. Requests go through httpx's in-process ASGI transport.
+
+Run from the project root:
+    python -m benchmarks.server_load_benchmark
+"""
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+
+LLM_LATENCY = 0.30
+DB_CALL = {'function': 'get_inventory', 'parameters': {}}
+CONCURRENCY = (10, 50, 100)
+TURNS_PER_USER = 3
+
+
+def fake_send_to_gpt(conversation_history, name, location, message, date):
+    time.sleep(LLM_LATENCY)
+    response = json.dumps({
+        'message': f'Okay {name}, done in the {location}.',
+        'api_calls': None,
+        'db_calls': [DB_CALL],
+        'need_response': False
+    })
+    conversation_history.append({'role': 'user', 'content': message})
+    conversation_history.append({'role': 'assistant', 'content': response})
+    return response
+
+
+def patch_environment():
+    from config.config import APP_CONFIG, SERVER_CONFIG, STORAGE_CONFIG
+    import modules.conversation_history as conversation_history
+    import modules.openai_integration as openai_integration
+
+    STORAGE_CONFIG['backend'] = 'sqlite'
+    STORAGE_CONFIG['sqlite_path'] = os.path.join(tempfile.mkdtemp(), 'benchmark.db')
+    # LLM calls run in worker threads; give the pool room for every turn slot
+    APP_CONFIG['io_workers'] = SERVER_CONFIG['max_concurrent_turns'] * 2
+    conversation_history.get_system_prompt = lambda: "You are an AI assistant for a smart home system."
+    openai_integration.send_to_gpt = fake_send_to_gpt
+
+    import server
+    return server
+
+
+async def simulate_user(client, user, latencies):
+    response = await client.post('/sessions', json={'user': user, 'location': 'Kitchen'})
+    session_id = response.json()['session_id']
+    for turn in range(TURNS_PER_USER):
+        start = time.perf_counter()
+        response = await client.post('/chat', json={'session_id': session_id, 'message': f'turn {turn}'})
+        response.raise_for_status()
+        assert user in response.json()['messages'][0]
+        latencies.append((time.perf_counter() - start) * 1000)
+    await client.delete(f'/sessions/{session_id}')
+
+
+async def run_load(server, users):
+    app = server.AssistantServer()
+    await app.startup()
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(simulate_user(client, f'user{i}', latencies) for i in range(users)))
+        elapsed = time.perf_counter() - start
+    await app.shutdown()
+    return latencies, elapsed
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+if __name__ == "__main__":
+    server = patch_environment()
+    print(f"LLM latency {LLM_LATENCY * 1000:.0f} ms, "
+          f"{server.SERVER_CONFIG['max_concurrent_turns']} concurrent turn slots")
+    for users in CONCURRENCY:
+        latencies, elapsed = asyncio.run(run_load(server, users))
+        print(f"{users:4d} sessions  {len(latencies) / elapsed:7.1f} turns/s  "
+              f"p50={statistics.median(latencies):7.1f} ms  p95={percentile(latencies, 95):7.1f} ms")
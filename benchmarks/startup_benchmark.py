@@ -0,0 +1,74 @@
+# benchmarks/startup_benchmark.py
+"""
+Time from launching the interpreter to the first "Your message:" prompt.
+
+Each run starts a fresh process that boots the assistant the way main.py does
+(orchestrator loop, scratch SQLite storage, 400 ms fake Home Assistant fetch)
+and exits as soon as the prompt appears. "eager" reproduces the previous
+start-up order: OpenAI imported and built at import time and the history
+loaded behind a blocking HA fetch.
+
+Run from the project root:
+    python -m benchmarks.startup_benchmark
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+RUNS = 5
+
+CHILD = r"""
+import asyncio, os, sys, tempfile, time
+HA_LATENCY = 0.40
+mode = sys.argv[1]
+if mode == 'eager':
+    import openai
+    openai.OpenAI(api_key='benchmark')
+
+from config.config import STORAGE_CONFIG
+STORAGE_CONFIG['backend'] = 'sqlite'
+STORAGE_CONFIG['sqlite_path'] = os.path.join(tempfile.mkdtemp(), 'startup.db')
+
+import modules.conversation_history as conversation_history
+def fake_system_prompt():
+    time.sleep(HA_LATENCY)
+    return "You are an AI assistant for a smart home system."
+conversation_history.get_system_prompt = fake_system_prompt
+conversation_history.save_conversation_history = lambda *a, **k: None
+
+import main
+import modules.orchestrator as orchestrator
+orchestrator.get_system_prompt = fake_system_prompt
+main.save_conversation_history = lambda *a, **k: None
+
+history = [{'role': 'system', 'content': fake_system_prompt()}] if mode == 'eager' else None
+
+def reader(prompt):
+    print('PROMPT', flush=True)
+    os._exit(0)
+
+asyncio.run(orchestrator.TurnOrchestrator(main.MainClass(conversation_history=history), prompt_reader=reader).run())
+"""
+
+
+def time_to_prompt(mode):
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-c', CHILD, mode], stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL, text=True, cwd=os.getcwd(),
+                               env={**os.environ, 'OPENAI_API_KEY': 'benchmark'})
+    for line in process.stdout:
+        if line.startswith('PROMPT'):
+            elapsed = (time.perf_counter() - start) * 1000
+            process.wait()
+            return elapsed
+    process.wait()
+    raise RuntimeError(f"{mode} run exited without showing the prompt")
+
+
+if __name__ == "__main__":
+    for mode in ('eager', 'lazy'):
+        timings = [time_to_prompt(mode) for _ in range(RUNS)]
+        print(f"{mode:6s} time-to-first-prompt median={statistics.median(timings):7.1f} ms  "
+              f"min={min(timings):7.1f} ms  ({RUNS} runs)")
@@ -0,0 +1,125 @@
+# benchmarks/turn_latency_benchmark.py
+"""
+Time from pressing Enter to the first spoken word, sequential loop vs. orchestrator.
+
+Home Assistant and the LLM are replaced by fixed-latency fakes so the numbers
+show the effect of overlapping work, not network noise; storage is a scratch
+SQLite database and the conversation history file is left untouched.
+
+Run from the project root:
+    python -m benchmarks.turn_latency_benchmark
+"""
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+HA_LATENCY = 0.40     # get_ha_states() + prompt rendering
+LLM_LATENCY = 0.60    # chat completion
+THINK_TIME = 1.0      # user typing before pressing Enter
+TURNS = 5
+
+
+def fake_system_prompt():
+    time.sleep(HA_LATENCY)
+    return "You are an AI assistant for a smart home system."
+
+
+def fake_send_to_gpt(conversation_history, name, location, message, date):
+    time.sleep(LLM_LATENCY)
+    response = json.dumps({
+        'message': 'Done.',
+        'api_calls': None,
+        'db_calls': [{'function': 'add_daily_log', 'parameters': {'title': message}}],
+        'need_response': False
+    })
+    conversation_history.append({'role': 'user', 'content': message})
+    conversation_history.append({'role': 'assistant', 'content': response})
+    return response
+
+
+def patch_environment():
+    from config.config import STORAGE_CONFIG
+    import main
+    import modules.conversation_history as conversation_history
+    import modules.openai_integration as openai_integration
+    import modules.orchestrator as orchestrator
+
+    STORAGE_CONFIG['backend'] = 'sqlite'
+    STORAGE_CONFIG['sqlite_path'] = os.path.join(tempfile.mkdtemp(), 'benchmark.db')
+    conversation_history.get_system_prompt = fake_system_prompt
+    main.get_system_prompt = fake_system_prompt
+    orchestrator.get_system_prompt = fake_system_prompt
+    openai_integration.send_to_gpt = fake_send_to_gpt
+    main.load_conversation_history = lambda **kwargs: [{'role': 'system', 'content': ''}]
+    main.save_conversation_history = lambda history: None
+    return main, orchestrator
+
+
+class TimedAssistant:
+    """Wraps MainClass.speak to record the first spoken word of each turn"""
+
+    def __init__(self, assistant):
+        self.enter_times = []
+        self.first_word = []
+        assistant.speak = self.speak
+        self.assistant = assistant
+
+    def press_enter(self):
+        self.enter_times.append(time.perf_counter())
+
+    def speak(self, message):
+        if len(self.first_word) < len(self.enter_times):
+            self.first_word.append(time.perf_counter())
+
+    def latencies(self):
+        return [(end - start) * 1000 for start, end in zip(self.enter_times, self.first_word)]
+
+
+def run_sequential(main):
+    """Mirrors MainClass.main_loop(): the prompt is fetched while the user types"""
+    timed = TimedAssistant(main.MainClass())
+    assistant = timed.assistant
+    with ThreadPoolExecutor(max_workers=1) as prompt_pool:
+        for turn in range(TURNS):
+            prefetched = main.prefetch_system_prompt(prompt_pool)
+            time.sleep(THINK_TIME)
+            timed.press_enter()
+            assistant.conversation_history = main.refresh_system_prompt(
+                assistant.conversation_history, main.prefetched_system_prompt(prefetched)
+            )
+            asyncio.run(assistant.run_turn_async(f"message {turn}", "now"))
+            assistant.end_turn()
+    assistant.shutdown()
+    return timed.latencies()
+
+
+def run_orchestrated(main, orchestrator):
+    timed = TimedAssistant(main.MainClass())
+    messages = iter(f"message {turn}" for turn in range(TURNS))
+
+    def reader(prompt):
+        time.sleep(THINK_TIME)
+        message = next(messages, None)
+        if message is None:
+            raise EOFError
+        timed.press_enter()
+        return message
+
+    asyncio.run(orchestrator.TurnOrchestrator(timed.assistant, prompt_reader=reader).run())
+    return timed.latencies()
+
+
+def report(label, latencies):
+    print(f"{label:14s} median={statistics.median(latencies):7.1f} ms  "
+          f"max={max(latencies):7.1f} ms  ({len(latencies)} turns)")
+
+
+if __name__ == "__main__":
+    main, orchestrator = patch_environment()
+    print(f"HA latency {HA_LATENCY * 1000:.0f} ms, LLM latency {LLM_LATENCY * 1000:.0f} ms")
+    report("sequential", run_sequential(main))
+    report("orchestrator", run_orchestrated(main, orchestrator))
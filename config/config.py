@@ -23,6 +23,12 @@ HA_CONFIG = {
         'sensor.sun_next_', 'sensor.sun_', 'sensor.date_',
         'sensor.time_', 'sensor.last_boot', 'sensor.last_update'
     ],
+    # Connections kept open to Home Assistant (shared by all sessions)
+    'pool_size': 20,
+    # Seconds before a request to Home Assistant is given up
+    'request_timeout': 10,
+    # Home state in the system prompt: 'compact' (grouped, abbreviated) or 'verbose' (one line per entity)
+    'state_encoding': 'compact',
     'important_attributes': {
         'light': ['friendly_name', 'brightness', 'color_temp'],
         'climate': ['friendly_name', 'current_temperature', 'temperature', 
@@ -33,6 +39,73 @@ HA_CONFIG = {
     }
 }
 
+# Service schemas and entity registry cached from HA to validate api_calls before
+# they are sent. The cache is refreshed by every home-state fetch, after 'ttl' seconds,
+# and (at most every 'unknown_entity_refresh' seconds) when a call names an unknown entity.
+HA_SCHEMA_CONFIG = {
+    'enabled': True,
+    'ttl': 300,
+    'unknown_entity_refresh': 30,
+    # Parameters bounded by attributes of the target entity: parameter -> (min attribute, max attribute)
+    'entity_ranges': {
+        'temperature': ('min_temp', 'max_temp'),
+        'target_temp_low': ('min_temp', 'max_temp'),
+        'target_temp_high': ('min_temp', 'max_temp'),
+        'humidity': ('min_humidity', 'max_humidity'),
+        'color_temp_kelvin': ('min_color_temp_kelvin', 'max_color_temp_kelvin'),
+        'value': ('min', 'max')
+    },
+    # Parameters limited to a list attribute of the target entity
+    'entity_options': {
+        'hvac_mode': 'hvac_modes',
+        'preset_mode': 'preset_modes',
+        'fan_mode': 'fan_modes',
+        'swing_mode': 'swing_modes',
+        'effect': 'effect_list',
+        'source': 'source_list',
+        'sound_mode': 'sound_mode_list',
+        'option': 'options'
+    }
+}
+
+# Service calls that cannot reach HA (connection errors, connect timeouts, HTTP 502-504) are
+# kept in a durable queue and sent once HA is back, with bounded concurrency and exponential
+# backoff. A newer pending call of the same service for the same entity and parameters
+# replaces the older one (last write wins), except for services whose effect accumulates
+# ('no_coalesce'). Calls of different services (lock, then unlock) are all sent, in order.
+COMMAND_QUEUE_CONFIG = {
+    'enabled': True,
+    'path': str(DATA_DIR / 'command_queue.jsonl'),
+    'concurrency': 4,
+    'backoff_initial': 1,
+    'backoff_max': 60,
+    # Queued calls older than this many seconds are dropped instead of sent
+    'max_age': 900,
+    'compact_every': 200,
+    'fsync': True,
+    'no_coalesce': [
+        'toggle', 'press', 'increase_speed', 'decrease_speed', 'volume_up', 'volume_down',
+        'media_next_track', 'media_previous_track', 'increment', 'decrement', 'trigger', 'send_command'
+    ]
+}
+
+# Slider-style bursts ("brighter... more... more"): the first call to an entity and service
+# is sent at once, later calls within 'window' seconds are merged and sent as one request
+# when the window ends. Later values replace earlier ones; 'relative_parameters' maps each step
+# parameter to [absolute parameter, min, max]: steps are summed, a step after an absolute value
+# is folded into it and an absolute value drops the pending step.
+HA_DEBOUNCE_CONFIG = {
+    'enabled': True,
+    'window': 1.0,
+    'relative_parameters': {
+        'brightness_step': ['brightness', 0, 255],
+        'brightness_step_pct': ['brightness_pct', 0, 100]
+    },
+    # Entities (fnmatch patterns) and services that are always sent immediately
+    'immediate_entities': ['lock.*', 'alarm_control_panel.*', 'siren.*', 'button.*', 'scene.*', 'script.*'],
+    'immediate_services': COMMAND_QUEUE_CONFIG['no_coalesce']
+}
+
 # MongoDB Configuration
 MONGO_CONFIG = {
     'host': MONGO_HOST,
@@ -42,6 +115,63 @@ MONGO_CONFIG = {
     'password': MONGO_PASSWORD
 }
 
+# Storage backend: 'mongodb' or 'sqlite' (embedded, for MongoDB-less deployments)
+STORAGE_CONFIG = {
+    'backend': 'mongodb',
+    'sqlite_path': str(DATA_DIR / 'home_assistant.db')
+}
+
+# Name lookup configuration; names match case-, accent- and whitespace-insensitively
+# (ı/İ fold to i), fuzzy matches need at least 'fuzzy_threshold' similarity
+LOOKUP_CONFIG = {
+    'fuzzy_threshold': 0.5
+}
+
+# Inventory configuration (thresholds: quantity below which an item is low on stock)
+INVENTORY_CONFIG = {
+    'default_threshold': 5,
+    'category_thresholds': {
+        'food': 3,
+        'cleaning': 2,
+        'personal_care': 2,
+        'medicine': 1,
+        'electronics': 1,
+        'tools': 1,
+        'clothing': 1,
+        'other': 1
+    },
+    # Add items to the shopping list when they drop below their threshold
+    'auto_shopping_list': False
+}
+
+# Health records are stored in monthly buckets of at most bucket_size records;
+# user documents only keep the last recent_records entries
+HEALTH_CONFIG = {
+    'bucket_size': 100,
+    'recent_records': 3
+}
+
+# Query cache configuration (TTLs in seconds, 0 disables caching for a query)
+CACHE_CONFIG = {
+    'enabled': True,
+    'max_entries': 256,
+    'default_ttl': 30,
+    'ttls': {
+        'get_all_users': 300,
+        'get_user': 300,
+        'get_inventory_item': 120,
+        'get_low_stock_items': 120,
+        'get_shopping_list': 120,
+        'get_pending_shopping_items': 120,
+        'get_pending_tasks': 120,
+        'get_overdue_tasks': 60,
+        'get_today_logs': 30,
+        'get_household_briefing': 30,
+        'get_log_rollup': 300
+    },
+    # Requires a replica set; invalidates on writes made by other processes
+    'watch_changes': False
+}
 
 # OpenAI Configuration
 OPENAI_CONFIG = {
@@ -49,6 +179,116 @@ OPENAI_CONFIG = {
     'model': AI_MODEL_NAME
 }
 
+# Every chat completion goes through one scheduler: at most 'max_concurrent' in flight, within
+# the account's requests- and tokens-per-minute limits. Waiting calls are served by priority
+# ('interactive' turns before 'background' jobs), then round-robin across sessions. Calls are
+# 'background' unless made in a user turn (server, main loop or orchestrator).
+LLM_SCHEDULER_CONFIG = {
+    'enabled': True,
+    'max_concurrent': 16,
+    'requests_per_minute': 500,
+    'tokens_per_minute': 200000,
+    # The API enforces its limits over short windows; at most this many seconds of quota go out at once
+    'burst_seconds': 10,
+    # Tokens reserved for the reply until the API reports actual usage
+    'completion_reserve': 1000,
+    'priorities': ['interactive', 'background'],
+    # Seconds a call may wait for capacity before it fails
+    'max_wait': 120,
+    # Pause after a rate-limit response without Retry-After, and retries through the scheduler
+    'rate_limit_pause': 5,
+    'rate_limit_retries': 2
+}
+
+# HTTP/WebSocket server configuration
+SERVER_CONFIG = {
+    'max_sessions': 1000,
+    'max_concurrent_turns': 32,
+    'session_idle_timeout': 1800,
+    'prompt_refresh_interval': 30
+}
+
+# Homes served by one server process. Each home has its own HA endpoint, database
+# (MongoDB db_name, or sqlite_path) and offline command queue; the MongoClient and the HTTP
+# connection pool are shared. Requests pick a home with "household"; without it the home
+# configured above (HA_CONFIG, STORAGE_CONFIG) is used. Idle homes are evicted from memory.
+HOUSEHOLD_CONFIG = {
+    'max_active': 100,
+    'idle_timeout': 1800,
+    'homes': {
+        # 'smith': {'ha_url': 'http://10.0.0.5:8123/api', 'ha_token': '...', 'db_name': 'home_smith'}
+    }
+}
+
+# Conversation sessions: bounded in-memory LRU over the conversation_sessions collection
+SESSION_CONFIG = {
+    'max_sessions': 500,
+    'flush_interval': 5,
+    # Sessions untouched for this long are removed by a TTL index
+    'ttl_days': 90
+}
+
+# Day/week/month daily-log rollups (get_log_rollup). A log's category is
+# details['category'] when set, else the first category with a keyword in its title/text.
+ROLLUP_CONFIG = {
+    'notable_titles': 5,
+    'categories': {
+        'presence': ['arrived', 'left', 'home', 'away', 'door', 'visited', 'guests'],
+        'meals': ['breakfast', 'lunch', 'dinner', 'meal', 'cooked', 'ate', 'pizza', 'snack'],
+        'health': ['sick', 'fever', 'doctor', 'medicine', 'headache', 'cough', 'dentist', 'checkup'],
+        'activities': ['movie', 'game', 'games', 'park', 'walk', 'played', 'football', 'practice', 'school'],
+        'chores': ['cleaned', 'cleaning', 'laundry', 'washing', 'dishes', 'shopping', 'groceries', 'garden'],
+        'home': ['heating', 'lights', 'thermostat', 'alarm', 'finished']
+    }
+}
+
+# Local retrieval over daily logs and health records (search_records); needs numpy.
+# The MongoDB index lives in 'path', the SQLite one next to the database file.
+SEARCH_CONFIG = {
+    'enabled': True,
+    'path': str(DATA_DIR / 'search_index'),
+    'dimensions': 256,   # hashed feature columns per entry (4 bytes each)
+    'candidates': 50     # best matrix scores re-ranked on exact token overlap
+}
+
+# Per-turn tracing: JSONL traces and a Prometheus-text /metrics endpoint
+TRACE_CONFIG = {
+    'enabled': False,
+    'trace_file': str(LOG_DIR / 'traces.jsonl'),
+    'metrics_host': '127.0.0.1',
+    'metrics_port': 9464
+}
+
+# Opt-in capture of anonymized turns for benchmarks/replay_load.py
+RECORD_CONFIG = {
+    'enabled': False,
+    'file': str(LOG_DIR / 'recordings.jsonl')
+}
+
+# Home Assistant state changes written to the daily log without an LLM round trip.
+# Events arrive via POST /ha/events on the server, or via HA's WebSocket API when
+# 'subscribe' is set (needs the optional 'websockets' package). A burst of events
+# for one rule and entity becomes one entry once the entity is quiet for 'debounce' seconds.
+EVENT_INGEST_CONFIG = {
+    'enabled': False,
+    'subscribe': False,
+    # Shared secret expected in the X-Ingest-Token header of POST /ha/events
+    'webhook_token': None,
+    'flush_interval': 5,
+    'max_batch': 100,
+    'default_debounce': 60,
+    'rules': [
+        {'name': 'arrival', 'entity_id': 'person.*', 'to': 'home', 'title': '{name} arrived home',
+         'category': 'presence', 'debounce': 300},
+        {'name': 'departure', 'entity_id': 'person.*', 'from': 'home', 'title': '{name} left home',
+         'category': 'presence', 'debounce': 300},
+        {'name': 'door_opened', 'entity_id': 'binary_sensor.*door*', 'to': 'on', 'title': '{name} opened',
+         'category': 'presence', 'debounce': 120},
+        {'name': 'appliance_finished', 'entity_id': 'sensor.*washer*', 'from': 'running', 'to': 'idle',
+         'title': '{name} finished', 'category': 'chores', 'debounce': 600}
+    ]
+}
+
 # Logging Configuration
 LOG_CONFIG = {
     'home_assistant': str(LOG_DIR / 'home_assistant.log'),
@@ -57,13 +297,29 @@ LOG_CONFIG = {
     'app': str(LOG_DIR / 'app.log'),
     'level': 'INFO',
     'format': '%(asctime)s - %(levelname)s - %(message)s',
-    'date_format': '%Y-%m-%d %H:%M:%S'
+    'date_format': '%Y-%m-%d %H:%M:%S',
+    # One JSON object per line instead of 'format'
+    'json': True,
+    # Records waiting for the background writer; beyond this they are dropped
+    'queue_size': 10000,
+    # Longer messages are cut off before they are queued
+    'max_message_chars': 2000,
+    # Fraction of records kept per level
+    'sampling': {'DEBUG': 0.1, 'INFO': 1.0, 'WARNING': 1.0, 'ERROR': 1.0, 'CRITICAL': 1.0}
 }
 
 # App Configuration
 APP_CONFIG = {
     'conversation_history_file': str(DATA_DIR / 'conversation_history.json'),
     'max_history': 15,
+    # Journal lines appended before the history is compacted into a new snapshot
+    'journal_compact_every': 100,
+    'journal_fsync': True,
     'default_user': 'furkan',
-    'default_location': 'bedroom'
+    'default_location': 'bedroom',
+    # Worker threads used to overlap blocking DB and HA I/O within a turn
+    'io_workers': 8,
+    # Event-loop orchestrator: prefetches the system prompt while waiting for input
+    'use_orchestrator': True,
+    'prompt_refresh_interval': 30
 }
\ No newline at end of file
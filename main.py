@@ -1,46 +1,87 @@
 # main.py
 
+import asyncio
 import datetime
 import json
-from modules.home_assistant import process_api_call
-from modules.openai_integration import send_to_gpt
+import time
+from concurrent.futures import ThreadPoolExecutor
+from modules.home_assistant import async_process_api_call, command_debouncer, command_queue
+from modules.openai_integration import async_send_to_gpt
 from modules.conversation_history import (
+    get_system_prompt,
     load_conversation_history,
     refresh_system_prompt,
     save_conversation_history
 )
-from modules.data.DatabaseManager import DatabaseManager  
+from modules.data.DatabaseFactory import create_database_manager, uses_mongodb
+from modules.data.AsyncDatabaseManager import AsyncDatabaseManager
 from modules.data.DatabaseSetup import DatabaseSetup
+from modules.llm_scheduler import llm_context
 from modules.logger import app_logger
+from modules.orchestrator import TurnOrchestrator
+from modules.tracing import tracer
+from modules.recorder import recorder
+from config.config import APP_CONFIG
+
+
+def prefetch_system_prompt(pool):
+    """Starts fetching the system prompt; the future holds (prompt, time the fetch started)"""
+    def fetch():
+        started = time.monotonic()
+        return get_system_prompt(), started
+    return pool.submit(fetch)
+
+
+def prefetched_system_prompt(prefetched):
+    """The prefetched prompt, fetched again inline if older than 'prompt_refresh_interval'"""
+    prompt, fetched_at = prefetched.result()
+    if time.monotonic() - fetched_at > APP_CONFIG['prompt_refresh_interval']:
+        app_logger.info("Prefetched system prompt is out of date, fetching the home state again")
+        prompt = get_system_prompt()
+    return prompt
+
 
 class MainClass:
-    def __init__(self):
-        self.db = DatabaseManager()
-        self.conversation_history = load_conversation_history()
-        self.default_name = "Ali"
-        self.default_location = "Living Room"
+    def __init__(self, db=None, async_db=None, conversation_history=None, name=None, location=None):
+        # Shared clients may be passed in (e.g. by the server for every session)
+        self.db = db or create_database_manager()
+        self.async_db = async_db or AsyncDatabaseManager(self.db)
+        self.conversation_history = (
+            conversation_history if conversation_history is not None
+            # The home-state prompt is fetched by the loop before the first turn
+            else load_conversation_history(defer_prompt=True)
+        )
+        self.default_name = name or "Ali"
+        self.default_location = location or "Living Room"
         app_logger.info("MainClass initialized")
+
     def process_db_calls(self, db_calls):
+        """Synchronous facade over process_db_calls_async() for existing callers"""
+        return asyncio.run(self.process_db_calls_async(db_calls))
+
+    async def process_db_calls_async(self, db_calls):
         results = []
-        app_logger.info(f"Processing database calls: {db_calls}")
+        app_logger.info(f"Processing {len(db_calls) if isinstance(db_calls, list) else 0} database calls")
+        app_logger.debug("Database calls: %s", db_calls)
         
         if not isinstance(db_calls, list):
             app_logger.error("Invalid db_calls format: not a list")
             return [{'error': 'Invalid format'}]
 
+        started = time.perf_counter()
+        # DB calls stay sequential: later calls may read what earlier ones wrote
         for call in db_calls:
+            function_name = call.get('function') if isinstance(call, dict) else None
             try:
                 if not isinstance(call, dict) or 'function' not in call or 'parameters' not in call:
                     raise ValueError("Invalid call format")
 
-                function_name = call['function']
                 params = call['parameters']
                 
                 if not hasattr(self.db, function_name):
                     raise AttributeError(f"Function {function_name} not found")
 
-                func = getattr(self.db, function_name)
-                result = func(**params)
+                result = await self.async_db.run(function_name, **params)
                 results.append({
                     'function': function_name,
                     'result': result
@@ -54,18 +95,68 @@ class MainClass:
                     'function': function_name,
                     'error': error_msg
                 })
-                
+
+        recorder.capture('db_calls', time.perf_counter() - started, calls=db_calls, results=results)
         return results
 
+    async def process_api_calls_async(self, api_calls):
+        """Runs HA calls concurrently across entities, in order for the same entity"""
+        app_logger.info(f"Processing {len(api_calls)} API calls")
+        app_logger.debug("API calls: %s", api_calls)
+        chains = {}
+        for index, api_call in enumerate(api_calls):
+            entity_id = api_call.get('entity_id') if isinstance(api_call, dict) else None
+            chains.setdefault(str(entity_id), []).append((index, api_call))
+
+        messages = [''] * len(api_calls)
+
+        async def run_chain(chain):
+            for index, api_call in chain:
+                try:
+                    error = await async_process_api_call(api_call)
+                    if error:
+                        app_logger.warning(f"API call failed: {error}")
+                        messages[index] = f"API call error: {error}. "
+                        continue
+                    app_logger.info(f"Successfully executed API call: {api_call}")
+                    messages[index] = f"API call result: {api_call}"
+                except Exception as e:
+                    app_logger.error(f"API call error: {e}")
+                    messages[index] = f"API call error: {e}"
+
+        await asyncio.gather(*(run_chain(chain) for chain in chains.values()))
+        return ''.join(messages)
+
+    async def process_actions_async(self, api_calls, db_calls):
+        """Overlaps Home Assistant and database work of a single response"""
+        async def no_op():
+            return None
+
+        return await asyncio.gather(
+            self.process_api_calls_async(api_calls) if api_calls else no_op(),
+            self.process_db_calls_async(db_calls) if db_calls else no_op(),
+            return_exceptions=True
+        )
+
+    def speak(self, message):
+        """Delivers the assistant's message to the user"""
+        print("Assistant:", message)
+
     def process_response(self, response):
+        """Synchronous facade over process_response_async() for existing callers"""
+        return asyncio.run(self.process_response_async(response))
+
+    async def process_response_async(self, response):
         return_message = ""
         if not response:
             app_logger.warning("Empty response received")
             return None
             
         try:
-            parsed_response = json.loads(response)
-            app_logger.info(f"Successfully parsed response: {parsed_response}")
+            with tracer.span('response.parse', response_bytes=len(response)):
+                parsed_response = json.loads(response)
+            app_logger.info("Successfully parsed response")
+            app_logger.debug("Parsed response: %s", parsed_response)
         except json.JSONDecodeError as e:
             app_logger.error(f"Invalid JSON response: {e}")
             return "Your last response was not valid JSON. Please provide a properly formatted response."
@@ -74,47 +165,134 @@ class MainClass:
             # Message handling
             if message := parsed_response.get('message'):
                 app_logger.info(f"Processing assistant message: {message}")
-                print("Assistant:", message)
-
-            # API calls
-            if api_calls := parsed_response.get('api_calls'):
-                app_logger.info(f"Processing API calls: {api_calls}")
-                for api_call in api_calls:
-                    try:
-                        process_api_call(api_call)
-                        app_logger.info(f"Successfully executed API call: {api_call}")
-                        return_message += f"API call result: {api_call}"
-                    except Exception as e:
-                        app_logger.error(f"API call error: {e}")
-                        return_message += f"API call error: {e}"
-
-            # Database calls
-            if db_calls := parsed_response.get('db_calls'):
-                try:
-                    db_results = self.process_db_calls(db_calls)
-                    if parsed_response.get('need_response'):
-                        app_logger.info(f"Database operation results: {db_results}")
-                        return_message += f"Database operation results: {db_results}"
-                except Exception as e:
-                    app_logger.error(f"Database operation failed: {e}")
-                    return_message += f"Database operation failed: {e}, please try again."
+                self.speak(message)
+
+            return_message += await self.execute_actions_async(parsed_response)
 
+            # Failed HA calls are reported back in the same turn so they can be corrected
+            if "API call error" in return_message:
+                return return_message
             return None if not parsed_response.get('need_response') else (return_message or None)
 
         except Exception as e:
             app_logger.error(f"Response processing error: {e}")
             return None
 
-    def main_loop(self):
-        try:
+    async def execute_actions_async(self, parsed_response):
+        """Runs the API and DB calls of a parsed response concurrently, returns the follow-up text"""
+        return_message = ""
+        api_calls = parsed_response.get('api_calls')
+        db_calls = parsed_response.get('db_calls')
+        if not api_calls and not db_calls:
+            return return_message
+
+        api_message, db_results = await self.process_actions_async(api_calls, db_calls)
+
+        # API calls
+        if isinstance(api_message, Exception):
+            app_logger.error(f"API call error: {api_message}")
+            return_message += f"API call error: {api_message}"
+        elif api_message:
+            return_message += api_message
+
+        # Database calls
+        if isinstance(db_results, Exception):
+            app_logger.error(f"Database operation failed: {db_results}")
+            return_message += f"Database operation failed: {db_results}, please try again."
+        elif db_results is not None and parsed_response.get('need_response'):
+            app_logger.debug("Database operation results: %s", db_results)
+            return_message += f"Database operation results: {db_results}"
+
+        return return_message
+
+    async def run_turn_async(self, message, date):
+        """
+        Runs one user turn (LLM round trips, actions, retries) on a working copy
+        of the history; the copy only replaces the history if the turn completes,
+        so a cancelled turn leaves no partial messages behind.
+        """
+        with recorder.turn(self.default_name, self.default_location, message), \
+                tracer.turn(user=self.default_name, location=self.default_location) as turn:
+            await self._run_turn_rounds(message, date, turn)
+
+    async def _run_turn_rounds(self, message, date, turn):
+        history = list(self.conversation_history)
+        retry_count = 0
+        rounds = 0
+        while retry_count < 2:  # Max 2 retries
+            rounds += 1
+            turn.set(rounds=rounds, retries=retry_count)
+            app_logger.info(f"Attempt {retry_count + 1} to process message")
+            response = await async_send_to_gpt(
+                history, 
+                self.default_name,
+                self.default_location, 
+                message, 
+                date
+            )
+            
+            if not response:
+                app_logger.warning("No response received from GPT")
+                break
+
+            next_message = await self.process_response_async(response)
+            
+            if next_message is None:
+                app_logger.info("Processing completed")
+                break
+            elif next_message and ("not valid JSON" in next_message or "API call error" in next_message):
+                app_logger.warning(f"Invalid response, attempt {retry_count + 1}")
+                retry_count += 1
+                message = next_message
+                continue
+            elif next_message:
+                app_logger.info(f"Continuing with new message: {next_message}")
+                message = next_message
+                continue
+            break
+
+        turn.set(retries=retry_count)
+        self.conversation_history = history
+
+    def trim_history(self):
+        max_history = APP_CONFIG['max_history']
+        if len(self.conversation_history) > max_history:
+            app_logger.info("Trimming conversation history")
+            self.conversation_history = [
+                self.conversation_history[0]
+            ] + self.conversation_history[-(max_history - 1):]
+
+    def end_turn(self):
+        """Trims and persists the conversation history after a turn"""
+        self.trim_history()
+        save_conversation_history(self.conversation_history)
+        app_logger.info("Conversation history saved")
+
+    @staticmethod
+    def setup_database():
+        if uses_mongodb():
             app_logger.info("Starting database setup...")
             DatabaseSetup().setup()
             app_logger.info("Database setup completed")
+
+    def shutdown(self):
+        app_logger.info("Closing database connection and saving conversation history")
+        command_debouncer.flush()
+        command_queue.close()
+        self.db.close()
+        save_conversation_history(self.conversation_history)
+
+    def main_loop(self):
+        prompt_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prompt")
+        prefetched = None
+        try:
+            self.setup_database()
             
             while True:
                 try:
-                    self.conversation_history = refresh_system_prompt(self.conversation_history)
-                    
+                    # Fetch the home state while the user is typing
+                    if prefetched is None:
+                        prefetched = prefetch_system_prompt(prompt_pool)
                     message = input("Your message: ").strip()
                     if not message:
                         continue
@@ -124,49 +302,16 @@ class MainClass:
                         print("Goodbye!")
                         break
 
+                    # Falls back to an inline fetch if the prefetch failed or the user was idle for long
+                    new_prompt, prefetched = prefetched_system_prompt(prefetched), None
+                    self.conversation_history = refresh_system_prompt(self.conversation_history, new_prompt)
+
                     date = datetime.datetime.now().strftime("%Y-%m-%d %H:%M %A")
                     app_logger.info(f"Processing user message: '{message}' at {date}")
 
-                    retry_count = 0
-                    while retry_count < 2:  # Max 2 retries
-                        app_logger.info(f"Attempt {retry_count + 1} to process message")
-                        response = send_to_gpt(
-                            self.conversation_history, 
-                            self.default_name,
-                            self.default_location, 
-                            message, 
-                            date
-                        )
-                        
-                        if not response:
-                            app_logger.warning("No response received from GPT")
-                            break
-
-                        next_message = self.process_response(response)
-                        
-                        if next_message is None:
-                            app_logger.info("Processing completed")
-                            break
-                        elif next_message and "not valid JSON" in next_message:
-                            app_logger.warning(f"Invalid JSON response, attempt {retry_count + 1}")
-                            retry_count += 1
-                            message = next_message
-                            continue
-                        elif next_message:
-                            app_logger.info(f"Continuing with new message: {next_message}")
-                            message = next_message
-                            continue
-                        break
-
-                    # Conversation history management
-                    if len(self.conversation_history) > 15:
-                        app_logger.info("Trimming conversation history")
-                        self.conversation_history = [
-                            self.conversation_history[0]
-                        ] + self.conversation_history[-14:]
-                    
-                    save_conversation_history(self.conversation_history)
-                    app_logger.info("Conversation history saved")
+                    with llm_context(priority='interactive'):
+                        asyncio.run(self.run_turn_async(message, date))
+                    self.end_turn()
 
                 except Exception as e:
                     app_logger.error(f"Loop iteration error: {e}")
@@ -179,10 +324,13 @@ class MainClass:
             app_logger.error(f"Fatal error occurred: {e}")
             print("A fatal error occurred. Please check the logs.")
         finally:
-            app_logger.info("Closing database connection and saving conversation history")
-            self.db.close()
-            save_conversation_history(self.conversation_history)
+            prompt_pool.shutdown(wait=False)
+            self.shutdown()
 
 if __name__ == "__main__":
     app_logger.info("Starting application")
-    MainClass().main_loop()
\ No newline at end of file
+    tracer.start_metrics_server()
+    if APP_CONFIG.get('use_orchestrator'):
+        asyncio.run(TurnOrchestrator(MainClass()).run())
+    else:
+        MainClass().main_loop()
@@ -0,0 +1,134 @@
+# modules/command_debounce.py
+import fnmatch
+import threading
+import time
+from config.config import HA_DEBOUNCE_CONFIG
+from modules.command_queue import call_entities
+from modules.logger import ha_logger
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class CommandDebouncer:
+    """
+    Coalescing window in front of the HA service call path.
+
+    The first call to an entity and service goes out at once. Calls to the
+    same entity and service arriving within 'window' seconds of a send are
+    held and merged (later parameter values win, relative steps are summed
+    or folded into a held absolute value, which in turn drops held steps);
+    the merged call is sent by a flush thread when the window ends, so a
+    burst costs one request per window instead of one per adjustment.
+    A call for an entity with a held call of another service flushes the
+    held call first to keep the order. send(call) delivers one call.
+    """
+
+    def __init__(self, send, config=HA_DEBOUNCE_CONFIG):
+        self.send = send
+        self.enabled = config.get('enabled', True)
+        self.window = config.get('window', 1.0)
+        self.relative = dict(config.get('relative_parameters', {}))
+        self.steps = {absolute: step for step, (absolute, _, _) in self.relative.items()}
+        self.immediate_entities = config.get('immediate_entities', ())
+        self.immediate_services = set(config.get('immediate_services', ()))
+        self._held = {}
+        self._last_sent = {}
+        self._cond = threading.Condition()
+        self._thread = None
+        self.metrics = {'immediate': 0, 'held': 0, 'merged': 0, 'flushed': 0}
+
+    def _is_immediate(self, call, entities):
+        service = str(call.get('action') or '').rpartition('.')[2]
+        return (not self.enabled or service in self.immediate_services or not entities or
+                any(fnmatch.fnmatch(entity, pattern) for entity in entities for pattern in self.immediate_entities))
+
+    def _merge(self, held_call, call):
+        """Keeps one form per attribute: an absolute value or the summed step, never both"""
+        parameters = dict(held_call.get('parameters') or {})
+        for name, value in (call.get('parameters') or {}).items():
+            if name in self.steps:
+                # An absolute value replaces the pending step
+                parameters.pop(self.steps[name], None)
+            elif name in self.relative and _is_number(value):
+                absolute, low, high = self.relative[name]
+                if _is_number(parameters.get(absolute)):
+                    parameters[absolute] = min(high, max(low, parameters[absolute] + value))
+                    continue
+                if _is_number(parameters.get(name)):
+                    value += parameters[name]
+            parameters[name] = value
+        return dict(call, parameters=parameters)
+
+    def submit(self, call):
+        """Returns True when the call is held for merging, False when the caller should send it now"""
+        entities = call_entities(call)
+        key = (','.join(sorted(entities)), call.get('action'))
+        now = time.monotonic()
+        with self._cond:
+            # Held calls of other services for these entities go first
+            earlier = [k for k in self._held if k != key and set(k[0].split(',')) & set(entities)]
+            flush_first = [self._held.pop(k)['call'] for k in earlier]
+            self._last_sent.update((k, now) for k in earlier)
+            if self._is_immediate(call, entities):
+                held = False
+                self.metrics['immediate'] += 1
+            elif key in self._held:
+                self._held[key]['call'] = self._merge(self._held[key]['call'], call)
+                self.metrics['merged'] += 1
+                held = True
+            elif now - self._last_sent.get(key, float('-inf')) < self.window:
+                self._held[key] = {'call': call, 'due': self._last_sent[key] + self.window}
+                self.metrics['held'] += 1
+                self._start()
+                self._cond.notify()
+                held = True
+            else:
+                self._last_sent[key] = now
+                held = False
+            if len(self._last_sent) > 1024:
+                self._last_sent = {k: t for k, t in self._last_sent.items() if now - t < self.window}
+
+        for held_call in flush_first:
+            self._send(held_call)
+        return held
+
+    def flush(self):
+        """Sends all held calls now (e.g. on shutdown)"""
+        with self._cond:
+            calls = [held['call'] for held in self._held.values()]
+            self._held.clear()
+        for call in calls:
+            self._send(call)
+
+    def _send(self, call):
+        self.metrics['flushed'] += 1
+        try:
+            if error := self.send(call):
+                ha_logger.error(f"Merged HA command {call} failed: {error}")
+        except Exception as e:
+            ha_logger.error(f"Error sending merged HA command {call}: {e}")
+
+    def _start(self):
+        """Starts the flush thread; called with the condition held"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='ha-debounce', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._held:
+                    self._cond.wait()
+                now = time.monotonic()
+                due = [key for key, held in self._held.items() if held['due'] <= now]
+                if not due:
+                    self._cond.wait(min(held['due'] for held in self._held.values()) - now)
+                    continue
+                calls = []
+                for key in due:
+                    calls.append(self._held.pop(key)['call'])
+                    self._last_sent[key] = now
+            for call in calls:
+                self._send(call)
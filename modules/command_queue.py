@@ -0,0 +1,254 @@
+# modules/command_queue.py
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from config.config import COMMAND_QUEUE_CONFIG
+from modules.logger import ha_logger
+from modules.tracing import tracer
+
+SENT, RETRY, FAILED = 'sent', 'retry', 'failed'
+
+
+def call_entities(call):
+    """Entity ids of an api_call as a list"""
+    entity_id = call.get('entity_id')
+    requested = entity_id if isinstance(entity_id, list) else str(entity_id or '').split(',')
+    return [str(name).strip() for name in requested if str(name).strip()]
+
+
+class CommandQueue:
+    """
+    Durable queue of HA service calls that could not be delivered.
+
+    Commands are kept in memory and in an append-only JSONL journal ("add" and
+    "remove" lines), so queued calls survive a restart. A newer command for the
+    same service, entities and parameter names replaces the pending one and
+    moves to the end (last write wins: "dim to 30, then 50, then 70" sends one
+    call); commands of different services (open_cover, stop_cover) all run.
+    A drain thread sends the oldest command of each entity, up to
+    'concurrency' at a time, and backs off exponentially while HA stays
+    unreachable. send(call) returns SENT, RETRY (HA unreachable) or FAILED.
+    """
+
+    def __init__(self, send, config=COMMAND_QUEUE_CONFIG):
+        self.send = send
+        self.enabled = config.get('enabled', True)
+        self.path = Path(config['path'])
+        self.concurrency = config.get('concurrency', 4)
+        self.backoff_initial = config.get('backoff_initial', 1)
+        self.backoff_max = config.get('backoff_max', 60)
+        self.max_age = config.get('max_age', 900)
+        self.compact_every = config.get('compact_every', 200)
+        self.fsync = config.get('fsync', True)
+        self.no_coalesce = set(config.get('no_coalesce', ()))
+        self._pending = OrderedDict()
+        self._in_flight = set()
+        self._journal_lines = 0
+        self._backoff = 0.0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        self.metrics = {'depth': 0, 'queued': 0, 'coalesced': 0, 'delivered': 0, 'expired': 0,
+                        'failed': 0, 'last_drain_ms': None, 'max_drain_ms': 0}
+        if self.enabled:
+            self._load()
+            if self._pending:
+                ha_logger.info(f"{len(self._pending)} queued HA commands restored from {self.path}")
+                self.start()
+
+    # Journal
+    def _load(self):
+        valid_bytes = 0
+        try:
+            with open(self.path, 'rb') as f:
+                for raw in f:
+                    try:
+                        if not raw.endswith(b'\n'):
+                            raise ValueError("incomplete line")
+                        entry = json.loads(raw)
+                    except ValueError:
+                        ha_logger.warning(f"Dropping unreadable command queue tail in {self.path}")
+                        break
+                    valid_bytes += len(raw)
+                    self._journal_lines += 1
+                    if entry.get('op') == 'add':
+                        self._pending[entry['command']['id']] = entry['command']
+                    else:
+                        self._pending.pop(entry.get('id'), None)
+            if valid_bytes != os.path.getsize(self.path):
+                os.truncate(self.path, valid_bytes)
+        except FileNotFoundError:
+            pass
+        self.metrics['depth'] = len(self._pending)
+
+    def _append(self, entries):
+        """Writes journal lines; called with the condition held"""
+        if not self._pending and not self._in_flight:
+            # Nothing left to recover: start the journal over
+            with open(self.path, 'w', encoding='utf-8'):
+                pass
+            self._journal_lines = 0
+            return
+        if self._journal_lines + len(entries) >= self.compact_every:
+            self._compact()
+            return
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(e, ensure_ascii=False, default=str) + '\n' for e in entries))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        self._journal_lines += len(entries)
+
+    def _compact(self):
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for command in self._pending.values():
+                f.write(json.dumps({'op': 'add', 'command': command}, ensure_ascii=False, default=str) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._journal_lines = len(self._pending)
+
+    # Queueing
+    def _coalesce_key(self, call):
+        """Commands with equal keys set the same thing; None for accumulating services"""
+        action = str(call.get('action') or '')
+        if action.rpartition('.')[2] in self.no_coalesce:
+            return None
+        parameters = call.get('parameters') or {}
+        return f"{action}|{','.join(sorted(call_entities(call)))}|{','.join(sorted(parameters))}"
+
+    def _update_depth(self):
+        self.metrics['depth'] = len(self._pending)
+        tracer.set_gauge('ha_command_queue_depth', len(self._pending))
+
+    def should_queue(self, call):
+        """True while HA is known to be down or earlier calls for these entities are still queued"""
+        if not self.enabled:
+            return False
+        with self._cond:
+            if not self._pending:
+                return False
+            if self._backoff:
+                return True
+            entities = set(call_entities(call))
+            return any(entities & set(call_entities(command['call'])) for command in self._pending.values())
+
+    def enqueue(self, call):
+        """Queues a call for delivery, replacing a pending call that sets the same thing"""
+        key = self._coalesce_key(call)
+        with self._cond:
+            replaced = [
+                command_id for command_id, command in self._pending.items()
+                if key is not None and command['key'] == key and command_id not in self._in_flight
+            ]
+            for command_id in replaced:
+                del self._pending[command_id]
+            command = {'id': uuid.uuid4().hex, 'call': call, 'key': key, 'queued_at': time.time()}
+            self._pending[command['id']] = command
+            self._append([{'op': 'remove', 'id': command_id} for command_id in replaced] +
+                         [{'op': 'add', 'command': command}])
+            self.metrics['queued'] += 1
+            self.metrics['coalesced'] += len(replaced)
+            self._update_depth()
+            self._cond.notify()
+        ha_logger.info(f"Queued HA command {call.get('action')} for {call.get('entity_id')}"
+                       + (f", replacing {len(replaced)} pending" if replaced else ''))
+        self.start()
+        return command['id']
+
+    def pending(self):
+        """Calls waiting for delivery, oldest first"""
+        with self._cond:
+            return [command['call'] for command in self._pending.values()]
+
+    # Draining
+    def start(self):
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='ha-command-queue', daemon=True)
+                self._thread.start()
+
+    def close(self, timeout=5):
+        """Stops draining; undelivered commands stay in the journal"""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _next_batch(self):
+        """The oldest command of each entity, up to 'concurrency'; expired commands are dropped"""
+        now = time.time()
+        batch, blocked, expired = [], set(), []
+        with self._cond:
+            for command_id, command in list(self._pending.items()):
+                if command_id in self._in_flight:
+                    blocked.update(call_entities(command['call']))
+                    continue
+                if now - command['queued_at'] > self.max_age:
+                    del self._pending[command_id]
+                    expired.append(command)
+                    continue
+                entities = set(call_entities(command['call']))
+                if not entities & blocked and len(batch) < self.concurrency:
+                    batch.append(command)
+                    self._in_flight.add(command_id)
+                blocked |= entities
+            if expired:
+                self._append([{'op': 'remove', 'id': command['id']} for command in expired])
+                self.metrics['expired'] += len(expired)
+                self._update_depth()
+        for command in expired:
+            ha_logger.warning(f"Dropped queued HA command older than {self.max_age}s: {command['call']}")
+        return batch
+
+    def _deliver(self, command):
+        try:
+            result = self.send(command['call'])
+        except Exception as e:
+            ha_logger.error(f"Error sending queued HA command {command['call']}: {e}")
+            result = RETRY
+        with self._cond:
+            self._in_flight.discard(command['id'])
+            if result == RETRY or command['id'] not in self._pending:
+                return result
+            del self._pending[command['id']]
+            self._append([{'op': 'remove', 'id': command['id']}])
+            self._update_depth()
+            if result == SENT:
+                waited = time.time() - command['queued_at']
+                self.metrics['delivered'] += 1
+                self.metrics['last_drain_ms'] = round(waited * 1000, 1)
+                self.metrics['max_drain_ms'] = max(self.metrics['max_drain_ms'], self.metrics['last_drain_ms'])
+                tracer.observe('ha.command_queue_wait', waited)
+            else:
+                self.metrics['failed'] += 1
+        return result
+
+    def _run(self):
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='ha-queue-send') as executor:
+            while not self._stop.is_set():
+                with self._cond:
+                    while not self._pending and not self._stop.is_set():
+                        self._cond.wait()
+                if self._stop.is_set():
+                    return
+                batch = self._next_batch()
+                results = list(executor.map(self._deliver, batch))
+                if RETRY in results:
+                    self._backoff = min(max(self._backoff * 2, self.backoff_initial), self.backoff_max)
+                    ha_logger.info(f"Home Assistant unreachable, retrying {len(self._pending)} queued "
+                                   f"commands in {self._backoff:.0f}s")
+                    self._stop.wait(self._backoff * random.uniform(0.8, 1.2))
+                else:
+                    if self._backoff and not self._pending:
+                        ha_logger.info("Command queue drained")
+                    self._backoff = 0.0
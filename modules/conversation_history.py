@@ -1,8 +1,13 @@
 # modules/conversation_history.py
-import json
-from config.config import DATA_DIR
-from modules.home_assistant import get_ha_states
+import atexit
+from config.config import APP_CONFIG, HA_CONFIG, SESSION_CONFIG
+from modules.conversation_journal import ConversationJournal
+from modules.data.DatabaseFactory import uses_mongodb
+from modules.data.SessionStore import SessionStore
+from modules.home_assistant import current_client, get_ha_states
 from modules.logger import openai_logger
+from modules.state_encoding import count_tokens, encode_compact
+from modules.tracing import tracer
 from datetime import date
 
 def format_home_structure(data):
@@ -54,9 +59,30 @@ def format_home_structure(data):
     
 def get_system_prompt():
     """Retrieves the current system prompt."""
+    with tracer.span('prompt.build') as span:
+        prompt = _build_system_prompt()
+        span.set(prompt_chars=len(prompt or ''))
+    return prompt
+
+def _build_system_prompt():
     try:
         states = get_ha_states()
-        home_state = format_home_structure(states) if states else "Error: Could not fetch home state"
+        with tracer.span('prompt.format') as span:
+            if not states:
+                home_state = "Error: Could not fetch home state"
+            elif HA_CONFIG['state_encoding'] == 'compact':
+                home_state = encode_compact(states)
+            else:
+                home_state = format_home_structure(states)
+            if queued := current_client().command_queue.pending():
+                home_state += "\nQUEUED COMMANDS (Home Assistant unreachable, sent automatically when it is back):\n" + \
+                    '\n'.join(f"- {call.get('action')} {call.get('entity_id')} {call.get('parameters') or ''}" for call in queued)
+            if tracer.enabled and states:
+                # Before/after token counts of the live snapshot
+                span.set(
+                    state_tokens=count_tokens(home_state),
+                    verbose_state_tokens=count_tokens(format_home_structure(states))
+                )
         db_context= f"""
             USER:
             - add_user(name, role, age=None)  
@@ -71,11 +97,11 @@ def get_system_prompt():
                 # Example: update_user_health("John", "sick", 
                 #          {{"type": "cold", "symptoms": "fever"}})
 
-            - get_user_health(name)
-                # Example: get_user_health("John")
+            - get_user_health(name, start_date=None, end_date=None, limit=20)
+                # Example: get_user_health("John", "2024-01-01", "2024-01-31")
 
             INVENTORY:
-            - add_inventory_item(name, category, quantity, info=None)  
+            - add_inventory_item(name, category, quantity, info=None, threshold=None)  
                 # Example: add_inventory_item("milk", "food", 2, 
                 #          {{"price": 3.99, "brand": "X"}})
 
@@ -85,7 +111,10 @@ def get_system_prompt():
             - update_inventory_quantity(name, new_quantity)
                 # Example: update_inventory_quantity("milk", 3)
 
-            - get_low_stock_items()
+            - set_inventory_threshold(name, threshold)
+                # Example: set_inventory_threshold("eggs", 6)
+
+            - get_low_stock_items()  # Items below their own threshold
 
             SHOPPING LIST:
            - add_to_shopping_list(item_data)
@@ -110,13 +139,30 @@ def get_system_prompt():
             - get_pending_tasks()
             - get_overdue_tasks()
 
+            BRIEFING:
+            - get_household_briefing()
+                # Pending and overdue tasks, pending shopping items, low stock items
+                # and today's logs in a single call
+
             DAILY LOG:
             - add_daily_log(title, details=None)
                 # Example: add_daily_log("Family Dinner", "Had pizza together")
 
             - get_today_logs()
             - get_date_logs(date)  # Example: get_date_logs("2024-01-10")
+            - get_log_rollup(period="week", date=None, compact=False)  # period: day/week/month
+                # Counts by category and most frequent titles of the period containing date
+                # Example: get_log_rollup("month", "2024-01")  # "What did we do last month?"
+                # Use this for questions spanning more than a day instead of get_date_logs per day
+
+            SEARCH:
+            - search_records(query, limit=5, kind=None)  # kind: "log" or "health"
+                # Past daily logs and health records matching a question, best first
+                # Example: search_records("fever", kind="health")
+                # Prefer this over calling get_date_logs day by day
             Note: All functions are flexible with minimal required fields
+            Updates need the exact stored name; a result with "did_you_mean" changed nothing,
+            confirm that name with the user before retrying with it
 
             **IMPORTANT**
             Even if not explicitly asked, log important daily life events and user health changes for future reference.
@@ -139,9 +185,8 @@ def get_system_prompt():
             EXIT RULES:
             When user indicates departure (leaving, goodbye, etc.):
             1. Create daily log (add_daily_log)
-            2. Check pending tasks (get_pending_tasks)
-            3. Check shopping list (get_pending_shopping_items)
-            4. Combine all important reminders in a single message
+            2. Check tasks and shopping list with one call (get_household_briefing)
+            3. Combine all important reminders in a single message
 
 
             """
@@ -175,6 +220,7 @@ RULES:
    - Use ONLY services and entity_ids from CURRENT HOME STATE
    - Include appropriate parameters for each service
    - Ask for alarm code when needed
+   - An "API call error" means the call was not executed: fix it as described, or tell the user why it failed
 4. For Database Operations:
    - First make read operations if needed, NEVER assume database content - ALWAYS query first
    - Wait for results before making updates (set need_response: true)
@@ -224,33 +270,77 @@ def maintain_conversation_history():
     else:
         return [{"role": "system", "content": "Error initializing system prompt"}]
 
-def refresh_system_prompt(conversation_history):
-    """Updates the system prompt."""
-    new_prompt = get_system_prompt()
+def refresh_system_prompt(conversation_history, new_prompt=None):
+    """Updates the system prompt, fetching a fresh one unless a prefetched prompt is given."""
+    new_prompt = new_prompt or get_system_prompt()
     if new_prompt and conversation_history:
         conversation_history[0] = {"role": "system", "content": new_prompt}
     return conversation_history
 
-def save_conversation_history(conversation_history, filename=DATA_DIR / 'conversation_history.json'):
-    """Saves the conversation history to a file."""
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(conversation_history, f, ensure_ascii=False, indent=2)
-
-def load_conversation_history(filename=DATA_DIR / 'conversation_history.json'):
-    """Loads the conversation history from a file or initializes a new one."""
+_journals = {}
+_session_store = None
+
+def get_journal(filename=APP_CONFIG['conversation_history_file']):
+    """Returns the journal for a history file, creating it on first use."""
+    key = str(filename)
+    if key not in _journals:
+        _journals[key] = ConversationJournal(
+            key,
+            max_messages=APP_CONFIG['max_history'] - 1,
+            compact_every=APP_CONFIG['journal_compact_every'],
+            fsync=APP_CONFIG['journal_fsync']
+        )
+    return _journals[key]
+
+def get_session_store(client=None, db_name='home_assistant'):
+    """
+    Returns the shared session store, starting its write-behind flusher on first use.
+    The first call picks the MongoDB client and database (default: its own local connection).
+    """
+    global _session_store
+    if _session_store is None:
+        _session_store = SessionStore(
+            client=client,
+            db_name=db_name,
+            max_sessions=SESSION_CONFIG['max_sessions'],
+            max_messages=APP_CONFIG['max_history'] - 1,
+            flush_interval=SESSION_CONFIG['flush_interval'],
+            persistent=uses_mongodb()
+        ).start()
+        atexit.register(close_session_store)
+    return _session_store
+
+def close_session_store():
+    """Flushes pending sessions and closes the store."""
+    global _session_store
+    if _session_store is not None:
+        _session_store.close()
+        _session_store = None
+
+def save_conversation_history(conversation_history, filename=APP_CONFIG['conversation_history_file'], session_id=None):
+    """Persists the conversation history: per session in the session store, otherwise to the journal."""
+    if session_id is not None:
+        get_session_store().put(session_id, conversation_history)
+        return
     try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            content = f.read().strip()
-            if not content:
-                return maintain_conversation_history()
-            try:
-                history = json.loads(content)
-                if not history or not isinstance(history, list):
-                    return maintain_conversation_history()
-                return history
-            except json.JSONDecodeError:
-                openai_logger.error("Error decoding conversation history JSON")
-                return maintain_conversation_history()
-    except FileNotFoundError:
-        openai_logger.error("Conversation history file not found")
-        return maintain_conversation_history()
+        get_journal(filename).save(conversation_history)
+    except OSError as e:
+        openai_logger.error(f"Error saving conversation history: {e}")
+
+def load_conversation_history(filename=APP_CONFIG['conversation_history_file'], session_id=None, system_prompt=None,
+                              defer_prompt=False):
+    """
+    Loads the conversation history behind a fresh (or the given) system prompt.
+    With defer_prompt the prompt is left empty for the caller to refresh before the first turn.
+    """
+    if session_id is not None:
+        messages = get_session_store().get(session_id)
+    else:
+        try:
+            messages = get_journal(filename).load()
+        except OSError as e:
+            openai_logger.error(f"Error loading conversation history: {e}")
+            messages = []
+    if system_prompt or defer_prompt:
+        return [{"role": "system", "content": system_prompt or ""}] + messages
+    return maintain_conversation_history() + messages
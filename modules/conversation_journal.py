@@ -0,0 +1,134 @@
+# modules/conversation_journal.py
+import json
+import os
+from pathlib import Path
+from modules.logger import app_logger
+
+
+def _is_persistent(message):
+    """The system prompt is rebuilt from live home state, so it is never stored"""
+    return isinstance(message, dict) and message.get('role') != 'system'
+
+
+class ConversationJournal:
+    """
+    Conversation messages stored as a snapshot plus an append-only JSONL journal.
+
+    A turn appends only its new messages to the journal. Once the journal holds
+    `compact_every` lines it is folded into a new snapshot, written to a
+    temporary file and renamed over the old one, so a crash at any point leaves
+    either the old or the new snapshot and at most one torn journal line.
+    """
+
+    def __init__(self, snapshot_path, max_messages=14, compact_every=100, fsync=True):
+        self.snapshot_path = Path(snapshot_path)
+        self.journal_path = self.snapshot_path.with_suffix('.jsonl')
+        self.max_messages = max_messages
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self._persisted = None
+        self._journal_lines = 0
+
+    def _trim(self, messages):
+        return messages[-self.max_messages:] if self.max_messages else messages
+
+    def _read_snapshot(self):
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                content = f.read().strip()
+            if not content:
+                return []
+            data = json.loads(content)
+            # Older files hold the whole history list, system prompt included
+            messages = data.get('messages', []) if isinstance(data, dict) else data
+            return [m for m in messages if _is_persistent(m)] if isinstance(messages, list) else []
+        except FileNotFoundError:
+            return []
+        except json.JSONDecodeError:
+            app_logger.error(f"Error decoding conversation snapshot {self.snapshot_path}")
+            return []
+
+    def _replay_journal(self, messages):
+        """Applies the journal to the snapshot messages, dropping a torn tail"""
+        lines = 0
+        valid_bytes = 0
+        try:
+            with open(self.journal_path, 'rb') as f:
+                for raw in f:
+                    try:
+                        if not raw.endswith(b'\n'):
+                            raise ValueError("incomplete line")
+                        entry = json.loads(raw)
+                    except ValueError:
+                        # A torn last line from an interrupted append
+                        app_logger.warning(f"Dropping unreadable journal tail in {self.journal_path}")
+                        break
+                    lines += 1
+                    valid_bytes += len(raw)
+                    if entry.get('op') == 'reset':
+                        messages = []
+                    elif _is_persistent(entry.get('message')):
+                        messages.append(entry['message'])
+            if valid_bytes != os.path.getsize(self.journal_path):
+                os.truncate(self.journal_path, valid_bytes)
+        except FileNotFoundError:
+            pass
+        return messages, lines
+
+    def load(self):
+        """Returns the persisted messages (snapshot replayed with the journal tail)"""
+        messages, self._journal_lines = self._replay_journal(self._read_snapshot())
+        self._persisted = self._trim(messages)
+        return list(self._persisted)
+
+    def _new_messages(self, messages):
+        """Messages appended since the last save, or None if the history diverged"""
+        persisted = self._persisted
+        # Trimming only drops from the front and turns only append at the end,
+        # so find the longest persisted suffix that is a prefix of `messages`
+        for overlap in range(min(len(persisted), len(messages)), -1, -1):
+            if persisted[len(persisted) - overlap:] == messages[:overlap]:
+                if overlap == 0 and persisted:
+                    return None
+                return messages[overlap:]
+        return None
+
+    def _append(self, entries):
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(e, ensure_ascii=False) + '\n' for e in entries))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        self._journal_lines += len(entries)
+
+    def save(self, conversation_history):
+        """Persists the new non-system messages of the history"""
+        messages = [m for m in conversation_history if _is_persistent(m)]
+        if self._persisted is None:
+            self.load()
+
+        new_messages = self._new_messages(messages)
+        if new_messages is None:
+            self._append([{'op': 'reset'}] + [{'message': m} for m in messages])
+        elif new_messages:
+            self._append([{'message': m} for m in new_messages])
+        self._persisted = self._trim(messages)
+
+        if self._journal_lines >= self.compact_every:
+            self.compact()
+
+    def compact(self):
+        """Writes the current messages to a fresh snapshot and empties the journal"""
+        if self._persisted is None:
+            self.load()
+        tmp_path = self.snapshot_path.with_name(self.snapshot_path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'messages': self._persisted}, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        # Only truncate once the snapshot that covers the journal is in place
+        with open(self.journal_path, 'w', encoding='utf-8'):
+            pass
+        self._journal_lines = 0
+        app_logger.info(f"Compacted conversation journal into {self.snapshot_path}")
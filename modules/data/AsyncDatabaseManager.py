@@ -0,0 +1,71 @@
+# modules/data/AsyncDatabaseManager.py
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from config.config import APP_CONFIG
+from modules.data.StorageBackend import StorageBackend
+from modules.logger import db_logger
+from modules.tracing import tracer
+
+# Public StorageBackend methods mirrored as coroutines
+ASYNC_METHODS = [
+    name for name, value in vars(StorageBackend).items()
+    if callable(value) and not name.startswith('_') and name != 'close'
+]
+
+
+def _async_method(method_name):
+    async def wrapper(self, *args, **kwargs):
+        return await self.run(method_name, *args, **kwargs)
+
+    wrapper.__name__ = method_name
+    wrapper.__doc__ = getattr(StorageBackend, method_name).__doc__
+    return wrapper
+
+
+class AsyncDatabaseManager:
+    """
+    asyncio variant of the storage backend method set.
+    Calls run on a bounded thread pool over the (thread-safe) backend, so
+    several DB operations - and HA/LLM work - can be awaited concurrently
+    while the synchronous backend stays the single implementation.
+    """
+
+    def __init__(self, backend=None, max_workers=None, executor=None):
+        if backend is None:
+            from modules.data.DatabaseFactory import create_database_manager
+            backend = create_database_manager()
+        self.backend = backend
+        # A pool shared by several households is not shut down by close()
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=max_workers or APP_CONFIG['io_workers'],
+            thread_name_prefix='db'
+        )
+
+    async def run(self, method_name, *args, **kwargs):
+        """Runs a backend method without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        func = partial(getattr(self.backend, method_name), *args, **kwargs)
+        with tracer.span(f'db.{method_name}'):
+            return await loop.run_in_executor(self._executor, func)
+
+    async def gather(self, calls):
+        """Runs independent (method_name, params) calls concurrently, preserving order"""
+        return await asyncio.gather(
+            *(self.run(name, **params) for name, params in calls),
+            return_exceptions=True
+        )
+
+    async def close(self):
+        """Waits for pending calls and closes the backend"""
+        try:
+            if self._owns_executor:
+                await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+            await asyncio.get_running_loop().run_in_executor(None, self.backend.close)
+        except Exception as e:
+            db_logger.error(f"Error closing async database manager: {e}")
+
+
+for _name in ASYNC_METHODS:
+    setattr(AsyncDatabaseManager, _name, _async_method(_name))
@@ -0,0 +1,171 @@
+# modules/data/CachedDatabaseManager.py
+import json
+import threading
+from datetime import datetime
+from config.config import CACHE_CONFIG
+from modules.data.DatabaseManager import DatabaseManager
+from modules.data.QueryCache import QueryCache
+from modules.logger import db_logger
+
+# Read methods served through the cache, mapped to the collection(s) they depend on
+CACHED_READS = {
+    'get_user': 'users',
+    'get_all_users': 'users',
+    'get_inventory_item': 'inventory',
+    'get_low_stock_items': 'inventory',
+    'get_shopping_list': 'shopping_list',
+    'get_pending_shopping_items': 'shopping_list',
+    'get_pending_tasks': 'tasks',
+    'get_overdue_tasks': 'tasks',
+    'get_today_logs': 'daily_log',
+    'get_log_rollup': 'daily_log',
+    'get_household_briefing': ('tasks', 'shopping_list', 'inventory', 'daily_log')
+}
+
+# Reads whose result depends on the current time, keyed on the clock (strftime format)
+# so that no write is needed to move them past a due time or midnight
+CLOCK_KEYED_READS = {
+    'get_overdue_tasks': '%Y-%m-%d %H:%M',
+    'get_today_logs': '%Y-%m-%d',
+    'get_log_rollup': '%Y-%m-%d',
+    'get_household_briefing': '%Y-%m-%d %H:%M'
+}
+
+# Write methods mapped to the collection(s) they modify
+INVALIDATING_WRITES = {
+    'add_user': 'users',
+    'update_user_health': 'users',
+    'add_inventory_item': ('inventory', 'shopping_list'),
+    'update_inventory_quantity': ('inventory', 'shopping_list'),
+    'set_inventory_threshold': ('inventory', 'shopping_list'),
+    'add_to_shopping_list': 'shopping_list',
+    'update_shopping_item_status': 'shopping_list',
+    'add_task': 'tasks',
+    'complete_task': 'tasks',
+    'add_daily_log': 'daily_log',
+    'add_daily_logs': 'daily_log',
+    'delete_daily_log': 'daily_log'
+}
+
+
+def _cache_key(args, kwargs):
+    """Builds a hashable cache key from call arguments"""
+    if not args and not kwargs:
+        return ''
+    return json.dumps([args, kwargs], sort_keys=True, default=str)
+
+
+class _ReadFailed(Exception):
+    """Raised by a cache loader whose read failed, carrying the read's fallback result"""
+
+    def __init__(self, result):
+        super().__init__()
+        self.result = result
+
+
+def _cached_read(method_name):
+    read = getattr(DatabaseManager, method_name)
+    clock_format = CLOCK_KEYED_READS.get(method_name)
+
+    def wrapper(self, *args, **kwargs):
+        def load():
+            failed = self.failed_reads()
+            result = read(self, *args, **kwargs)
+            if self.failed_reads() != failed:
+                raise _ReadFailed(result)
+            return result
+
+        key = _cache_key(args, kwargs)
+        if clock_format:
+            key = f"{datetime.now().strftime(clock_format)}|{key}"
+        try:
+            return self.cache.get_or_load(method_name, key, load)
+        except _ReadFailed as e:
+            # Served once, never cached: the next call retries the database
+            return e.result
+
+    wrapper.__name__ = method_name
+    wrapper.__doc__ = read.__doc__
+    return wrapper
+
+
+def _invalidating_write(method_name, collections):
+    write = getattr(DatabaseManager, method_name)
+    if isinstance(collections, str):
+        collections = (collections,)
+
+    def wrapper(self, *args, **kwargs):
+        try:
+            return write(self, *args, **kwargs)
+        finally:
+            for collection in collections:
+                self.invalidate_collection(collection)
+
+    wrapper.__name__ = method_name
+    wrapper.__doc__ = write.__doc__
+    return wrapper
+
+
+class CachedDatabaseManager(DatabaseManager):
+    """DatabaseManager with a write-invalidated read-through query cache"""
+
+    def __init__(self, cache_config=CACHE_CONFIG, client=None, db_name='home_assistant'):
+        super().__init__(client, db_name)
+        self.cache = QueryCache(
+            ttls=cache_config.get('ttls'),
+            default_ttl=cache_config.get('default_ttl', 30),
+            max_entries=cache_config.get('max_entries', 256)
+        )
+        self._queries_by_collection = {}
+        for query, collections in CACHED_READS.items():
+            if isinstance(collections, str):
+                collections = (collections,)
+            for collection in collections:
+                self._queries_by_collection.setdefault(collection, []).append(query)
+        self._watch_thread = None
+        if cache_config.get('watch_changes'):
+            self.start_change_listener()
+
+    def invalidate_collection(self, collection):
+        """Drops cached results of every query that reads the given collection"""
+        queries = self._queries_by_collection.get(collection)
+        if queries:
+            self.cache.invalidate(queries)
+
+    def cache_metrics(self):
+        """Get query cache hit rates and staleness windows"""
+        return self.cache.metrics()
+
+    def start_change_listener(self):
+        """Invalidates cached queries on writes from other processes via a change stream"""
+        if self._watch_thread and self._watch_thread.is_alive():
+            return
+        self._watch_thread = threading.Thread(
+            target=self._watch_changes,
+            name='db-cache-change-stream',
+            daemon=True
+        )
+        self._watch_thread.start()
+
+    def _watch_changes(self):
+        try:
+            with self.db.watch(
+                [{'$match': {'ns.coll': {'$in': list(self._queries_by_collection)}}}]
+            ) as stream:
+                db_logger.info("Listening to change stream for cache invalidation")
+                for change in stream:
+                    self.invalidate_collection(change.get('ns', {}).get('coll'))
+        except Exception as e:
+            # Change streams need a replica set; fall back to TTL-only expiry
+            db_logger.warning(f"Change stream unavailable, relying on cache TTLs: {e}")
+
+    def close(self):
+        """Clear cache and close MongoDB connection"""
+        self.cache.clear()
+        super().close()
+
+
+for _name in CACHED_READS:
+    setattr(CachedDatabaseManager, _name, _cached_read(_name))
+for _name, _collections in INVALIDATING_WRITES.items():
+    setattr(CachedDatabaseManager, _name, _invalidating_write(_name, _collections))
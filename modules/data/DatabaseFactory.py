@@ -0,0 +1,31 @@
+# modules/data/DatabaseFactory.py
+from config.config import CACHE_CONFIG, STORAGE_CONFIG
+from modules.logger import db_logger
+
+
+def create_database_manager(storage_config=STORAGE_CONFIG, cache_config=CACHE_CONFIG, client=None,
+                            db_name='home_assistant', sqlite_path=None):
+    """
+    Returns the configured storage backend behind the DatabaseManager method surface.
+    A household passes its own db_name (with a shared MongoClient) or sqlite_path.
+    """
+    backend = storage_config.get('backend', 'mongodb')
+    db_logger.info(f"Using {backend} storage backend")
+
+    if backend == 'sqlite':
+        from modules.data.SQLiteDatabaseManager import SQLiteDatabaseManager
+        return SQLiteDatabaseManager(sqlite_path or storage_config.get('sqlite_path'))
+
+    if backend == 'mongodb':
+        if cache_config.get('enabled'):
+            from modules.data.CachedDatabaseManager import CachedDatabaseManager
+            return CachedDatabaseManager(cache_config, client, db_name)
+        from modules.data.DatabaseManager import DatabaseManager
+        return DatabaseManager(client, db_name)
+
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+def uses_mongodb(storage_config=STORAGE_CONFIG):
+    """Whether the configured backend needs MongoDB setup"""
+    return storage_config.get('backend', 'mongodb') == 'mongodb'
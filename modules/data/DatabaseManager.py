@@ -1,13 +1,197 @@
 # modules/data/DatabaseManager.py
-from pymongo import MongoClient
+from concurrent.futures import ThreadPoolExecutor
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import OperationFailure
 from datetime import datetime, timedelta
 from bson import ObjectId
+from config.config import HEALTH_CONFIG, INVENTORY_CONFIG, LOOKUP_CONFIG, SEARCH_CONFIG
+from modules.data.LogRollups import period_key, rollup_increments
+from modules.data.NameIndex import NameIndex, normalize_name
+from modules.data.StorageBackend import StorageBackend
 from modules.logger import db_logger
 
-class DatabaseManager:
-    def __init__(self):
-        self.client = MongoClient('mongodb://localhost:27017/')
-        self.db = self.client['home_assistant']
+# Embedded items carry normalize_name(name) as 'name_key'; name lookups match on it,
+# the same key the SQLite backend uses. It is internal and hidden from read results.
+NAME_KEY = 'name_key'
+
+_SCALAR_TYPES = frozenset((str, int, float, bool, type(None), bytes))
+_STRINGIFY_TYPES = frozenset((ObjectId, datetime))
+
+
+def _serialize_value(value):
+    """Serializes a single value, returning the same object when nothing changes"""
+    value_type = type(value)
+    if value_type in _SCALAR_TYPES:
+        return value
+    if value_type in _STRINGIFY_TYPES:
+        return str(value)
+    if value_type is dict:
+        return _serialize_dict(value)
+    if value_type is list:
+        return _serialize_list(value)
+    # Subclasses (e.g. SON, custom datetime types) take the slow path
+    if isinstance(value, (ObjectId, datetime)):
+        return str(value)
+    if isinstance(value, dict):
+        return _serialize_dict(value)
+    if isinstance(value, (list, tuple)):
+        return _serialize_list(value)
+    return value
+
+
+def _serialize_dict(doc):
+    """Copy-on-write dict serialization: only rebuilt if a nested value changed"""
+    result = None
+    for key, value in doc.items():
+        new_value = _serialize_value(value)
+        if new_value is not value and result is None:
+            result = dict(doc)
+        if result is not None:
+            result[key] = new_value
+    return doc if result is None else result
+
+
+def _serialize_list(items):
+    """Copy-on-write list serialization: scalar-only lists are returned as-is"""
+    result = None
+    for index, item in enumerate(items):
+        new_item = _serialize_value(item)
+        if new_item is not item and result is None:
+            result = list(items)
+        if result is not None:
+            result[index] = new_item
+    if result is None:
+        return items if type(items) is list else list(items)
+    return result
+
+
+def serialize_document(doc):
+    """Convert MongoDB document (or list of documents) to JSON-serializable format"""
+    return _serialize_value(doc)
+
+
+def build_projection(fields):
+    """Builds a MongoDB projection from a list of field names (None = all fields)"""
+    if not fields:
+        return None
+    if isinstance(fields, str):
+        fields = [fields]
+    return {field: 1 for field in fields}
+
+
+def build_array_projection(array_name, fields):
+    """Builds a trailing $project stage for unwound array elements (empty = all but the name key)"""
+    if not fields:
+        return [{'$project': {f"{array_name}.{NAME_KEY}": 0}}]
+    if isinstance(fields, str):
+        fields = [fields]
+    return [{'$project': {'_id': 0, **{f"{array_name}.{field}": 1 for field in fields}}}]
+
+
+# Full health history lives in health_records buckets, not on the user document
+USER_PROJECTION = {'health_records': 0}
+SHOPPING_PROJECTION = {f'items.{NAME_KEY}': 0}
+
+
+def without_name_key(item):
+    """An embedded item as returned to callers"""
+    return {k: v for k, v in item.items() if k != NAME_KEY}
+
+
+def store_health_record(db, name, record):
+    """
+    Appends a health record to the user's current monthly bucket
+    and to the fixed-size recent_health_records summary on the user document.
+    Returns False (and creates no bucket) when the user does not exist.
+    """
+    date = record['date']
+    result = db.users.update_one(
+        {'name': name},
+        {'$push': {'recent_health_records': {
+            '$each': [record],
+            '$slice': -HEALTH_CONFIG['recent_records']
+        }}}
+    )
+    if result.matched_count == 0:
+        return False
+    db.health_records.update_one(
+        {
+            'user': name,
+            'month': date.strftime('%Y-%m'),
+            'count': {'$lt': HEALTH_CONFIG['bucket_size']}
+        },
+        {
+            '$push': {'records': record},
+            '$inc': {'count': 1},
+            '$min': {'start_date': date},
+            '$max': {'end_date': date}
+        },
+        upsert=True
+    )
+    return True
+
+
+def store_log_rollups(db, logs, sign=1):
+    """Adds (or with sign=-1 removes) (title, date, details) logs to the day/week/month rollups"""
+    operations = []
+    for (period, start), rollup in rollup_increments(logs).items():
+        increments = {'count': sign * rollup['count']}
+        titles = {}
+        for category, count in rollup['categories'].items():
+            increments[f'categories.{category}'] = sign * count
+        for key, (title, count) in rollup['titles'].items():
+            increments[f'titles.{key}.count'] = sign * count
+            titles[f'titles.{key}.title'] = title
+        operations.append(UpdateOne(
+            {'_id': period_key(period, start)},
+            {'$inc': increments, '$set': {'period': period, 'start': start, **titles}},
+            upsert=True
+        ))
+    if operations:
+        db.log_rollups.bulk_write(operations, ordered=False)
+
+
+def low_stock_key(name):
+    """Field-safe key of an item in the materialized low_stock map"""
+    key = normalize_name(name).replace('.', '_').replace('$', '_')
+    return key or '_'
+
+
+def resolve_threshold(item, category_thresholds):
+    """Item threshold, falling back to its category and then the global default"""
+    if item.get('threshold') is not None:
+        return item['threshold']
+    return category_thresholds.get(item.get('category'), INVENTORY_CONFIG['default_threshold'])
+
+
+def low_stock_entry(item, category_thresholds):
+    """Materialized low_stock entry for an item, or None if it is sufficiently stocked"""
+    quantity = item.get('quantity')
+    if isinstance(quantity, bool) or not isinstance(quantity, (int, float)):
+        return None
+    threshold = resolve_threshold(item, category_thresholds)
+    if quantity >= threshold:
+        return None
+    return {
+        'name': item['name'],
+        'category': item.get('category'),
+        'quantity': quantity,
+        'threshold': threshold
+    }
+
+
+class DatabaseManager(StorageBackend):
+    """MongoDB storage backend"""
+
+    def __init__(self, client=None, db_name='home_assistant'):
+        # A client shared by several households is left open by close()
+        self._owns_client = client is None
+        self.client = client or MongoClient('mongodb://localhost:27017/')
+        self.db_name = db_name
+        self.db = self.client[db_name]
+        self._name_indexes = {}
+        # Whether the server supports multi-document transactions, checked on first use
+        self._transactions = None
 
 
 
@@ -25,14 +209,49 @@ class DatabaseManager:
 
 
 
-    def _parse_date(self, date_str, default_delta=1):
-        """Converts string to datetime with fallback"""
+    def _name_index(self, collection, array_name):
+        """Returns the fuzzy name index for an embedded array, building it on first use"""
+        key = (collection, array_name)
+        if key not in self._name_indexes:
+            names = self.db[collection].aggregate([
+                {'$unwind': f'${array_name}'},
+                {'$project': {'_id': 0, 'name': f'${array_name}.name'}}
+            ])
+            self._name_indexes[key] = NameIndex(doc.get('name') for doc in names)
+        return self._name_indexes[key]
+
+    def _index_name(self, collection, array_name, name):
+        """Adds a newly written name to an already built fuzzy index"""
+        index = self._name_indexes.get((collection, array_name))
+        if index is not None:
+            index.add(name)
+
+    def _fuzzy_match(self, collection, array_name, name, log=True):
+        """Returns (stored_name, score) of the closest stored name, or None"""
         try:
-            if isinstance(date_str, str):
-                return datetime.strptime(date_str, "%Y-%m-%d %H:%M")
-            return date_str if date_str else datetime.now() + timedelta(days=default_delta)
-        except:
-            return datetime.now() + timedelta(days=default_delta)
+            match = self._name_index(collection, array_name).best_match(
+                name, LOOKUP_CONFIG['fuzzy_threshold']
+            )
+            if match and log:
+                db_logger.info(f"Fuzzy matched '{name}' to '{match[0]}' (score={match[1]})")
+            return match
+        except Exception as e:
+            db_logger.error(f"Error fuzzy matching {name}: {e}")
+            return None
+
+    def _update_by_name(self, collection, array_name, name, update):
+        """
+        Updates an embedded array element by normalized name only.
+        Returns (update_result, closest stored name or None when nothing matched);
+        a write never acts on a fuzzy match.
+        """
+        name = self._clean_name(name)
+        result = self.db[collection].update_one(
+            {f"{array_name}.{NAME_KEY}": normalize_name(name)}, update
+        )
+        if result.matched_count > 0:
+            return result, None
+        return result, self._fuzzy_match(collection, array_name, name, log=False)
 
 
 
@@ -45,7 +264,7 @@ class DatabaseManager:
                 'role': role,
                 'age': age,
                 'health_status': 'healthy',
-                'health_records': []
+                'recent_health_records': []
             }
             result = self.db.users.insert_one(user)
             db_logger.info(f"Added user: {name}")
@@ -55,23 +274,23 @@ class DatabaseManager:
             return None
 
 
-    def get_user(self, name):
-        """Get user by name"""
+    def get_user(self, name, fields=None):
+        """Get user by name, optionally limited to the given fields"""
         try:
-            result = self.db.users.find_one({"name": name})
+            result = self.db.users.find_one({"name": name}, build_projection(fields) or USER_PROJECTION)
             return self.serialize_mongo_doc(result) if result else None
         except Exception as e:
-            db_logger.error(f"Error getting user {name}: {e}")
+            self._read_error(f"Error getting user {name}: {e}")
             return None
         
 
-    def get_all_users(self):
-        """Get all users"""
+    def get_all_users(self, fields=None):
+        """Get all users, optionally limited to the given fields"""
         try:
-            result = list(self.db.users.find({}))
+            result = list(self.db.users.find({}, build_projection(fields) or USER_PROJECTION))
             return self.serialize_mongo_doc(result)
         except Exception as e:
-            db_logger.error(f"Error getting all users: {e}")
+            self._read_error(f"Error getting all users: {e}")
             return []
         
 
@@ -80,17 +299,20 @@ class DatabaseManager:
         """Update user health status and/or add medical record"""
         try:
             if status:
-                self.db.users.update_one(
+                result = self.db.users.update_one(
                     {"name": name},
                     {"$set": {"health_status": status}}
                 )
+                if result.matched_count == 0:
+                    db_logger.warning(f"No user named {name} to update health for")
+                    return False
 
             if medical_record:
                 medical_record['date'] = datetime.now()
-                self.db.users.update_one(
-                    {"name": name},
-                    {"$push": {"health_records": medical_record}}
-                )
+                if not store_health_record(self.db, name, medical_record):
+                    db_logger.warning(f"No user named {name} to add a health record for")
+                    return False
+                self._index_records([self._health_search_item(name, medical_record)])
 
             db_logger.info(f"Updated health status for user: {name}")
             return True
@@ -99,16 +321,44 @@ class DatabaseManager:
             return False
 
 
-    def get_user_health(self, name):
-        """Get user's health status and records"""
+    def get_user_health(self, name, start_date=None, end_date=None, limit=20):
+        """Get user's health status and records (newest first) within an optional date range"""
         try:
-            user = self.get_user(name)
-            if user:
-                return {
-                    'status': user.get('health_status'),
-                    'records': user.get('health_records', [])
-                }
-            return None
+            user = self.get_user(name, fields=['health_status'])
+            if not user:
+                return None
+
+            date_range = {}
+            if start_date:
+                date_range['$gte'] = self._parse_day(start_date)
+            if end_date:
+                date_range['$lt'] = self._parse_day(end_date) + timedelta(days=1)
+
+            # Skip whole buckets outside the range before unwinding
+            bucket_match = {'user': name}
+            if '$gte' in date_range:
+                bucket_match['end_date'] = {'$gte': date_range['$gte']}
+            if '$lt' in date_range:
+                bucket_match['start_date'] = {'$lt': date_range['$lt']}
+
+            pipeline = [
+                {'$match': bucket_match},
+                {'$sort': {'start_date': -1}},
+                {'$unwind': '$records'}
+            ]
+            if date_range:
+                pipeline.append({'$match': {'records.date': date_range}})
+            pipeline += [
+                {'$sort': {'records.date': -1}}
+            ]
+            if limit is not None:
+                pipeline.append({'$limit': limit})
+            pipeline.append({'$replaceRoot': {'newRoot': '$records'}})
+            records = list(self.db.health_records.aggregate(pipeline))
+            return {
+                'status': user.get('health_status'),
+                'records': self.serialize_mongo_doc(records)
+            }
         except Exception as e:
             db_logger.error(f"Error getting health status for user {name}: {e}")
             return None
@@ -117,25 +367,102 @@ class DatabaseManager:
 
 
     # Inventory operations
-    def add_inventory_item(self, name, category, quantity, info=None):
+    def _category_thresholds(self):
+        """Per-category low-stock thresholds stored with the inventory"""
+        doc = self.db.inventory.find_one(
+            {'category_thresholds': {'$exists': True}},
+            {'_id': 0, 'category_thresholds': 1}
+        )
+        return (doc or {}).get('category_thresholds') or INVENTORY_CONFIG['category_thresholds']
+
+    def _low_stock_update(self, item, category_thresholds):
+        """Update operators that keep the item's low_stock entry in sync with its quantity"""
+        key = f"low_stock.{low_stock_key(item['name'])}"
+        entry = low_stock_entry(item, category_thresholds)
+        if entry:
+            return {'$set': {key: entry}}, entry
+        return {'$unset': {key: ''}}, None
+
+    def _supports_transactions(self):
+        """True on a replica set or sharded cluster; a standalone server has no transactions"""
+        if self._transactions is None:
+            try:
+                hello = self.client.admin.command('hello')
+                self._transactions = bool(hello.get('setName')) or hello.get('msg') == 'isdbgrid'
+            except Exception as e:
+                db_logger.warning(f"Could not detect transaction support, writing without: {e}")
+                self._transactions = False
+        return self._transactions
+
+    def _in_transaction(self, writes):
+        """
+        Runs writes(session) as one transaction where the server supports it.
+        On a standalone server the writes run one after the other (session None).
+        """
+        if not self._supports_transactions():
+            return writes(None)
+        with self.client.start_session() as session:
+            return session.with_transaction(writes)
+
+    def _inventory_write(self, filter, update, auto_add_name=None):
+        """
+        Applies an inventory update and, if it crossed the low-stock threshold
+        (auto_add_name set), adds the item to the shopping list in the same transaction
+        """
+        if not INVENTORY_CONFIG['auto_shopping_list']:
+            auto_add_name = None
+        if auto_add_name:
+            self._ensure_array_exists('shopping_list', 'items')
+
+        def writes(session):
+            result = self.db.inventory.update_one(filter, update, session=session)
+            added = bool(result.modified_count > 0 and auto_add_name and
+                         self._auto_add_to_shopping_list(auto_add_name, session))
+            return result, added
+
+        result, added = self._in_transaction(writes)
+        if added:
+            self._index_name('shopping_list', 'items', auto_add_name)
+            db_logger.info(f"Auto-added low stock item to shopping list: {auto_add_name}")
+        return result
+
+    def _auto_add_to_shopping_list(self, name, session=None):
+        """Adds a pending shopping item in a single conditional write (no duplicates by normalized name)"""
+        result = self.db.shopping_list.update_one(
+            {'items': {'$not': {'$elemMatch': {NAME_KEY: normalize_name(name), 'status': 'pending'}}}},
+            {'$push': {'items': {
+                'name': name,
+                NAME_KEY: normalize_name(name),
+                'status': 'pending',
+                'info': {'auto_added': True},
+                'added_at': datetime.now()
+            }}},
+            session=session
+        )
+        return result.modified_count > 0
+
+    def add_inventory_item(self, name, category, quantity, info=None, threshold=None):
         """Add new item to inventory"""
         try:
             self._ensure_array_exists('inventory', 'items')
             
             item = {
                 'name': name,
+                NAME_KEY: normalize_name(name),
                 'category': category,
                 'quantity': quantity,
                 'info': info or {},
                 'created_at': datetime.now()
             }
-            
-            result = self.db.inventory.update_one(
-                {},
-                {'$push': {'items': item}}
-            )
+            if threshold is not None:
+                item['threshold'] = threshold
+
+            update, low_stock = self._low_stock_update(item, self._category_thresholds())
+            update.setdefault('$push', {})['items'] = item
+            result = self._inventory_write({}, update, auto_add_name=name if low_stock else None)
             
             if result.modified_count > 0:
+                self._index_name('inventory', 'items', name)
                 db_logger.info(f"Added inventory item: {name}")
                 return True
             return False
@@ -143,43 +470,103 @@ class DatabaseManager:
             db_logger.error(f"Error adding inventory item {name}: {e}")
             return False
 
+    def _find_inventory_item(self, name, fuzzy=True):
+        """
+        Returns (item, fuzzy match or None) by normalized name, then the fuzzy index.
+        With fuzzy=False (writes) only a normalized match is returned, as (None, closest match) otherwise.
+        """
+        name = self._clean_name(name)
+        result = self.db.inventory.find_one(
+            {f"items.{NAME_KEY}": normalize_name(name)},
+            {"items.$": 1}
+        )
+        if result:
+            return result['items'][0], None
+
+        match = self._fuzzy_match('inventory', 'items', name, log=fuzzy)
+        if not match or not fuzzy:
+            return None, match
+        result = self.db.inventory.find_one(
+            {f"items.{NAME_KEY}": normalize_name(match[0])},
+            {"items.$": 1}
+        )
+        return (result['items'][0], match) if result else (None, None)
+
     def get_inventory_item(self, name):
         """Get item from inventory by name"""
         try:
-            result = self.db.inventory.find_one(
-                {"items.name": name},
-                {"items.$": 1}
-            )
-            return self.serialize_mongo_doc(result['items'][0]) if result else None
+            item, match = self._find_inventory_item(name)
+            if not item:
+                return None
+            item = self.serialize_mongo_doc(without_name_key(item))
+            if match:
+                item['matched_name'], item['match_score'] = match
+            return item
         except Exception as e:
-            db_logger.error(f"Error getting inventory item {name}: {e}")
+            self._read_error(f"Error getting inventory item {name}: {e}")
             return None
 
+    def _update_inventory_item(self, name, changes):
+        """Applies field changes to an item and refreshes its low_stock entry in one write"""
+        item, candidate = self._find_inventory_item(name, fuzzy=False)
+        if not item:
+            return None, candidate, None
+
+        category_thresholds = self._category_thresholds()
+        was_low = low_stock_entry(item, category_thresholds) is not None
+        update, low_stock = self._low_stock_update({**item, **changes}, category_thresholds)
+        update.setdefault('$set', {}).update({f"items.$.{k}": v for k, v in changes.items()})
+
+        result = self._inventory_write(
+            {"items.name": item['name']}, update, auto_add_name=item['name'] if low_stock and not was_low else None
+        )
+        return result, None, low_stock
+
     def update_inventory_quantity(self, name, new_quantity):
         """Update item quantity in inventory"""
         try:
-            result = self.db.inventory.update_one(
-                {"items.name": name},
-                {"$set": {"items.$.quantity": new_quantity}}
-            )
-            if result.modified_count > 0:
+            result, candidate, _ = self._update_inventory_item(name, {'quantity': new_quantity})
+            if result and result.modified_count > 0:
                 db_logger.info(f"Updated quantity for item: {name}")
                 return True
-            return False
+            return self._unmatched_result(candidate)
         except Exception as e:
             db_logger.error(f"Error updating quantity for item {name}: {e}")
             return False
 
-    def get_low_stock_items(self, threshold=5):
-        """Get items with low quantity"""
+    def set_inventory_threshold(self, name, threshold):
+        """Set the low-stock threshold of a single inventory item"""
         try:
-            result = list(self.db.inventory.aggregate([
-                {'$unwind': '$items'},
-                {'$match': {'items.quantity': {'$lt': threshold}}}
-            ]))
-            return self.serialize_mongo_doc(result)
+            result, candidate, _ = self._update_inventory_item(name, {'threshold': threshold})
+            if result and result.modified_count > 0:
+                db_logger.info(f"Updated low stock threshold for item: {name}")
+                return True
+            return self._unmatched_result(candidate)
+        except Exception as e:
+            db_logger.error(f"Error updating threshold for item {name}: {e}")
+            return False
+
+    def get_low_stock_items(self, threshold=None, fields=None):
+        """Get items below their low-stock threshold"""
+        try:
+            if threshold is not None:
+                # Explicit global threshold: scan the inventory
+                result = list(self.db.inventory.aggregate([
+                    {'$unwind': '$items'},
+                    {'$match': {'items.quantity': {'$lt': threshold}}}
+                ] + build_array_projection('items', fields)))
+                return self.serialize_mongo_doc(result)
+
+            doc = self.db.inventory.find_one(
+                {'low_stock': {'$exists': True}},
+                {'_id': 0, 'low_stock': 1}
+            )
+            items = list(((doc or {}).get('low_stock') or {}).values())
+            if fields:
+                items = [{k: v for k, v in item.items() if k in fields} for item in items]
+            return self.serialize_mongo_doc(items)
         except Exception as e:
-            db_logger.error(f"Error getting low stock items: {e}")
+            self._read_error(f"Error getting low stock items: {e}")
             return []
 
     # Shopping List operations
@@ -190,6 +577,7 @@ class DatabaseManager:
             
             item = {
                 'name': item_data['name'],
+                NAME_KEY: normalize_name(item_data['name']),
                 'status': item_data.get('status', 'pending'),
                 'info': item_data.get('info', {}),
                 'added_at': datetime.now()
@@ -202,6 +590,7 @@ class DatabaseManager:
             )
             
             if result.modified_count > 0:
+                self._index_name('shopping_list', 'items', item['name'])
                 db_logger.info(f"Added item to shopping list: {item['name']}")
                 return True
             return False
@@ -209,26 +598,26 @@ class DatabaseManager:
             db_logger.error(f"Error adding item to shopping list: {e}")
             return False
 
-    def get_shopping_list(self):
-        """Get entire shopping list"""
+    def get_shopping_list(self, fields=None):
+        """Get entire shopping list, optionally limited to the given fields"""
         try:
-            result = self.db.shopping_list.find_one({})
+            result = self.db.shopping_list.find_one({}, build_projection(fields) or SHOPPING_PROJECTION)
             return self.serialize_mongo_doc(result) if result else None
         except Exception as e:
-            db_logger.error(f"Error getting shopping list: {e}")
+            self._read_error(f"Error getting shopping list: {e}")
             return None
 
     def update_shopping_item_status(self, name, new_status):
         """Update shopping item status"""
         try:
-            result = self.db.shopping_list.update_one(
-                {"items.name": name},
+            result, candidate = self._update_by_name(
+                'shopping_list', 'items', name,
                 {"$set": {"items.$.status": new_status}}
             )
             if result.modified_count > 0:
                 db_logger.info(f"Updated status for shopping item: {name}")
                 return True
-            return False
+            return self._unmatched_result(candidate)
         except Exception as e:
             db_logger.error(f"Error updating shopping item status: {e}")
             return False
@@ -240,9 +629,12 @@ class DatabaseManager:
                 {"items.status": "pending"},
                 {"items": {"$elemMatch": {"status": "pending"}}}
             )
-            return self.serialize_mongo_doc(result) if result else None
+            if not result:
+                return None
+            result['items'] = [without_name_key(item) for item in result.get('items', [])]
+            return self.serialize_mongo_doc(result)
         except Exception as e:
-            db_logger.error(f"Error getting pending shopping items: {e}")
+            self._read_error(f"Error getting pending shopping items: {e}")
             return None
         
 
@@ -258,6 +650,7 @@ class DatabaseManager:
             
             task = {
                 'name': name,
+                NAME_KEY: normalize_name(name),
                 'assigned_to': assigned_to,
                 'due_date': due_date,
                 'status': 'pending',
@@ -271,6 +664,7 @@ class DatabaseManager:
             )
 
             if result.modified_count > 0:
+                self._index_name('tasks', 'tasks', name)
                 db_logger.info(f"Added new task: {name}")
                 return True
             return False
@@ -281,8 +675,8 @@ class DatabaseManager:
     def complete_task(self, name):
         """Mark task as completed"""
         try:
-            result = self.db.tasks.update_one(
-                {"tasks.name": name},
+            result, candidate = self._update_by_name(
+                'tasks', 'tasks', name,
                 {
                     "$set": {
                         "tasks.$.status": "completed",
@@ -293,25 +687,25 @@ class DatabaseManager:
             if result.modified_count > 0:
                 db_logger.info(f"Completed task: {name}")
                 return True
-            return False
+            return self._unmatched_result(candidate)
         except Exception as e:
             db_logger.error(f"Error completing task {name}: {e}")
             return False
 
-    def get_pending_tasks(self):
+    def get_pending_tasks(self, fields=None):
         """Get all pending tasks"""
         try:
             result = list(self.db.tasks.aggregate([
                 {'$unwind': '$tasks'},
                 {'$match': {'tasks.status': 'pending'}},
                 {'$sort': {'tasks.due_date': 1}}
-            ]))
+            ] + build_array_projection('tasks', fields)))
             return self.serialize_mongo_doc(result)
         except Exception as e:
-            db_logger.error(f"Error getting pending tasks: {e}")
+            self._read_error(f"Error getting pending tasks: {e}")
             return []
 
-    def get_overdue_tasks(self):
+    def get_overdue_tasks(self, fields=None):
         """Get overdue pending tasks"""
         try:
             result = list(self.db.tasks.aggregate([
@@ -320,10 +714,10 @@ class DatabaseManager:
                     'tasks.status': 'pending',
                     'tasks.due_date': {'$lt': datetime.now()}
                 }}
-            ]))
+            ] + build_array_projection('tasks', fields)))
             return self.serialize_mongo_doc(result)
         except Exception as e:
-            db_logger.error(f"Error getting overdue tasks: {e}")
+            self._read_error(f"Error getting overdue tasks: {e}")
             return []
 
     # Daily Log operations
@@ -346,13 +740,45 @@ class DatabaseManager:
 
             if result.modified_count > 0:
                 db_logger.info(f"Added daily log: {title}")
+                self._update_log_rollups([(title, log['date'], log['details'])])
+                self._index_records([self._log_search_item(title, log['date'], log['details'])])
                 return True
             return False
         except Exception as e:
             db_logger.error(f"Error adding daily log {title}: {e}")
             return False
 
-    def get_today_logs(self):
+    def add_daily_logs(self, entries):
+        """Add several daily log entries in one write, returns how many were added"""
+        try:
+            self._ensure_array_exists('daily_log', 'logs')
+
+            now = datetime.now()
+            logs = []
+            for entry in entries:
+                title, date, details = self._log_entry(entry)
+                logs.append({'title': title, 'date': date, 'details': details, 'created_at': now})
+            if not logs:
+                return 0
+
+            result = self.db.daily_log.update_one(
+                {},
+                {'$push': {'logs': {'$each': logs}}}
+            )
+
+            if result.modified_count > 0:
+                db_logger.info(f"Added {len(logs)} daily logs")
+                self._update_log_rollups([(log['title'], log['date'], log['details']) for log in logs])
+                self._index_records([
+                    self._log_search_item(log['title'], log['date'], log['details']) for log in logs
+                ])
+                return len(logs)
+            return 0
+        except Exception as e:
+            db_logger.error(f"Error adding {len(entries)} daily logs: {e}")
+            return 0
+
+    def get_today_logs(self, fields=None):
         """Get all logs from today"""
         try:
             today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
@@ -366,21 +792,29 @@ class DatabaseManager:
                         '$lt': tomorrow
                     }
                 }}
-            ]))
+            ] + build_array_projection('logs', fields)))
             return self.serialize_mongo_doc(result)
         except Exception as e:
-            db_logger.error(f"Error getting today's logs: {e}")
+            self._read_error(f"Error getting today's logs: {e}")
             return []
 
     def delete_daily_log(self, title):
         """Delete daily log entry by title"""
         try:
+            # Rollups are decremented by the removed entries
+            removed = [doc['logs'] for doc in self.db.daily_log.aggregate([
+                {'$unwind': '$logs'},
+                {'$match': {'logs.title': title}},
+                {'$project': {'_id': 0, 'logs.title': 1, 'logs.date': 1, 'logs.details': 1}}
+            ])]
             result = self.db.daily_log.update_one(
                 {},
                 {'$pull': {'logs': {'title': title}}}
             )
             if result.modified_count > 0:
                 db_logger.info(f"Deleted daily log: {title}")
+                self._update_log_rollups([(log['title'], log['date'], log.get('details')) for log in removed], sign=-1)
+                self._unindex_log(title)
                 return True
             return False
         except Exception as e:
@@ -388,7 +822,7 @@ class DatabaseManager:
             return False
             
 
-    def get_date_logs(self, date):
+    def get_date_logs(self, date, fields=None):
         """Get logs from specific date"""
         try:
             if isinstance(date, str):
@@ -403,55 +837,142 @@ class DatabaseManager:
                         '$lt': next_date
                     }
                 }}
-            ]))
+            ] + build_array_projection('logs', fields)))
             return self.serialize_mongo_doc(result)
         except Exception as e:
             db_logger.error(f"Error getting logs for date {date}: {e}")
             return []
-        
 
+    # Briefing operations
+    def _briefing_pipeline(self, now, today, limit):
+        """Single aggregation over all household collections, split with $facet"""
+        def section(array, match, sort, fields):
+            return [
+                {'$unwind': f'${array}'},
+                {'$match': {f'{array}.{k}': v for k, v in match.items()}},
+                {'$sort': {f'{array}.{sort}': 1}},
+                {'$group': {
+                    '_id': None,
+                    'count': {'$sum': 1},
+                    'items': {'$push': {f: f'${array}.{f}' for f in fields}}
+                }},
+                {'$project': {'_id': 0, 'count': 1, 'items': {'$slice': ['$items', limit]}}}
+            ]
+
+        return [
+            {'$project': {'_id': 0, 'tasks': 1}},
+            {'$unionWith': {'coll': 'shopping_list', 'pipeline': [{'$project': {'_id': 0, 'shopping': '$items'}}]}},
+            {'$unionWith': {'coll': 'inventory', 'pipeline': [{'$project': {'_id': 0, 'low_stock': {'$map': {
+                'input': {'$objectToArray': {'$ifNull': ['$low_stock', {}]}},
+                'in': '$$this.v'
+            }}}}]}},
+            {'$unionWith': {'coll': 'daily_log', 'pipeline': [{'$project': {'_id': 0, 'logs': 1}}]}},
+            {'$facet': {
+                'pending_tasks': section('tasks', {'status': 'pending'}, 'due_date',
+                                         ['name', 'assigned_to', 'due_date']),
+                'overdue_tasks': section('tasks', {'status': 'pending', 'due_date': {'$lt': now}}, 'due_date',
+                                         ['name', 'assigned_to', 'due_date']),
+                'pending_shopping_items': section('shopping', {'status': 'pending'}, 'added_at', ['name']),
+                'low_stock_items': section('low_stock', {}, 'quantity', ['name', 'quantity', 'threshold']),
+                'today_logs': section('logs', {'date': {'$gte': today, '$lt': today + timedelta(days=1)}}, 'date',
+                                      ['title', 'date'])
+            }}
+        ]
+
+    def _briefing_fan_out(self, limit):
+        """Fallback for servers without $unionWith: runs the five reads concurrently"""
+        def compact(rows, array, fields):
+            items = [{f: row.get(array, {}).get(f) for f in fields} for row in rows or []]
+            return {'count': len(items), 'items': items[:limit]}
+
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            pending = executor.submit(self.get_pending_tasks, fields=['name', 'assigned_to', 'due_date'])
+            overdue = executor.submit(self.get_overdue_tasks, fields=['name', 'assigned_to', 'due_date'])
+            shopping = executor.submit(self.get_shopping_list)
+            low_stock = executor.submit(self.get_low_stock_items, fields=['name', 'quantity', 'threshold'])
+            logs = executor.submit(self.get_today_logs, fields=['title', 'date'])
+
+            shopping_items = [
+                {'name': item.get('name')}
+                for item in (shopping.result() or {}).get('items', [])
+                if item.get('status') == 'pending'
+            ]
+            return {
+                'pending_tasks': compact(pending.result(), 'tasks', ['name', 'assigned_to', 'due_date']),
+                'overdue_tasks': compact(overdue.result(), 'tasks', ['name', 'assigned_to', 'due_date']),
+                'pending_shopping_items': {'count': len(shopping_items), 'items': shopping_items[:limit]},
+                'low_stock_items': {'count': len(low_stock.result()), 'items': low_stock.result()[:limit]},
+                'today_logs': compact(logs.result(), 'logs', ['title', 'date'])
+            }
 
-    # Utility functions
-    def _convert_units(self, value, from_unit, to_unit):
-        """
-        Convert between units
-        Supported conversions: kg<->g<->mg, l<->ml
-        """
+    def get_household_briefing(self, limit=10):
+        """Get pending/overdue tasks, pending shopping, low stock and today's logs in one call"""
         try:
-            conversions = {
-                'kg': {'g': 1000, 'mg': 1000000},
-                'l': {'ml': 1000}
-            }
-            
-            if from_unit in conversions and to_unit in conversions[from_unit]:
-                return value * conversions[from_unit][to_unit]
-            elif to_unit in conversions and from_unit in conversions[to_unit]:
-                return value / conversions[to_unit][from_unit]
-            return None
+            now = datetime.now()
+            today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+            try:
+                result = list(self.db.tasks.aggregate(
+                    self._briefing_pipeline(now, today, limit)
+                ))
+                facets = result[0] if result else {}
+                briefing = {}
+                for section, value in facets.items():
+                    briefing[section] = value[0] if value else {'count': 0, 'items': []}
+            except OperationFailure as e:
+                db_logger.warning(f"Briefing aggregation unavailable, fanning out: {e}")
+                briefing = self._briefing_fan_out(limit)
+            return self.serialize_mongo_doc(briefing)
         except Exception as e:
-            db_logger.error(f"Error converting units: {e}")
+            self._read_error(f"Error getting household briefing: {e}")
             return None
 
+    # Utility functions
     def serialize_mongo_doc(self, doc):
         """Convert MongoDB document to JSON-serializable format"""
         try:
-            if isinstance(doc, dict):
-                return {
-                    k: str(v) if isinstance(v, (ObjectId, datetime)) else
-                    self.serialize_mongo_doc(v) if isinstance(v, (dict, list)) else v
-                    for k, v in doc.items()
-                }
-            elif isinstance(doc, list):
-                return [self.serialize_mongo_doc(item) for item in doc]
-            return doc
+            return serialize_document(doc)
         except Exception as e:
             db_logger.error(f"Error serializing document: {e}")
             return None
 
+    # Log rollups
+    def _update_log_rollups(self, logs, sign=1):
+        """Applies logs to the rollups; never fails the log write that produced them"""
+        try:
+            store_log_rollups(self.db, logs, sign=sign)
+        except Exception as e:
+            db_logger.error(f"Error updating log rollups (rebuild with DatabaseSetup.rebuild_log_rollups): {e}")
+
+    def _load_log_rollup(self, key):
+        return self.db.log_rollups.find_one({'_id': key}, {'count': 1, 'categories': 1, 'titles': 1})
+
+    # Search index sources
+    def _search_index_path(self):
+        if self.db_name == 'home_assistant':
+            return SEARCH_CONFIG['path']
+        return f"{SEARCH_CONFIG['path']}-{self.db_name}"
+
+    def _searchable_records(self):
+        logs = self.db.daily_log.aggregate([
+            {'$unwind': '$logs'},
+            {'$project': {'_id': 0, 'logs': 1}}
+        ])
+        for doc in logs:
+            log = doc['logs']
+            yield self._log_search_item(log.get('title'), log.get('date'), log.get('details'))
+        records = self.db.health_records.aggregate([
+            {'$unwind': '$records'},
+            {'$project': {'_id': 0, 'user': 1, 'records': 1}}
+        ])
+        for doc in records:
+            yield self._health_search_item(doc['user'], serialize_document(doc['records']))
+
     def close(self):
         """Close MongoDB connection"""
         try:
-            self.client.close()
+            self._close_search_index()
+            if self._owns_client:
+                self.client.close()
             db_logger.info("Closed database connection")
         except Exception as e:
             db_logger.error(f"Error closing database connection: {e}")
\ No newline at end of file
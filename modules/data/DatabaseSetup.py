@@ -1,13 +1,25 @@
 # modules/data/DatabaseSetup.py
+import sys
+from datetime import datetime
 from pymongo import MongoClient
 from modules.logger import db_logger
+from config.config import INVENTORY_CONFIG, SESSION_CONFIG
+from modules.data.DatabaseManager import (
+    NAME_KEY, low_stock_entry, low_stock_key, store_health_record, store_log_rollups
+)
+from modules.data.NameIndex import normalize_name
+
+# Bump whenever collections, validators, indexes or migrations below change
+SCHEMA_VERSION = 8
 
 class DatabaseSetup:
-    def __init__(self):
-        self.client = MongoClient(
+    def __init__(self, client=None, db_name='home_assistant'):
+        # A shared client (see modules/household.py) is left open after setup
+        self._owns_client = client is None
+        self.client = client or MongoClient(
             'mongodb://localhost:27017/'
         )
-        self.db = self.client['home_assistant']
+        self.db = self.client[db_name]
 
     def create_collections(self):
         user_schema = {
@@ -20,7 +32,24 @@ class DatabaseSetup:
                         "role": {"bsonType": "string"},
                         "age": {"bsonType": "int"},
                         "health_status": {"bsonType": "string"},
-                        "health_records": {"bsonType": "array"}
+                        "recent_health_records": {"bsonType": "array"}
+                    }
+                }
+            }
+        }
+
+        health_records_schema = {
+            "validator": {
+                "$jsonSchema": {
+                    "bsonType": "object",
+                    "required": ["user", "month", "records"],
+                    "properties": {
+                        "user": {"bsonType": "string"},
+                        "month": {"bsonType": "string"},
+                        "count": {"bsonType": "int"},
+                        "start_date": {"bsonType": "date"},
+                        "end_date": {"bsonType": "date"},
+                        "records": {"bsonType": "array"}
                     }
                 }
             }
@@ -41,10 +70,13 @@ class DatabaseSetup:
                                     "name": {"bsonType": "string"},
                                     "category": {"bsonType": "string"},
                                     # quantity için spesifik tip belirtmeyelim
+                                    "threshold": {"bsonType": ["int", "double", "long"]},
                                     "info": {"bsonType": "object"}
                                 }
                             }
-                        }
+                        },
+                        "category_thresholds": {"bsonType": "object"},
+                        "low_stock": {"bsonType": "object"}
                     }
                 }
             }
@@ -118,14 +150,16 @@ class DatabaseSetup:
 
         collections = {
             'users': user_schema,
+            'health_records': health_records_schema,
             'inventory': inventory_schema,
             'tasks': tasks_schema,
             'daily_log': daily_log_schema,
             'shopping_list': shopping_list_schema 
         }
 
+        existing = set(self.db.list_collection_names())
         for name, schema in collections.items():
-            if name not in self.db.list_collection_names():
+            if name not in existing:
                 try:
                     self.db.create_collection(name, **schema)
                 except Exception as e:
@@ -139,23 +173,35 @@ class DatabaseSetup:
         self.db.users.create_index("role")
         self.db.users.create_index("health_status")
 
+        # Health records
+        self.db.health_records.create_index([("user", 1), ("start_date", -1)])
+        self.db.health_records.create_index([("user", 1), ("month", 1), ("count", 1)])
+
         # Inventory
         self.db.inventory.create_index("items.name")
+        self.db.inventory.create_index(f"items.{NAME_KEY}")
         self.db.inventory.create_index("items.category")
         self.db.inventory.create_index("categories")
 
         # Shopping List
         self.db.shopping_list.create_index("items.name")
+        self.db.shopping_list.create_index(f"items.{NAME_KEY}")
         self.db.shopping_list.create_index("items.status")
 
         # Tasks
         self.db.tasks.create_index("tasks.name")
+        self.db.tasks.create_index(f"tasks.{NAME_KEY}")
         self.db.tasks.create_index("tasks.assigned_to")
         self.db.tasks.create_index("tasks.due_date")
 
         # Daily Log
         self.db.daily_log.create_index("logs.title")
         self.db.daily_log.create_index("logs.date")
+
+        # Conversation sessions
+        self.db.conversation_sessions.create_index(
+            "updated_at", expireAfterSeconds=SESSION_CONFIG['ttl_days'] * 86400
+        )
     
 
 
@@ -177,8 +223,72 @@ class DatabaseSetup:
             upsert=True
         )
 
-    def setup(self):
+    def insert_category_thresholds(self):
+        self.db.inventory.update_one(
+            {"categories": {"$exists": True}, "category_thresholds": {"$exists": False}},
+            {"$set": {"category_thresholds": INVENTORY_CONFIG['category_thresholds']}}
+        )
+
+    def rebuild_low_stock(self):
+        """Recomputes the materialized low_stock map from current quantities and thresholds"""
+        for doc in self.db.inventory.find({"items": {"$exists": True}}):
+            category_thresholds = doc.get('category_thresholds') or INVENTORY_CONFIG['category_thresholds']
+            low_stock = {}
+            for item in doc.get('items', []):
+                entry = low_stock_entry(item, category_thresholds)
+                if entry:
+                    low_stock[low_stock_key(item['name'])] = entry
+            self.db.inventory.update_one({"_id": doc['_id']}, {"$set": {"low_stock": low_stock}})
+
+    def backfill_name_keys(self):
+        """Adds the normalized name key to embedded items written before it existed"""
+        for collection, array_name in (('inventory', 'items'), ('shopping_list', 'items'), ('tasks', 'tasks')):
+            for doc in self.db[collection].find({f"{array_name}.name": {"$exists": True}}):
+                items = doc.get(array_name) or []
+                if all(item.get(NAME_KEY) == normalize_name(item.get('name')) for item in items):
+                    continue
+                for item in items:
+                    item[NAME_KEY] = normalize_name(item.get('name'))
+                self.db[collection].update_one({"_id": doc['_id']}, {"$set": {array_name: items}})
+
+    def migrate_health_records(self):
+        """Moves health_records arrays embedded in user documents into buckets"""
+        for user in self.db.users.find({"health_records": {"$exists": True}}):
+            for record in user.get('health_records') or []:
+                if record.get('date'):
+                    store_health_record(self.db, user['name'], record)
+            self.db.users.update_one({"_id": user['_id']}, {"$unset": {"health_records": ""}})
+            print(f"Migrated health records for user: {user['name']}")
+
+    def rebuild_log_rollups(self):
+        """Recomputes the day/week/month log rollups from all daily logs"""
+        logs = self.db.daily_log.aggregate([
+            {'$unwind': '$logs'},
+            {'$project': {'_id': 0, 'logs.title': 1, 'logs.date': 1, 'logs.details': 1}}
+        ])
+        self.db.log_rollups.delete_many({})
+        store_log_rollups(self.db, [
+            (doc['logs'].get('title'), doc['logs'].get('date'), doc['logs'].get('details')) for doc in logs
+        ])
+
+    def schema_version(self):
+        """Version recorded by the last completed setup, 0 if none"""
+        doc = self.db.schema_meta.find_one({"_id": "schema"})
+        return doc.get("version", 0) if doc else 0
+
+    def mark_schema_version(self):
+        self.db.schema_meta.update_one(
+            {"_id": "schema"},
+            {"$set": {"version": SCHEMA_VERSION, "updated_at": datetime.now()}},
+            upsert=True
+        )
+
+    def setup(self, force=False):
         try:
+            if not force and self.schema_version() >= SCHEMA_VERSION:
+                db_logger.info(f"Database schema is at version {SCHEMA_VERSION}, skipping setup")
+                return
+
             print("Starting database setup...")
             
             self.create_collections()
@@ -186,9 +296,21 @@ class DatabaseSetup:
             
             self.create_indexes()
             print("Indexes created")
+
+            self.migrate_health_records()
+            self.backfill_name_keys()
             
             self.insert_initial_categories()
+            self.insert_category_thresholds()
             print("Initial categories inserted")
+
+            self.rebuild_low_stock()
+            print("Low stock view rebuilt")
+
+            self.rebuild_log_rollups()
+            print("Log rollups rebuilt")
+
+            self.mark_schema_version()
             
             print("Database setup completed successfully")
             
@@ -196,8 +318,9 @@ class DatabaseSetup:
             print(f"Error during database setup: {e}")
             raise
         finally:
-            self.client.close()
+            if self._owns_client:
+                self.client.close()
 
 if __name__ == "__main__":
     setup = DatabaseSetup()
-    setup.setup()
\ No newline at end of file
+    setup.setup(force='--force' in sys.argv)
\ No newline at end of file
@@ -0,0 +1,116 @@
+# modules/data/LogRollups.py
+import re
+from datetime import datetime, timedelta
+from config.config import ROLLUP_CONFIG
+from modules.data.NameIndex import normalize_name
+
+PERIODS = ('day', 'week', 'month')
+
+_WORD = re.compile(r'\w+')
+_CATEGORY_KEYWORDS = {
+    category: frozenset(normalize_name(keyword) for keyword in keywords)
+    for category, keywords in ROLLUP_CONFIG['categories'].items()
+}
+
+
+def period_start(period, date):
+    """First day (midnight) of the day, week (Monday) or month containing date"""
+    day = datetime(date.year, date.month, date.day)
+    if period == 'day':
+        return day
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    raise ValueError(f"Unknown rollup period: {period}")
+
+
+def period_end(period, start):
+    """First day after the period starting at start"""
+    if period == 'day':
+        return start + timedelta(days=1)
+    if period == 'week':
+        return start + timedelta(days=7)
+    return (start + timedelta(days=32)).replace(day=1)
+
+
+def period_key(period, start):
+    return f"{period}:{start:%Y-%m-%d}"
+
+
+def field_key(name):
+    """Field-safe key of a title or category in a rollup document"""
+    key = normalize_name(str(name)).replace('.', '_').replace('$', '_')
+    return key or '_'
+
+
+def log_category(title, details):
+    """Explicit details['category'], else the first configured category whose keywords appear"""
+    details = details if isinstance(details, dict) else {}
+    if details.get('category'):
+        return str(details['category'])
+    words = set(_WORD.findall(normalize_name(f"{title} {details.get('text') or ''}")))
+    for category, keywords in _CATEGORY_KEYWORDS.items():
+        if words & keywords:
+            return category
+    return 'other'
+
+
+def _as_datetime(date):
+    if isinstance(date, datetime):
+        return date
+    return datetime.fromisoformat(str(date)) if date else datetime.now()
+
+
+def rollup_increments(logs):
+    """
+    Aggregates (title, date, details) logs into rollup increments:
+    {(period, start): {'count': n, 'categories': {category: n}, 'titles': {key: [title, n]}}}
+    """
+    increments = {}
+    for title, date, details in logs:
+        date = _as_datetime(date)
+        category = field_key(log_category(title, details))
+        key = field_key(title)
+        for period in PERIODS:
+            rollup = increments.setdefault(
+                (period, period_start(period, date)),
+                {'count': 0, 'categories': {}, 'titles': {}}
+            )
+            rollup['count'] += 1
+            rollup['categories'][category] = rollup['categories'].get(category, 0) + 1
+            rollup['titles'].setdefault(key, [title, 0])[1] += 1
+    return increments
+
+
+def format_rollup(period, start, rollup, compact=False):
+    """
+    Response shape of get_log_rollup: counts by category and the most frequent
+    titles, or a one-line summary of both with compact
+    """
+    rollup = rollup or {'count': 0, 'categories': {}, 'titles': {}}
+    categories = sorted(
+        ((category, count) for category, count in rollup['categories'].items() if count > 0),
+        key=lambda item: -item[1]
+    )
+    titles = sorted(
+        ({'title': entry['title'], 'count': entry['count']} for entry in rollup['titles'].values() if entry['count'] > 0),
+        key=lambda entry: -entry['count']
+    )[:ROLLUP_CONFIG['notable_titles']]
+
+    result = {
+        'period': period,
+        'start': start.strftime('%Y-%m-%d'),
+        'end': (period_end(period, start) - timedelta(days=1)).strftime('%Y-%m-%d'),
+        'count': max(rollup['count'], 0)
+    }
+    if compact:
+        by_category = ', '.join(f"{category} {count}" for category, count in categories)
+        notable = ', '.join(f"{entry['title']} ({entry['count']}x)" for entry in titles)
+        noun = 'entry' if result['count'] == 1 else 'entries'
+        result['summary'] = f"{result['count']} {noun}" + (f": {by_category}" if by_category else '') + \
+            (f". Notable: {notable}" if notable else '')
+        return result
+    result['categories'] = dict(categories)
+    result['notable'] = titles
+    return result
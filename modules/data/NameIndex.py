@@ -0,0 +1,85 @@
+# modules/data/NameIndex.py
+import unicodedata
+
+# Turkish letters that do not decompose into base letter + combining mark
+_TURKISH_FOLDS = str.maketrans({'ı': 'i', 'İ': 'i'})
+
+
+def normalize_name(name):
+    """Case-, accent- and whitespace-insensitive form of a name"""
+    if not isinstance(name, str):
+        return ''
+    name = name.translate(_TURKISH_FOLDS).casefold()
+    name = unicodedata.normalize('NFKD', name)
+    name = ''.join(c for c in name if not unicodedata.combining(c))
+    return ' '.join(name.split())
+
+
+def _ngrams(text, n):
+    padded = f" {text} "
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+class NameIndex:
+    """In-memory n-gram index for fuzzy name lookups"""
+
+    def __init__(self, names=(), n=3):
+        self.n = n
+        self._grams_by_name = {}
+        self._names_by_gram = {}
+        self._originals = {}
+        for name in names:
+            self.add(name)
+
+    def add(self, name):
+        """Adds a name to the index"""
+        key = normalize_name(name)
+        if not key:
+            return
+        self._originals.setdefault(key, name)
+        if key in self._grams_by_name:
+            return
+        grams = _ngrams(key, self.n)
+        self._grams_by_name[key] = grams
+        for gram in grams:
+            self._names_by_gram.setdefault(gram, set()).add(key)
+
+    def remove(self, name):
+        """Removes a name from the index"""
+        key = normalize_name(name)
+        grams = self._grams_by_name.pop(key, None)
+        self._originals.pop(key, None)
+        for gram in grams or ():
+            names = self._names_by_gram.get(gram)
+            if names:
+                names.discard(key)
+
+    def best_match(self, name, threshold=0.0):
+        """Returns (stored_name, score) of the closest name, or None below threshold"""
+        key = normalize_name(name)
+        if not key:
+            return None
+        if key in self._originals:
+            return self._originals[key], 1.0
+
+        grams = _ngrams(key, self.n)
+        shared = {}
+        for gram in grams:
+            for candidate in self._names_by_gram.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+
+        best, best_score = None, 0.0
+        for candidate, count in shared.items():
+            # Dice coefficient over n-gram sets
+            score = 2 * count / (len(grams) + len(self._grams_by_name[candidate]))
+            if score > best_score:
+                best, best_score = candidate, score
+
+        if best is None or best_score < threshold:
+            return None
+        return self._originals[best], round(best_score, 3)
+
+    def __len__(self):
+        return len(self._grams_by_name)
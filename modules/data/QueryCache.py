@@ -0,0 +1,133 @@
+# modules/data/QueryCache.py
+import copy
+import threading
+import time
+from collections import OrderedDict
+from modules.logger import db_logger
+
+
+class QueryCache:
+    """
+    In-process LRU cache with per-query TTLs and hit/staleness metrics.
+    Values are copied in and out, so callers may mutate what they get back.
+    """
+
+    def __init__(self, ttls=None, default_ttl=30, max_entries=256):
+        self.ttls = ttls or {}
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        # Bumped by invalidate()/clear(); a load that straddles a bump is not cached
+        self._generations = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _query_stats(self, query):
+        stats = self._stats.get(query)
+        if stats is None:
+            stats = self._stats[query] = {
+                'hits': 0,
+                'misses': 0,
+                'invalidations': 0,
+                'evictions': 0,
+                'total_staleness': 0.0,
+                'max_staleness': 0.0
+            }
+        return stats
+
+    def get(self, query, key):
+        """Returns (found, value) for a cached query result"""
+        now = time.monotonic()
+        with self._lock:
+            stats = self._query_stats(query)
+            entry = self._entries.get((query, key))
+            if entry is None or entry['expires_at'] <= now:
+                if entry is not None:
+                    del self._entries[(query, key)]
+                stats['misses'] += 1
+                return False, None
+
+            self._entries.move_to_end((query, key))
+            staleness = now - entry['loaded_at']
+            stats['hits'] += 1
+            stats['total_staleness'] += staleness
+            stats['max_staleness'] = max(stats['max_staleness'], staleness)
+            value = entry['value']
+        return True, copy.deepcopy(value)
+
+    def generation(self, query):
+        """Invalidation count of a query, to pass to set() after a load"""
+        with self._lock:
+            return self._epoch, self._generations.get(query, 0)
+
+    def set(self, query, key, value, generation=None):
+        """
+        Stores a query result, evicting the least recently used entry if full.
+        Skipped when the query was invalidated since 'generation' was read.
+        """
+        ttl = self.ttls.get(query, self.default_ttl)
+        if ttl <= 0:
+            return
+        value = copy.deepcopy(value)
+        now = time.monotonic()
+        with self._lock:
+            if generation is not None and (self._epoch, self._generations.get(query, 0)) != generation:
+                return
+            self._entries[(query, key)] = {
+                'value': value,
+                'loaded_at': now,
+                'expires_at': now + ttl
+            }
+            self._entries.move_to_end((query, key))
+            while len(self._entries) > self.max_entries:
+                (evicted_query, _), _ = self._entries.popitem(last=False)
+                self._query_stats(evicted_query)['evictions'] += 1
+
+    def get_or_load(self, query, key, loader):
+        """Read-through lookup: returns the cached value or calls loader() and caches it; nothing is cached if it raises"""
+        found, value = self.get(query, key)
+        if found:
+            return value
+        generation = self.generation(query)
+        value = loader()
+        if value is not None:
+            self.set(query, key, value, generation)
+        return value
+
+    def invalidate(self, queries):
+        """Drops all cached entries for the given query names"""
+        queries = set(queries)
+        with self._lock:
+            stale_keys = [k for k in self._entries if k[0] in queries]
+            for k in stale_keys:
+                del self._entries[k]
+            for query in queries:
+                self._generations[query] = self._generations.get(query, 0) + 1
+                self._query_stats(query)['invalidations'] += 1
+        if stale_keys:
+            db_logger.debug(f"Invalidated {len(stale_keys)} cache entries for {sorted(queries)}")
+
+    def clear(self):
+        """Drops every cached entry"""
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+
+    def metrics(self):
+        """Returns per-query hit rates and staleness windows"""
+        with self._lock:
+            result = {}
+            for query, stats in self._stats.items():
+                lookups = stats['hits'] + stats['misses']
+                result[query] = {
+                    'hits': stats['hits'],
+                    'misses': stats['misses'],
+                    'hit_rate': stats['hits'] / lookups if lookups else 0.0,
+                    'invalidations': stats['invalidations'],
+                    'evictions': stats['evictions'],
+                    'ttl': self.ttls.get(query, self.default_ttl),
+                    'avg_staleness': stats['total_staleness'] / stats['hits'] if stats['hits'] else 0.0,
+                    'max_staleness': stats['max_staleness']
+                }
+            return {'entries': len(self._entries), 'queries': result}
@@ -0,0 +1,758 @@
+# modules/data/SQLiteDatabaseManager.py
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from config.config import HEALTH_CONFIG, INVENTORY_CONFIG, LOOKUP_CONFIG, STORAGE_CONFIG
+from modules.data.DatabaseManager import low_stock_entry, serialize_document
+from modules.data.LogRollups import period_key, rollup_increments
+from modules.data.NameIndex import NameIndex, normalize_name
+from modules.data.StorageBackend import StorageBackend
+from modules.logger import db_logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    role TEXT NOT NULL,
+    age INTEGER,
+    health_status TEXT,
+    recent_health_records TEXT NOT NULL DEFAULT '[]'
+);
+CREATE INDEX IF NOT EXISTS idx_users_name ON users(name);
+
+CREATE TABLE IF NOT EXISTS health_records (
+    id INTEGER PRIMARY KEY,
+    user TEXT NOT NULL,
+    date TEXT NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_health_records_user_date ON health_records(user, date);
+
+CREATE TABLE IF NOT EXISTS category_thresholds (
+    category TEXT PRIMARY KEY,
+    threshold NUMERIC NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS inventory_items (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    name_key TEXT NOT NULL,
+    category TEXT NOT NULL,
+    quantity,
+    threshold NUMERIC,
+    low_stock INTEGER NOT NULL DEFAULT 0,
+    info TEXT NOT NULL DEFAULT '{}',
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_inventory_name_key ON inventory_items(name_key);
+CREATE INDEX IF NOT EXISTS idx_inventory_category ON inventory_items(category);
+CREATE INDEX IF NOT EXISTS idx_inventory_low_stock ON inventory_items(low_stock) WHERE low_stock = 1;
+
+CREATE TABLE IF NOT EXISTS shopping_items (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    name_key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    info TEXT NOT NULL DEFAULT '{}',
+    added_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_shopping_name_key ON shopping_items(name_key);
+CREATE INDEX IF NOT EXISTS idx_shopping_status ON shopping_items(status, added_at);
+
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    name_key TEXT NOT NULL,
+    assigned_to TEXT,
+    due_date TEXT,
+    status TEXT NOT NULL,
+    info TEXT NOT NULL DEFAULT '{}',
+    created_at TEXT NOT NULL,
+    completed_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_name_key ON tasks(name_key);
+CREATE INDEX IF NOT EXISTS idx_tasks_status_due ON tasks(status, due_date);
+
+CREATE TABLE IF NOT EXISTS daily_logs (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    date TEXT NOT NULL,
+    details TEXT NOT NULL DEFAULT '{}',
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_daily_logs_date ON daily_logs(date);
+CREATE INDEX IF NOT EXISTS idx_daily_logs_title ON daily_logs(title);
+
+-- Day/week/month counters per period: kind 'total' (name ''), 'category' or 'title'
+CREATE TABLE IF NOT EXISTS log_rollups (
+    period_key TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    title TEXT,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (period_key, kind, name)
+) WITHOUT ROWID;
+"""
+
+
+def _ts(value):
+    """Sortable text timestamp (same format as str(datetime) with microseconds)"""
+    return value.isoformat(sep=' ', timespec='microseconds') if value else None
+
+
+def _json(value):
+    return json.dumps(value or {}, ensure_ascii=False, default=str)
+
+
+def _rollup_statements(logs, sign=1):
+    """Upserts adding (or with sign=-1 removing) (title, date, details) logs to the rollups"""
+    upsert = """INSERT INTO log_rollups (period_key, kind, name, title, count) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (period_key, kind, name) DO UPDATE
+                SET count = count + excluded.count, title = coalesce(excluded.title, title)"""
+    statements = []
+    for (period, start), rollup in rollup_increments(logs).items():
+        key = period_key(period, start)
+        statements.append((upsert, (key, 'total', '', None, sign * rollup['count'])))
+        for category, count in rollup['categories'].items():
+            statements.append((upsert, (key, 'category', category, None, sign * count)))
+        for name, (title, count) in rollup['titles'].items():
+            statements.append((upsert, (key, 'title', name, title, sign * count)))
+    if sign < 0:
+        statements.append(("DELETE FROM log_rollups WHERE count <= 0", ()))
+    return statements
+
+
+def _only(doc, fields):
+    """Applies a field projection to a plain dict"""
+    if not fields:
+        return doc
+    if isinstance(fields, str):
+        fields = [fields]
+    return {k: v for k, v in doc.items() if k in fields}
+
+
+def _with_id(fields):
+    """A field list plus '_id', which MongoDB projections always include"""
+    if not fields:
+        return fields
+    if isinstance(fields, str):
+        fields = [fields]
+    return ['_id', *fields]
+
+
+class SQLiteDatabaseManager(StorageBackend):
+    """Embedded SQLite storage backend with the DatabaseManager method surface"""
+
+    def __init__(self, path=None):
+        self.path = path or STORAGE_CONFIG['sqlite_path']
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self._lock = threading.RLock()
+        self._name_indexes = {}
+        self.setup()
+
+    def setup(self):
+        """Creates tables and indexes and enables WAL mode (idempotent)"""
+        with self._lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute("PRAGMA foreign_keys=ON")
+            self.conn.executescript(SCHEMA)
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO category_thresholds (category, threshold) VALUES (?, ?)",
+                INVENTORY_CONFIG['category_thresholds'].items()
+            )
+            # Databases created before rollups existed get them once
+            if not self.conn.execute("SELECT 1 FROM log_rollups LIMIT 1").fetchone():
+                self._rebuild_log_rollups()
+
+    def _rebuild_log_rollups(self):
+        """Recomputes the day/week/month log rollups from all daily logs"""
+        rows = self._query("SELECT title, date, details FROM daily_logs")
+        self._write([("DELETE FROM log_rollups", ())] + _rollup_statements(
+            (row['title'], row['date'], json.loads(row['details'])) for row in rows
+        ))
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def _write(self, statements):
+        """Runs (sql, params) statements in one transaction, returns the cursors"""
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursors = [self.conn.execute(sql, params) for sql, params in statements]
+                self.conn.execute("COMMIT")
+                return cursors
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def _name_index(self, table):
+        """Returns the fuzzy name index for a table, building it on first use"""
+        if table not in self._name_indexes:
+            rows = self._query(f"SELECT DISTINCT name FROM {table}")
+            self._name_indexes[table] = NameIndex(row['name'] for row in rows)
+        return self._name_indexes[table]
+
+    def _index_name(self, table, name):
+        index = self._name_indexes.get(table)
+        if index is not None:
+            index.add(name)
+
+    def _find_by_name(self, table, name, fuzzy=True):
+        """
+        Returns (row, fuzzy match or None) by normalized name, then the fuzzy index.
+        With fuzzy=False (writes) only an exact match is returned, as (None, closest match) otherwise.
+        """
+        name = self._clean_name(name)
+        rows = self._query(f"SELECT * FROM {table} WHERE name_key = ? ORDER BY id LIMIT 1", (normalize_name(name),))
+        if rows:
+            return rows[0], None
+
+        match = self._name_index(table).best_match(name, LOOKUP_CONFIG['fuzzy_threshold'])
+        if not match or not fuzzy:
+            return None, match
+        db_logger.info(f"Fuzzy matched '{name}' to '{match[0]}' (score={match[1]})")
+        rows = self._query(f"SELECT * FROM {table} WHERE name_key = ? ORDER BY id LIMIT 1", (normalize_name(match[0]),))
+        return (rows[0], match) if rows else (None, None)
+
+    # Row conversions (same shapes as the MongoDB backend)
+    def _user(self, row):
+        return {
+            '_id': str(row['id']),
+            'name': row['name'],
+            'role': row['role'],
+            'age': row['age'],
+            'health_status': row['health_status'],
+            'recent_health_records': json.loads(row['recent_health_records'])
+        }
+
+    def _item(self, row):
+        item = {
+            'name': row['name'],
+            'category': row['category'],
+            'quantity': row['quantity'],
+            'info': json.loads(row['info']),
+            'created_at': row['created_at']
+        }
+        if row['threshold'] is not None:
+            item['threshold'] = row['threshold']
+        return item
+
+    def _shopping_item(self, row):
+        return {
+            'name': row['name'],
+            'status': row['status'],
+            'info': json.loads(row['info']),
+            'added_at': row['added_at']
+        }
+
+    def _task(self, row):
+        task = {
+            'name': row['name'],
+            'assigned_to': row['assigned_to'],
+            'due_date': row['due_date'],
+            'status': row['status'],
+            'info': json.loads(row['info']),
+            'created_at': row['created_at']
+        }
+        if row['completed_at']:
+            task['completed_at'] = row['completed_at']
+        return task
+
+    def _log(self, row):
+        return {
+            'title': row['title'],
+            'date': row['date'],
+            'details': json.loads(row['details']),
+            'created_at': row['created_at']
+        }
+
+    def _unwound(self, rows, array_name, convert, fields):
+        """Mimics $unwind output: one {'_id', array_name: element} per row"""
+        if fields:
+            return [{array_name: _only(convert(row), fields)} for row in rows]
+        return [{'_id': str(row['id']), array_name: convert(row)} for row in rows]
+
+    # User operations
+    def add_user(self, name, role, age=None):
+        """Add new user to system"""
+        try:
+            cursor, = self._write([(
+                "INSERT INTO users (name, role, age, health_status) VALUES (?, ?, ?, 'healthy')",
+                (name, role, age)
+            )])
+            db_logger.info(f"Added user: {name}")
+            return str(cursor.lastrowid)
+        except Exception as e:
+            db_logger.error(f"Error adding user {name}: {e}")
+            return None
+
+    def get_user(self, name, fields=None):
+        """Get user by name, optionally limited to the given fields"""
+        try:
+            rows = self._query("SELECT * FROM users WHERE name = ? ORDER BY id LIMIT 1", (name,))
+            if not rows:
+                return None
+            user = self._user(rows[0])
+            return _only(user, _with_id(fields))
+        except Exception as e:
+            db_logger.error(f"Error getting user {name}: {e}")
+            return None
+
+    def get_all_users(self, fields=None):
+        """Get all users, optionally limited to the given fields"""
+        try:
+            rows = self._query("SELECT * FROM users ORDER BY id")
+            return [_only(self._user(row), _with_id(fields)) for row in rows]
+        except Exception as e:
+            db_logger.error(f"Error getting all users: {e}")
+            return []
+
+    def update_user_health(self, name, status=None, medical_record=None):
+        """Update user health status and/or add medical record"""
+        try:
+            if not self._query("SELECT 1 FROM users WHERE name = ? LIMIT 1", (name,)):
+                db_logger.warning(f"No user named {name} to update health for")
+                return False
+            statements = []
+            if status:
+                statements.append(("UPDATE users SET health_status = ? WHERE name = ?", (status, name)))
+
+            if medical_record:
+                medical_record['date'] = datetime.now()
+                record = serialize_document(medical_record)
+                record['date'] = _ts(medical_record['date'])
+                statements.append((
+                    "INSERT INTO health_records (user, date, record) VALUES (?, ?, ?)",
+                    (name, record['date'], _json(record))
+                ))
+                # Keep only the newest entries on the user row
+                statements.append((
+                    """UPDATE users SET recent_health_records = (
+                           SELECT json_group_array(json(record)) FROM (
+                               SELECT record FROM (
+                                   SELECT record, date FROM health_records WHERE user = ?
+                                   ORDER BY date DESC LIMIT ?
+                               ) ORDER BY date
+                           )
+                       ) WHERE name = ?""",
+                    (name, HEALTH_CONFIG['recent_records'], name)
+                ))
+
+            if statements:
+                self._write(statements)
+            if medical_record:
+                self._index_records([self._health_search_item(name, record)])
+            db_logger.info(f"Updated health status for user: {name}")
+            return True
+        except Exception as e:
+            db_logger.error(f"Error updating health status for user {name}: {e}")
+            return False
+
+    def get_user_health(self, name, start_date=None, end_date=None, limit=20):
+        """Get user's health status and records (newest first) within an optional date range"""
+        try:
+            user = self.get_user(name, fields=['health_status'])
+            if not user:
+                return None
+
+            sql = "SELECT record FROM health_records WHERE user = ?"
+            params = [name]
+            if start_date:
+                sql += " AND date >= ?"
+                params.append(_ts(self._parse_day(start_date)))
+            if end_date:
+                sql += " AND date < ?"
+                params.append(_ts(self._parse_day(end_date) + timedelta(days=1)))
+            sql += " ORDER BY date DESC"
+            if limit is not None:
+                sql += " LIMIT ?"
+                params.append(limit)
+
+            return {
+                'status': user.get('health_status'),
+                'records': [json.loads(row['record']) for row in self._query(sql, params)]
+            }
+        except Exception as e:
+            db_logger.error(f"Error getting health status for user {name}: {e}")
+            return None
+
+    # Inventory operations
+    def _category_thresholds(self):
+        rows = self._query("SELECT category, threshold FROM category_thresholds")
+        return {row['category']: row['threshold'] for row in rows} or INVENTORY_CONFIG['category_thresholds']
+
+    def _auto_add_statement(self, name):
+        """Conditional insert of a pending shopping item (no duplicates)"""
+        return (
+            """INSERT INTO shopping_items (name, name_key, status, info, added_at)
+               SELECT ?, ?, 'pending', ?, ?
+               WHERE NOT EXISTS (
+                   SELECT 1 FROM shopping_items WHERE name_key = ? AND status = 'pending'
+               )""",
+            (name, normalize_name(name), _json({'auto_added': True}), _ts(datetime.now()), normalize_name(name))
+        )
+
+    def add_inventory_item(self, name, category, quantity, info=None, threshold=None):
+        """Add new item to inventory"""
+        try:
+            item = {'name': name, 'category': category, 'quantity': quantity, 'threshold': threshold}
+            low_stock = low_stock_entry(item, self._category_thresholds()) is not None
+
+            statements = [(
+                """INSERT INTO inventory_items
+                   (name, name_key, category, quantity, threshold, low_stock, info, created_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (name, normalize_name(name), category, quantity, threshold,
+                 int(low_stock), _json(info), _ts(datetime.now()))
+            )]
+            if low_stock and INVENTORY_CONFIG['auto_shopping_list']:
+                statements.append(self._auto_add_statement(name))
+            self._write(statements)
+
+            self._index_name('inventory_items', name)
+            self._index_name('shopping_items', name)
+            db_logger.info(f"Added inventory item: {name}")
+            return True
+        except Exception as e:
+            db_logger.error(f"Error adding inventory item {name}: {e}")
+            return False
+
+    def get_inventory_item(self, name):
+        """Get item from inventory by name"""
+        try:
+            row, match = self._find_by_name('inventory_items', name)
+            if not row:
+                return None
+            item = self._item(row)
+            if match:
+                item['matched_name'], item['match_score'] = match
+            return item
+        except Exception as e:
+            db_logger.error(f"Error getting inventory item {name}: {e}")
+            return None
+
+    def _update_inventory_item(self, name, changes):
+        """Applies field changes and refreshes the low_stock flag in one transaction"""
+        row, candidate = self._find_by_name('inventory_items', name, fuzzy=False)
+        if not row:
+            return False, candidate
+
+        category_thresholds = self._category_thresholds()
+        item = {**self._item(row), **changes}
+        low_stock = low_stock_entry(item, category_thresholds) is not None
+
+        assignments = ', '.join(f"{column} = ?" for column in changes)
+        statements = [(
+            f"UPDATE inventory_items SET {assignments}, low_stock = ? WHERE id = ?",
+            (*changes.values(), int(low_stock), row['id'])
+        )]
+        if low_stock and not row['low_stock'] and INVENTORY_CONFIG['auto_shopping_list']:
+            statements.append(self._auto_add_statement(row['name']))
+            self._index_name('shopping_items', row['name'])
+        self._write(statements)
+        return True, None
+
+    def update_inventory_quantity(self, name, new_quantity):
+        """Update item quantity in inventory"""
+        try:
+            updated, candidate = self._update_inventory_item(name, {'quantity': new_quantity})
+            if updated:
+                db_logger.info(f"Updated quantity for item: {name}")
+                return True
+            return self._unmatched_result(candidate)
+        except Exception as e:
+            db_logger.error(f"Error updating quantity for item {name}: {e}")
+            return False
+
+    def set_inventory_threshold(self, name, threshold):
+        """Set the low-stock threshold of a single inventory item"""
+        try:
+            updated, candidate = self._update_inventory_item(name, {'threshold': threshold})
+            if updated:
+                db_logger.info(f"Updated low stock threshold for item: {name}")
+                return True
+            return self._unmatched_result(candidate)
+        except Exception as e:
+            db_logger.error(f"Error updating threshold for item {name}: {e}")
+            return False
+
+    def get_low_stock_items(self, threshold=None, fields=None):
+        """Get items below their low-stock threshold"""
+        try:
+            if threshold is not None:
+                rows = self._query("SELECT * FROM inventory_items WHERE quantity < ? ORDER BY id", (threshold,))
+                return self._unwound(rows, 'items', self._item, fields)
+
+            category_thresholds = self._category_thresholds()
+            rows = self._query("SELECT * FROM inventory_items WHERE low_stock = 1 ORDER BY id")
+            items = [low_stock_entry(self._item(row), category_thresholds) for row in rows]
+            return [_only(item, fields) for item in items if item]
+        except Exception as e:
+            db_logger.error(f"Error getting low stock items: {e}")
+            return []
+
+    # Shopping List operations
+    def add_to_shopping_list(self, item_data):
+        """Add item to shopping list"""
+        try:
+            name = item_data['name']
+            self._write([(
+                "INSERT INTO shopping_items (name, name_key, status, info, added_at) VALUES (?, ?, ?, ?, ?)",
+                (name, normalize_name(name), item_data.get('status', 'pending'),
+                 _json(item_data.get('info')), _ts(datetime.now()))
+            )])
+            self._index_name('shopping_items', name)
+            db_logger.info(f"Added item to shopping list: {name}")
+            return True
+        except Exception as e:
+            db_logger.error(f"Error adding item to shopping list: {e}")
+            return False
+
+    def get_shopping_list(self, fields=None):
+        """Get entire shopping list, optionally limited to the given fields"""
+        try:
+            rows = self._query("SELECT * FROM shopping_items ORDER BY id")
+            if not rows:
+                return None
+            return _only({'items': [self._shopping_item(row) for row in rows]}, fields)
+        except Exception as e:
+            db_logger.error(f"Error getting shopping list: {e}")
+            return None
+
+    def update_shopping_item_status(self, name, new_status):
+        """Update shopping item status"""
+        try:
+            row, candidate = self._find_by_name('shopping_items', name, fuzzy=False)
+            if not row:
+                return self._unmatched_result(candidate)
+            self._write([("UPDATE shopping_items SET status = ? WHERE id = ?", (new_status, row['id']))])
+            db_logger.info(f"Updated status for shopping item: {name}")
+            return True
+        except Exception as e:
+            db_logger.error(f"Error updating shopping item status: {e}")
+            return False
+
+    def get_pending_shopping_items(self):
+        """Get pending items from shopping list"""
+        try:
+            rows = self._query("SELECT * FROM shopping_items WHERE status = 'pending' ORDER BY added_at")
+            return {'items': [self._shopping_item(row) for row in rows]} if rows else None
+        except Exception as e:
+            db_logger.error(f"Error getting pending shopping items: {e}")
+            return None
+
+    # Task operations
+    def add_task(self, name, assigned_to=None, due_date=None, info=None):
+        """Add new task"""
+        try:
+            self._write([(
+                """INSERT INTO tasks (name, name_key, assigned_to, due_date, status, info, created_at)
+                   VALUES (?, ?, ?, ?, 'pending', ?, ?)""",
+                (name, normalize_name(name), assigned_to, _ts(self._parse_date(due_date)),
+                 _json(info), _ts(datetime.now()))
+            )])
+            self._index_name('tasks', name)
+            db_logger.info(f"Added new task: {name}")
+            return True
+        except Exception as e:
+            db_logger.error(f"Error adding task {name}: {e}")
+            return False
+
+    def complete_task(self, name):
+        """Mark task as completed"""
+        try:
+            row, candidate = self._find_by_name('tasks', name, fuzzy=False)
+            if not row:
+                return self._unmatched_result(candidate)
+            self._write([(
+                "UPDATE tasks SET status = 'completed', completed_at = ? WHERE id = ?",
+                (_ts(datetime.now()), row['id'])
+            )])
+            db_logger.info(f"Completed task: {name}")
+            return True
+        except Exception as e:
+            db_logger.error(f"Error completing task {name}: {e}")
+            return False
+
+    def get_pending_tasks(self, fields=None):
+        """Get all pending tasks"""
+        try:
+            rows = self._query("SELECT * FROM tasks WHERE status = 'pending' ORDER BY due_date")
+            return self._unwound(rows, 'tasks', self._task, fields)
+        except Exception as e:
+            db_logger.error(f"Error getting pending tasks: {e}")
+            return []
+
+    def get_overdue_tasks(self, fields=None):
+        """Get overdue pending tasks"""
+        try:
+            rows = self._query(
+                "SELECT * FROM tasks WHERE status = 'pending' AND due_date < ? ORDER BY due_date",
+                (_ts(datetime.now()),)
+            )
+            return self._unwound(rows, 'tasks', self._task, fields)
+        except Exception as e:
+            db_logger.error(f"Error getting overdue tasks: {e}")
+            return []
+
+    # Daily Log operations
+    def add_daily_log(self, title, details=None):
+        """Add new daily log entry"""
+        try:
+            now = _ts(datetime.now())
+            log_details = {'text': details} if details else {}
+            self._write([(
+                "INSERT INTO daily_logs (title, date, details, created_at) VALUES (?, ?, ?, ?)",
+                (title, now, _json(log_details), now)
+            )] + _rollup_statements([(title, now, log_details)]))
+            db_logger.info(f"Added daily log: {title}")
+            self._index_records([self._log_search_item(title, now, log_details)])
+            return True
+        except Exception as e:
+            db_logger.error(f"Error adding daily log {title}: {e}")
+            return False
+
+    def add_daily_logs(self, entries):
+        """Add several daily log entries in one transaction, returns how many were added"""
+        try:
+            now = _ts(datetime.now())
+            statements = []
+            logs = []
+            for entry in entries:
+                title, date, details = self._log_entry(entry)
+                logs.append((title, date, details))
+                statements.append((
+                    "INSERT INTO daily_logs (title, date, details, created_at) VALUES (?, ?, ?, ?)",
+                    (title, _ts(date), _json(details), now)
+                ))
+            if statements:
+                self._write(statements + _rollup_statements(logs))
+                db_logger.info(f"Added {len(statements)} daily logs")
+                self._index_records([self._log_search_item(*log) for log in logs])
+            return len(statements)
+        except Exception as e:
+            db_logger.error(f"Error adding {len(entries)} daily logs: {e}")
+            return 0
+
+    def _logs_between(self, start, end, fields):
+        rows = self._query(
+            "SELECT * FROM daily_logs WHERE date >= ? AND date < ? ORDER BY date",
+            (_ts(start), _ts(end))
+        )
+        return self._unwound(rows, 'logs', self._log, fields)
+
+    def get_today_logs(self, fields=None):
+        """Get all logs from today"""
+        try:
+            today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+            return self._logs_between(today, today + timedelta(days=1), fields)
+        except Exception as e:
+            db_logger.error(f"Error getting today's logs: {e}")
+            return []
+
+    def delete_daily_log(self, title):
+        """Delete daily log entry by title"""
+        try:
+            with self._lock:
+                # Rollups are decremented by the removed entries
+                removed = self._query("SELECT title, date, details FROM daily_logs WHERE title = ?", (title,))
+                if not removed:
+                    return False
+                self._write([("DELETE FROM daily_logs WHERE title = ?", (title,))] + _rollup_statements(
+                    ((row['title'], row['date'], json.loads(row['details'])) for row in removed), sign=-1
+                ))
+            db_logger.info(f"Deleted daily log: {title}")
+            self._unindex_log(title)
+            return True
+        except Exception as e:
+            db_logger.error(f"Error deleting daily log {title}: {e}")
+            return False
+
+    def get_date_logs(self, date, fields=None):
+        """Get logs from specific date"""
+        try:
+            date = self._parse_day(date)
+            return self._logs_between(date, date + timedelta(days=1), fields)
+        except Exception as e:
+            db_logger.error(f"Error getting logs for date {date}: {e}")
+            return []
+
+    # Briefing operations
+    def get_household_briefing(self, limit=10):
+        """Get pending/overdue tasks, pending shopping, low stock and today's logs in one call"""
+        try:
+            def section(rows, fields):
+                return {'count': len(rows), 'items': [_only(row, fields) for row in rows[:limit]]}
+
+            with self._lock:
+                self.conn.execute("BEGIN")
+                try:
+                    pending = [row['tasks'] for row in self.get_pending_tasks()]
+                    now = _ts(datetime.now())
+                    overdue = [task for task in pending if task['due_date'] and task['due_date'] < now]
+                    shopping = (self.get_pending_shopping_items() or {}).get('items', [])
+                    low_stock = self.get_low_stock_items()
+                    logs = [row['logs'] for row in self.get_today_logs()]
+                finally:
+                    self.conn.execute("COMMIT")
+
+            task_fields = ['name', 'assigned_to', 'due_date']
+            return {
+                'pending_tasks': section(pending, task_fields),
+                'overdue_tasks': section(overdue, task_fields),
+                'pending_shopping_items': section(shopping, ['name']),
+                'low_stock_items': section(low_stock, ['name', 'quantity', 'threshold']),
+                'today_logs': section(logs, ['title', 'date'])
+            }
+        except Exception as e:
+            db_logger.error(f"Error getting household briefing: {e}")
+            return None
+
+    # Utility functions
+    def serialize_mongo_doc(self, doc):
+        """Convert document to JSON-serializable format"""
+        try:
+            return serialize_document(doc)
+        except Exception as e:
+            db_logger.error(f"Error serializing document: {e}")
+            return None
+
+    # Log rollups
+    def _load_log_rollup(self, key):
+        rows = self._query("SELECT kind, name, title, count FROM log_rollups WHERE period_key = ?", (key,))
+        if not rows:
+            return None
+        rollup = {'count': 0, 'categories': {}, 'titles': {}}
+        for row in rows:
+            if row['kind'] == 'total':
+                rollup['count'] = row['count']
+            elif row['kind'] == 'category':
+                rollup['categories'][row['name']] = row['count']
+            else:
+                rollup['titles'][row['name']] = {'title': row['title'], 'count': row['count']}
+        return rollup
+
+    # Search index sources
+    def _search_index_path(self):
+        return f"{self.path}-search"
+
+    def _searchable_records(self):
+        for row in self._query("SELECT title, date, details FROM daily_logs ORDER BY id"):
+            yield self._log_search_item(row['title'], row['date'], json.loads(row['details']))
+        for row in self._query("SELECT user, record FROM health_records ORDER BY id"):
+            yield self._health_search_item(row['user'], json.loads(row['record']))
+
+    def close(self):
+        """Close SQLite connection"""
+        try:
+            self._close_search_index()
+            with self._lock:
+                self.conn.close()
+            db_logger.info("Closed database connection")
+        except Exception as e:
+            db_logger.error(f"Error closing database connection: {e}")
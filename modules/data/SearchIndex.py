@@ -0,0 +1,270 @@
+# modules/data/SearchIndex.py
+import json
+import math
+import os
+import re
+import threading
+import zlib
+import numpy as np
+from modules.data.NameIndex import normalize_name
+
+_WORD = re.compile(r'\w+')
+
+# Words that carry no meaning for retrieval (questions are phrased around them)
+STOPWORDS = frozenset("""
+    a an and are at be been by did do does for from had has have he her him his how i in is it its
+    last me my of on or our she so that the their them they this to was we were what when where
+    which who why will with you your
+""".split())
+
+KINDS = ('log', 'health')
+
+
+def tokenize(text):
+    """Normalized content words of a text, with a light plural fold"""
+    text = text.lower() if text.isascii() else normalize_name(text)
+    tokens = []
+    for word in _WORD.findall(text):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+class SearchIndex:
+    """
+    Hashed TF-IDF index over daily logs and health records.
+
+    Each entry is an L2-normalized column (signed feature hashing, sublinear
+    term frequency) of a float32 matrix kept in a memory-mapped file. The matrix
+    is stored bucket-major, so a query reads only the rows of the buckets its
+    words hash to instead of the whole matrix. IDF is applied on the query side
+    from per-bucket document frequencies, which keeps stored columns valid as
+    the corpus grows. The best candidates are re-ranked on exact token overlap
+    to undo hash collisions; near-ties prefer newer entries.
+
+    Files in the index directory:
+        vectors.f32     dimensions x capacity matrix, capacity grown by doubling
+        entries.jsonl   one line per column ({"deleted": key} lines are tombstones)
+        state.json      {"built": true} once filled from the database
+    """
+
+    def __init__(self, path, dimensions=256, candidates=50):
+        self.path = path
+        self.dimensions = dimensions
+        self.candidates = candidates
+        self._lock = threading.RLock()
+        self._buckets = {}
+        os.makedirs(path, exist_ok=True)
+        self._vectors_path = os.path.join(path, 'vectors.f32')
+        self._entries_path = os.path.join(path, 'entries.jsonl')
+        self._state_path = os.path.join(path, 'state.json')
+        self._load()
+
+    # Persistence
+    def _load(self):
+        state = {}
+        if os.path.exists(self._state_path):
+            with open(self._state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        if state.get('dimensions', self.dimensions) != self.dimensions:
+            # Stored vectors use another hashing width; start over and rebuild
+            self._remove_files()
+            state = {}
+        self.built = state.get('built', False)
+
+        self.entries = []
+        self._rows_by_key = {}
+        if os.path.exists(self._entries_path):
+            valid_bytes = 0
+            with open(self._entries_path, 'rb') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    valid_bytes += len(line)
+                    if 'deleted' in record:
+                        for row in self._rows_by_key.pop(record['deleted'], ()):
+                            self.entries[row] = None
+                        continue
+                    self._rows_by_key.setdefault(record['key'], []).append(len(self.entries))
+                    self.entries.append(record)
+            # A torn last line would corrupt the next append
+            if valid_bytes < os.path.getsize(self._entries_path):
+                with open(self._entries_path, 'r+b') as f:
+                    f.truncate(valid_bytes)
+
+        # The file's capacity is kept: rows are laid out capacity columns apart
+        count = len(self.entries)
+        capacity = 1024
+        if os.path.exists(self._vectors_path):
+            capacity = max(capacity, os.path.getsize(self._vectors_path) // (self.dimensions * 4))
+        self._vectors = self._open_vectors(capacity)
+        self._vectors[:, count:] = 0
+        kind_codes = {None: 0, **{kind: code for code, kind in enumerate(KINDS, 1)}}
+        self._kinds = np.zeros(capacity, dtype=np.int8)
+        self._kinds[:count] = [kind_codes[entry and entry['kind']] for entry in self.entries]
+        self._df = np.count_nonzero(self._vectors[:, :count], axis=1).astype(np.float32)
+
+    def _open_vectors(self, capacity, path=None):
+        path = path or self._vectors_path
+        size = capacity * self.dimensions * 4
+        with open(path, 'r+b' if os.path.exists(path) else 'w+b') as f:
+            if os.path.getsize(path) != size:
+                f.truncate(size)
+        return np.memmap(path, dtype=np.float32, mode='r+', shape=(self.dimensions, capacity))
+
+    def _grow(self, needed):
+        capacity = len(self._kinds)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        # Bucket-major rows change length, so the matrix is copied into a new file
+        count = len(self.entries)
+        grown_path = self._vectors_path + '.grow'
+        grown = self._open_vectors(capacity, grown_path)
+        grown[:, :count] = self._vectors[:, :count]
+        grown.flush()
+        del grown, self._vectors
+        os.replace(grown_path, self._vectors_path)
+        self._vectors = self._open_vectors(capacity)
+        self._kinds = np.concatenate([self._kinds, np.zeros(capacity - len(self._kinds), dtype=np.int8)])
+
+    def flush(self):
+        """Writes the vector pages to disk"""
+        with self._lock:
+            self._vectors.flush()
+
+    def mark_built(self):
+        with self._lock:
+            self.built = True
+            with open(self._state_path, 'w', encoding='utf-8') as f:
+                json.dump({'built': True, 'dimensions': self.dimensions}, f)
+
+    def clear(self):
+        """Drops all entries (before a rebuild)"""
+        with self._lock:
+            del self._vectors
+            self._remove_files()
+            self._load()
+
+    def _remove_files(self):
+        for path in (self._vectors_path, self._entries_path, self._state_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    # Vectorizing
+    def _bucket(self, token):
+        """(bucket, sign) of a token"""
+        bucket = self._buckets.get(token)
+        if bucket is None:
+            h = zlib.crc32(token.encode('utf-8'))
+            bucket = self._buckets[token] = (h % self.dimensions, 1.0 if h & 0x80000000 else -1.0)
+        return bucket
+
+    def _vectorize(self, texts):
+        """dimensions x len(texts) block of normalized entry vectors"""
+        rows, columns, values = [], [], []
+        for column, text in enumerate(texts):
+            counts = {}
+            for token in tokenize(text):
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                bucket, sign = self._bucket(token)
+                rows.append(bucket)
+                columns.append(column)
+                values.append(sign * (1.0 + math.log(count)))
+        # Tokens of one entry may share a bucket, so values are summed, not assigned
+        flat = np.asarray(rows, dtype=np.int64) * len(texts) + np.asarray(columns, dtype=np.int64)
+        block = np.bincount(flat, weights=values, minlength=self.dimensions * len(texts))
+        block = block.reshape(self.dimensions, len(texts)).astype(np.float32)
+        norms = np.linalg.norm(block, axis=0)
+        norms[norms == 0] = 1.0
+        return block / norms
+
+    def _idf(self, bucket):
+        return math.log((1 + len(self.entries)) / (1 + self._df[bucket])) + 1.0
+
+    # Updates
+    def add(self, kind, key, text, date, doc):
+        """Adds one entry; key identifies it for delete() and rebuilds"""
+        return self.add_many([(kind, key, text, date, doc)])
+
+    def add_many(self, items):
+        """Adds (kind, key, text, date, doc) tuples, returns how many were added"""
+        if not items:
+            return 0
+        block = self._vectorize([item[2] for item in items])
+        with self._lock:
+            start = len(self.entries)
+            self._grow(start + len(items))
+            self._vectors[:, start:start + len(items)] = block
+            self._df += np.count_nonzero(block, axis=1)
+            lines = []
+            for row, (kind, key, text, date, doc) in enumerate(items, start):
+                entry = {'kind': kind, 'key': key, 'date': date, 'text': text, 'doc': doc}
+                self._kinds[row] = KINDS.index(kind) + 1
+                self._rows_by_key.setdefault(key, []).append(row)
+                self.entries.append(entry)
+                lines.append(json.dumps(entry, ensure_ascii=False, default=str))
+            # Vectors first: a crash before this append leaves unreferenced columns only
+            with open(self._entries_path, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+            return len(lines)
+
+    def delete(self, key):
+        """Removes all entries with this key"""
+        with self._lock:
+            rows = self._rows_by_key.pop(key, None)
+            if not rows:
+                return 0
+            for row in rows:
+                self._df -= self._vectors[:, row] != 0
+                self._vectors[:, row] = 0
+                self._kinds[row] = 0
+                self.entries[row] = None
+            with open(self._entries_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({'deleted': key}, ensure_ascii=False) + '\n')
+            return len(rows)
+
+    # Queries
+    def search(self, query, limit=5, kind=None):
+        """Returns [(score, entry)] of the best matches, best first"""
+        tokens = set(tokenize(query))
+        if not tokens:
+            return []
+        with self._lock:
+            count = len(self.entries)
+            if not count:
+                return []
+            weights = {}
+            query_weights = {}
+            for token in tokens:
+                bucket, sign = self._bucket(token)
+                weights[token] = self._idf(bucket)
+                query_weights[bucket] = query_weights.get(bucket, 0.0) + sign * weights[token]
+            buckets = list(query_weights)
+            scores = np.asarray(list(query_weights.values()), dtype=np.float32) @ self._vectors[buckets, :count]
+            kinds = self._kinds[:count]
+            scores[kinds != KINDS.index(kind) + 1 if kind else kinds == 0] = 0
+
+            # Newer entries win near-ties (rows are in insertion order)
+            scores += (scores > 0) * np.linspace(0, 1e-4, count, dtype=np.float32)
+            candidates = min(count, max(self.candidates, limit * 4))
+            top = np.argpartition(-scores, candidates - 1)[:candidates]
+            entries = [self.entries[row] for row in top if scores[row] > 0]
+
+        # Exact re-rank: only query tokens really present in the entry count
+        results = []
+        for entry in entries:
+            entry_tokens = tokenize(entry['text'])
+            matched = tokens.intersection(entry_tokens)
+            if matched:
+                score = sum(weights[token] for token in matched) / math.sqrt(len(entry_tokens))
+                results.append((round(score, 3), entry))
+        results.sort(key=lambda result: (result[0], str(result[1]['date'])), reverse=True)
+        return results[:limit]
@@ -0,0 +1,156 @@
+# modules/data/SessionStore.py
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from pymongo import MongoClient, UpdateOne
+from modules.logger import db_logger
+
+
+class SessionStore:
+    """
+    Conversation messages per session key (household/user/session id).
+
+    Recently used sessions live in a bounded LRU; everything else lives in a
+    MongoDB collection. Sessions are loaded on first access and written back
+    in batches by a background flusher, so a turn never waits on the database
+    and memory stays bounded by max_sessions however many keys exist.
+    With persistent=False (no MongoDB) only the in-memory tier is used.
+    The collection is given directly, or taken from db_name on the given
+    (usually shared) client; only a client the store opened itself is closed.
+    """
+
+    def __init__(self, collection=None, client=None, db_name='home_assistant', max_sessions=500, max_messages=14,
+                 flush_interval=5, persistent=True):
+        self.persistent = persistent
+        self.client = None
+        if collection is None and persistent:
+            if client is None:
+                client = self.client = MongoClient('mongodb://localhost:27017/')
+            collection = client[db_name]['conversation_sessions']
+        self.collection = collection
+        self.max_sessions = max_sessions
+        self.max_messages = max_messages
+        self.flush_interval = flush_interval
+
+        self._sessions = OrderedDict()
+        self._dirty = {}        # key -> messages awaiting write-back (evicted ones included)
+        self._flushing = {}     # batch currently being written
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flusher = None
+        self.metrics = {'hits': 0, 'loads': 0, 'evictions': 0, 'flushed': 0}
+
+    def _trim(self, messages):
+        messages = [m for m in messages if isinstance(m, dict) and m.get('role') != 'system']
+        return messages[-self.max_messages:] if self.max_messages else messages
+
+    def _remember(self, key, messages):
+        self._sessions[key] = messages
+        self._sessions.move_to_end(key)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.metrics['evictions'] += 1
+
+    def get(self, key):
+        """Returns the session's messages, loading them on a miss"""
+        with self._lock:
+            if key in self._sessions:
+                self._sessions.move_to_end(key)
+                self.metrics['hits'] += 1
+                return list(self._sessions[key])
+            # Evicted before its write-back reached the database
+            pending = self._dirty.get(key, self._flushing.get(key))
+            if pending is not None:
+                self._remember(key, pending)
+                return list(pending)
+            if not self.persistent:
+                self._remember(key, [])
+                return []
+
+        try:
+            doc = self.collection.find_one({"_id": key}, {"messages": 1})
+            messages = self._trim(doc.get('messages', [])) if doc else []
+        except Exception as e:
+            db_logger.error(f"Error loading session {key}: {e}")
+            messages = []
+
+        with self._lock:
+            self.metrics['loads'] += 1
+            # A put() may have raced with the load; it wins
+            if key in self._sessions:
+                return list(self._sessions[key])
+            self._remember(key, messages)
+        return list(messages)
+
+    def put(self, key, conversation_history):
+        """Stores the session's messages; written back on the next flush"""
+        messages = self._trim(conversation_history)
+        with self._lock:
+            self._remember(key, messages)
+            if not self.persistent:
+                return
+            self._dirty[key] = messages
+            backlog = len(self._dirty)
+        # Keep write-back memory bounded too if the flusher falls behind
+        if backlog > self.max_sessions:
+            self.flush()
+
+    def delete(self, key):
+        with self._lock:
+            self._sessions.pop(key, None)
+            self._dirty.pop(key, None)
+        if not self.persistent:
+            return
+        try:
+            self.collection.delete_one({"_id": key})
+        except Exception as e:
+            db_logger.error(f"Error deleting session {key}: {e}")
+
+    def flush(self):
+        """Writes all pending sessions in one bulk upsert"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._dirty = self._dirty, {}
+                self._flushing = pending
+            if not pending:
+                return 0
+            now = datetime.now()
+            try:
+                self.collection.bulk_write([
+                    UpdateOne({"_id": key}, {"$set": {"messages": messages, "updated_at": now}}, upsert=True)
+                    for key, messages in pending.items()
+                ], ordered=False)
+                self.metrics['flushed'] += len(pending)
+                return len(pending)
+            except Exception as e:
+                db_logger.error(f"Error flushing {len(pending)} sessions: {e}")
+                with self._lock:
+                    # Keep newer puts, retry the rest on the next flush
+                    for key, messages in pending.items():
+                        self._dirty.setdefault(key, messages)
+                return 0
+            finally:
+                with self._lock:
+                    self._flushing = {}
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def start(self):
+        """Starts the background write-behind flusher"""
+        if self._flusher is None and self.persistent:
+            self._flusher = threading.Thread(target=self._flush_loop, name="session-flusher", daemon=True)
+            self._flusher.start()
+        return self
+
+    def close(self):
+        self._stop.set()
+        if self._flusher:
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+        if self.client:
+            self.client.close()
+        db_logger.info("Session store closed")
@@ -0,0 +1,324 @@
+# modules/data/StorageBackend.py
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from config.config import SEARCH_CONFIG
+from modules.data.LogRollups import format_rollup, period_key, period_start
+from modules.logger import db_logger
+
+# Guards opening and building the search index of a backend
+_SEARCH_LOCK = threading.Lock()
+# Per-thread count of reads that failed and returned a fallback value
+_failed_reads = threading.local()
+
+
+def _short_date(date):
+    """YYYY-MM-DD HH:MM form of a datetime or stored timestamp string"""
+    if isinstance(date, datetime):
+        return date.strftime('%Y-%m-%d %H:%M')
+    return str(date)[:16] if date else None
+
+
+def _flatten_text(value):
+    """All string and number values of a (nested) document joined into one text"""
+    if isinstance(value, dict):
+        return ' '.join(_flatten_text(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return ' '.join(_flatten_text(v) for v in value)
+    if isinstance(value, (str, int, float)) and not isinstance(value, bool):
+        return str(value)
+    return ''
+
+
+class StorageBackend(ABC):
+    """
+    Method surface shared by all storage backends.
+    The names, parameters and return shapes below are what the assistant calls
+    through db_calls, so every backend must implement all of them; a backend
+    missing one fails when it is constructed.
+    """
+
+    # User operations
+    @abstractmethod
+    def add_user(self, name, role, age=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_user(self, name, fields=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_all_users(self, fields=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def update_user_health(self, name, status=None, medical_record=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_user_health(self, name, start_date=None, end_date=None, limit=20):
+        raise NotImplementedError
+
+    # Inventory operations
+    @abstractmethod
+    def add_inventory_item(self, name, category, quantity, info=None, threshold=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_inventory_item(self, name):
+        raise NotImplementedError
+
+    @abstractmethod
+    def update_inventory_quantity(self, name, new_quantity):
+        raise NotImplementedError
+
+    @abstractmethod
+    def set_inventory_threshold(self, name, threshold):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_low_stock_items(self, threshold=None, fields=None):
+        raise NotImplementedError
+
+    # Shopping List operations
+    @abstractmethod
+    def add_to_shopping_list(self, item_data):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_shopping_list(self, fields=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def update_shopping_item_status(self, name, new_status):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_pending_shopping_items(self):
+        raise NotImplementedError
+
+    # Task operations
+    @abstractmethod
+    def add_task(self, name, assigned_to=None, due_date=None, info=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def complete_task(self, name):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_pending_tasks(self, fields=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_overdue_tasks(self, fields=None):
+        raise NotImplementedError
+
+    # Daily Log operations
+    @abstractmethod
+    def add_daily_log(self, title, details=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def add_daily_logs(self, entries):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_today_logs(self, fields=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_daily_log(self, title):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_date_logs(self, date, fields=None):
+        raise NotImplementedError
+
+    def get_log_rollup(self, period='week', date=None, compact=False):
+        """Log counts by category and notable titles for the day/week/month containing date"""
+        try:
+            if isinstance(date, str) and len(date) == 7:
+                date += '-01'  # YYYY-MM
+            start = period_start(period, self._parse_day(date) if date else datetime.now())
+            return format_rollup(period, start, self._load_log_rollup(period_key(period, start)), compact)
+        except Exception as e:
+            self._read_error(f"Error getting {period} log rollup for {date}: {e}")
+            return None
+
+    # Briefing operations
+    @abstractmethod
+    def get_household_briefing(self, limit=10):
+        raise NotImplementedError
+
+    # Search operations
+    def search_records(self, query, limit=5, kind=None):
+        """Daily logs and health records best matching a free-text query, best first"""
+        try:
+            index = self._search_index()
+            if index is None:
+                return []
+            if not index.built:
+                self._build_search_index(index)
+            return [
+                {'kind': entry['kind'], 'score': round(score, 3), **entry['doc']}
+                for score, entry in index.search(query, limit, kind)
+            ]
+        except Exception as e:
+            db_logger.error(f"Error searching records for '{query}': {e}")
+            return []
+
+    @abstractmethod
+    def close(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def _load_log_rollup(self, key):
+        """Stored rollup {'count', 'categories', 'titles': {key: {'title', 'count'}}} or None"""
+        raise NotImplementedError
+
+    # Search index helpers
+    @abstractmethod
+    def _search_index_path(self):
+        """Directory of this backend's search index"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def _searchable_records(self):
+        """Yields search items for every stored daily log and health record"""
+        raise NotImplementedError
+
+    def _search_index(self):
+        """The backend's search index, opened on first use (None when disabled)"""
+        if not SEARCH_CONFIG['enabled']:
+            return None
+        index = getattr(self, '_search', None)
+        if index is None:
+            with _SEARCH_LOCK:
+                index = getattr(self, '_search', None)
+                if index is None:
+                    # numpy is only imported once search is used
+                    from modules.data.SearchIndex import SearchIndex
+                    index = self._search = SearchIndex(
+                        self._search_index_path(),
+                        SEARCH_CONFIG['dimensions'],
+                        SEARCH_CONFIG['candidates']
+                    )
+        return index
+
+    def _build_search_index(self, index):
+        """Fills the index from the database on first search"""
+        with _SEARCH_LOCK:
+            if index.built:
+                return
+            index.clear()
+            items = list(self._searchable_records())
+            for start in range(0, len(items), 1000):
+                index.add_many(items[start:start + 1000])
+            index.flush()
+            index.mark_built()
+            db_logger.info(f"Built search index with {len(items)} entries")
+
+    def _index_records(self, items):
+        """Adds search items to a built index; never fails the write that produced them"""
+        try:
+            index = self._search_index()
+            if index is not None and index.built:
+                index.add_many(items)
+        except Exception as e:
+            db_logger.error(f"Error updating search index: {e}")
+
+    def _unindex_log(self, title):
+        try:
+            index = self._search_index()
+            if index is not None and index.built:
+                index.delete(f"log:{title}")
+        except Exception as e:
+            db_logger.error(f"Error updating search index: {e}")
+
+    def _close_search_index(self):
+        index = getattr(self, '_search', None)
+        if index is not None:
+            index.flush()
+
+    def _log_search_item(self, title, date, details):
+        """(kind, key, text, date, doc) search item of a daily log entry"""
+        date = _short_date(date)
+        doc = {'title': title, 'date': date, 'details': details or {}}
+        return 'log', f"log:{title}", f"{title} {_flatten_text(details)}", date, doc
+
+    def _health_search_item(self, name, record):
+        """(kind, key, text, date, doc) search item of a health record"""
+        date = _short_date(record.get('date'))
+        fields = {k: v for k, v in record.items() if k != 'date'}
+        doc = {'user': name, 'date': date, 'record': fields}
+        return 'health', f"health:{name}:{date}", f"{name} {_flatten_text(fields)}", date, doc
+
+    # Shared helpers
+    def _read_error(self, message):
+        """Logs a failed read; its fallback result ([] or None) is not real data and must not be cached"""
+        db_logger.error(message)
+        _failed_reads.count = self.failed_reads() + 1
+
+    @staticmethod
+    def failed_reads():
+        """Number of reads that have failed on the calling thread"""
+        return getattr(_failed_reads, 'count', 0)
+
+    def _clean_name(self, name):
+        """Strips surrounding and repeated whitespace from a lookup name"""
+        return ' '.join(name.split()) if isinstance(name, str) else name
+
+    def _unmatched_result(self, candidate):
+        """
+        Result of a write whose name matched nothing: False, or the closest
+        stored name for the caller to confirm. Writes never act on a fuzzy match.
+        """
+        if not candidate:
+            return False
+        return {'success': False, 'did_you_mean': candidate[0], 'match_score': candidate[1]}
+
+    def _parse_day(self, date):
+        """Converts a YYYY-MM-DD string to datetime"""
+        if isinstance(date, str):
+            return datetime.strptime(date, '%Y-%m-%d')
+        return date
+
+    def _parse_date(self, date_str, default_delta=1):
+        """Converts string to datetime with fallback"""
+        try:
+            if isinstance(date_str, str):
+                return datetime.strptime(date_str, "%Y-%m-%d %H:%M")
+            return date_str if date_str else datetime.now() + timedelta(days=default_delta)
+        except:
+            return datetime.now() + timedelta(days=default_delta)
+
+    def _log_entry(self, entry):
+        """Normalizes a batch log entry to (title, date, details dict)"""
+        details = entry.get('details')
+        if not isinstance(details, dict):
+            details = {'text': details} if details else {}
+        date = entry.get('date') or datetime.now()
+        if isinstance(date, str):
+            date = datetime.fromisoformat(date)
+        return entry['title'], date, details
+
+    def _convert_units(self, value, from_unit, to_unit):
+        """
+        Convert between units
+        Supported conversions: kg<->g<->mg, l<->ml
+        """
+        try:
+            conversions = {
+                'kg': {'g': 1000, 'mg': 1000000},
+                'l': {'ml': 1000}
+            }
+            
+            if from_unit in conversions and to_unit in conversions[from_unit]:
+                return value * conversions[from_unit][to_unit]
+            elif to_unit in conversions and from_unit in conversions[to_unit]:
+                return value / conversions[to_unit][from_unit]
+            return None
+        except Exception as e:
+            db_logger.error(f"Error converting units: {e}")
+            return None
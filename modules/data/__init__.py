@@ -1,3 +1,12 @@
 # data/__init__.py
+from .StorageBackend import *
 from .DatabaseManager import *
-from .DatabaseSetup import *
\ No newline at end of file
+from .DatabaseSetup import *
+from .QueryCache import *
+from .CachedDatabaseManager import *
+from .NameIndex import *
+from .LogRollups import *
+from .SQLiteDatabaseManager import *
+from .DatabaseFactory import *
+from .AsyncDatabaseManager import *
+from .SessionStore import *
@@ -0,0 +1,246 @@
+# modules/event_ingest.py
+import asyncio
+import fnmatch
+import json
+import threading
+import time
+from datetime import datetime
+from config.config import EVENT_INGEST_CONFIG, HA_CONFIG, HA_TOKEN
+from modules.logger import ha_logger
+
+IGNORED_STATES = ('unavailable', 'unknown', None)
+
+
+def normalize_event(event):
+    """
+    Reduces a Home Assistant state_changed event (or the flat webhook form
+    {"entity_id", "from", "to", "name"?, "time"?}) to one dict, None if unusable
+    """
+    if not isinstance(event, dict):
+        return None
+    if 'data' in event:
+        data = event.get('data') or {}
+        old_state = data.get('old_state') or {}
+        new_state = data.get('new_state') or {}
+        attributes = new_state.get('attributes') or old_state.get('attributes') or {}
+        event = {
+            'entity_id': data.get('entity_id'),
+            'from': old_state.get('state'),
+            'to': new_state.get('state'),
+            'name': attributes.get('friendly_name'),
+            'time': event.get('time_fired') or new_state.get('last_changed')
+        }
+    if not event.get('entity_id'):
+        return None
+
+    occurred = event.get('time')
+    try:
+        # HA sends UTC with an offset; logs are stored in local time like add_daily_log
+        occurred = datetime.fromisoformat(occurred).astimezone().replace(tzinfo=None) if occurred else None
+    except (TypeError, ValueError):
+        occurred = None
+    return {
+        'entity_id': event['entity_id'],
+        'from': event.get('from'),
+        'to': event.get('to'),
+        'name': event.get('name') or event['entity_id'],
+        'time': occurred or datetime.now()
+    }
+
+
+def _state_matches(expected, state):
+    if expected is None:
+        return True
+    return state in expected if isinstance(expected, (list, tuple)) else state == expected
+
+
+class EventRule:
+    """One entry of EVENT_INGEST_CONFIG['rules']"""
+
+    def __init__(self, rule, default_debounce):
+        self.name = rule['name']
+        self.entity_pattern = rule.get('entity_id', '*')
+        self.from_state = rule.get('from')
+        self.to_state = rule.get('to')
+        self.title = rule['title']
+        self.category = rule.get('category')
+        self.debounce = rule.get('debounce', default_debounce)
+
+    def matches(self, event):
+        if event['from'] in IGNORED_STATES or event['to'] in IGNORED_STATES or event['from'] == event['to']:
+            return False
+        return (
+            fnmatch.fnmatchcase(event['entity_id'], self.entity_pattern)
+            and _state_matches(self.from_state, event['from'])
+            and _state_matches(self.to_state, event['to'])
+        )
+
+
+class EventIngestor:
+    """
+    Turns Home Assistant events into daily log entries without the LLM.
+
+    Events are matched against rules; a burst of matching events for the same
+    rule and entity is coalesced into one entry that is finalized once the
+    entity has been quiet for the rule's debounce window. Finalized entries are
+    written by a background thread through add_daily_logs() in batches.
+    ingest() only touches memory, so it is safe to call from an event loop.
+    """
+
+    def __init__(self, db, config=EVENT_INGEST_CONFIG):
+        self.db = db
+        self.rules = [EventRule(rule, config['default_debounce']) for rule in config['rules']]
+        self.flush_interval = config['flush_interval']
+        self.max_batch = config['max_batch']
+        self._pending = {}      # (rule, entity_id) -> coalesced entry
+        self._ready = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._writer = None
+        self.metrics = {'received': 0, 'matched': 0, 'coalesced': 0, 'written': 0}
+
+    def ingest(self, event):
+        """Applies the rules to one raw event; returns True if it matched a rule"""
+        event = normalize_event(event)
+        with self._lock:
+            self.metrics['received'] += 1
+        if event is None:
+            return False
+        rule = next((rule for rule in self.rules if rule.matches(event)), None)
+        if rule is None:
+            return False
+
+        key = (rule.name, event['entity_id'])
+        now = time.monotonic()
+        with self._lock:
+            self.metrics['matched'] += 1
+            entry = self._pending.get(key)
+            if entry and now - entry['seen'] <= rule.debounce:
+                entry['count'] += 1
+                entry['to'] = event['to']
+                entry['last'] = event['time']
+                entry['seen'] = now
+                self.metrics['coalesced'] += 1
+                return True
+            if entry:
+                self._ready.append(self._pending.pop(key))
+            self._pending[key] = {
+                'rule': rule, 'entity_id': event['entity_id'], 'name': event['name'],
+                'from': event['from'], 'to': event['to'],
+                'first': event['time'], 'last': event['time'], 'seen': now, 'count': 1
+            }
+            if len(self._ready) >= self.max_batch:
+                self._wake.set()
+        return True
+
+    def _log_entry(self, entry):
+        rule = entry['rule']
+        try:
+            title = rule.title.format(name=entry['name'], entity_id=entry['entity_id'], to=entry['to'])
+        except (KeyError, IndexError, ValueError) as e:
+            # A bad configured title must not hold up the entry forever
+            ha_logger.error(f"Invalid title {rule.title!r} of event rule {rule.name}: {e}")
+            title = f"{entry['name']}: {entry['to']}"
+        if entry['count'] > 1:
+            title += f" ({entry['count']} times)"
+        return {
+            'title': title,
+            'date': entry['first'],
+            'details': {
+                'text': f"{entry['entity_id']}: {entry['from']} -> {entry['to']}",
+                'source': 'home_assistant',
+                'rule': rule.name,
+                'category': rule.category,
+                'entity_id': entry['entity_id'],
+                'count': entry['count'],
+                'last_seen': entry['last'].isoformat(sep=' ')
+            }
+        }
+
+    def flush(self, force=False):
+        """Writes entries whose debounce window has passed (all of them with force)"""
+        now = time.monotonic()
+        with self._lock:
+            for key, entry in list(self._pending.items()):
+                if force or now - entry['seen'] > entry['rule'].debounce:
+                    self._ready.append(self._pending.pop(key))
+            ready, self._ready = self._ready, []
+
+        written = 0
+        for start in range(0, len(ready), self.max_batch):
+            try:
+                batch = [self._log_entry(entry) for entry in ready[start:start + self.max_batch]]
+                added = self.db.add_daily_logs(batch)
+                if not added:
+                    ha_logger.error(f"Could not write {len(batch)} event log entries, retrying later")
+            except Exception as e:
+                ha_logger.error(f"Error writing event log entries, retrying later: {e}")
+                added = 0
+            if not added:
+                # This batch and the ones after it stay ready for the next flush
+                with self._lock:
+                    self._ready = ready[start:] + self._ready
+                break
+            written += added
+        with self._lock:
+            self.metrics['written'] += written
+        return written
+
+    def _write_loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                ha_logger.error(f"Event log flush failed: {e}")
+
+    def start(self):
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_loop, name='event-ingest', daemon=True)
+            self._writer.start()
+        return self
+
+    def close(self):
+        """Stops the writer and writes everything still pending"""
+        self._stop.set()
+        self._wake.set()
+        if self._writer:
+            self._writer.join()
+            self._writer = None
+        self.flush(force=True)
+
+
+async def subscribe_ha_events(ingestor, retry_delay=5):
+    """
+    Feeds state_changed events from Home Assistant's WebSocket API into the
+    ingestor, reconnecting on errors. Requires the optional 'websockets' package.
+    """
+    try:
+        import websockets
+    except ImportError:
+        ha_logger.error("HA event subscription needs the 'websockets' package (pip install websockets)")
+        return
+
+    url = HA_CONFIG['url'].replace('http', 'ws', 1).rstrip('/') + '/websocket'
+    while True:
+        try:
+            async with websockets.connect(url) as ws:
+                await ws.recv()  # auth_required
+                await ws.send(json.dumps({'type': 'auth', 'access_token': HA_TOKEN}))
+                reply = json.loads(await ws.recv())
+                if reply.get('type') != 'auth_ok':
+                    ha_logger.error(f"HA event subscription rejected: {reply.get('message')}")
+                    return
+                await ws.send(json.dumps({'id': 1, 'type': 'subscribe_events', 'event_type': 'state_changed'}))
+                ha_logger.info("Subscribed to Home Assistant state_changed events")
+                async for message in ws:
+                    data = json.loads(message)
+                    if data.get('type') == 'event':
+                        ingestor.ingest(data['event'])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            ha_logger.error(f"HA event stream error: {e}, reconnecting in {retry_delay}s")
+            await asyncio.sleep(retry_delay)
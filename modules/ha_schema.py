@@ -0,0 +1,260 @@
+# modules/ha_schema.py
+import difflib
+import threading
+import time
+from config.config import HA_SCHEMA_CONFIG
+from modules.data.NameIndex import normalize_name
+from modules.logger import ha_logger
+
+_TRUE = {'true', 'on', 'yes', '1'}
+_FALSE = {'false', 'off', 'no', '0'}
+
+
+def _service_fields(service):
+    """Fields of a service, with the fields of collapsible sections flattened"""
+    fields = {}
+    for name, field in (service.get('fields') or {}).items():
+        if isinstance(field, dict) and 'fields' in field and 'selector' not in field:
+            fields.update(field['fields'])
+        else:
+            fields[name] = field or {}
+    return fields
+
+
+def _target_domains(service):
+    """Entity domains a service accepts as target, None when unrestricted"""
+    filters = (service.get('target') or {}).get('entity')
+    if not filters:
+        return None
+    domains = set()
+    for entity_filter in filters if isinstance(filters, list) else [filters]:
+        domain = entity_filter.get('domain')
+        if not domain:
+            return None
+        domains.update([domain] if isinstance(domain, str) else domain)
+    return domains
+
+
+def _number(value):
+    if isinstance(value, bool):
+        raise ValueError
+    if not isinstance(value, (int, float)):
+        value = float(str(value).strip())
+    return int(value) if isinstance(value, float) and value.is_integer() else value
+
+
+def _match_option(value, options):
+    """The option equal to value ignoring case and spacing, or None"""
+    wanted = normalize_name(str(value)).replace(' ', '_')
+    for option in options:
+        if normalize_name(str(option)).replace(' ', '_') == wanted:
+            return option
+    return None
+
+
+def _normalize_value(value, selector):
+    """(value coerced to its selector's type, error or None)"""
+    if 'boolean' in selector and not isinstance(value, bool):
+        text = str(value).strip().lower()
+        if text not in _TRUE | _FALSE:
+            return value, f"expected true or false, got {value!r}"
+        return text in _TRUE, None
+    if 'select' in selector:
+        options = [option['value'] if isinstance(option, dict) else option
+                   for option in (selector['select'] or {}).get('options', [])]
+        if options:
+            values = value if isinstance(value, list) else [value]
+            matched = [_match_option(v, options) for v in values]
+            if None in matched:
+                return value, f"{value!r} is not one of {', '.join(map(str, options))}"
+            return matched if isinstance(value, list) else matched[0], None
+    for kind in ('number', 'color_temp'):
+        if kind in selector:
+            try:
+                value = _number(value)
+            except ValueError:
+                return value, f"expected a number, got {value!r}"
+            bounds = selector[kind] or {}
+            low, high = bounds.get('min'), bounds.get('max')
+            if (low is not None and value < low) or (high is not None and value > high):
+                return value, f"{value} is outside {low}-{high}"
+    return value, None
+
+
+class ServiceSchemaCache:
+    """
+    Local copy of the HA service schemas (/services fields, selectors and
+    targets) and entity registry (/states attributes), used to validate and
+    normalize api_calls before any request is sent. Calls pass unchanged while
+    nothing has been cached (HA unreachable), so validation never blocks a call
+    that HA itself would accept.
+    """
+
+    def __init__(self, fetch, config=HA_SCHEMA_CONFIG):
+        self.fetch = fetch
+        self.enabled = config.get('enabled', True)
+        self.ttl = config.get('ttl', 300)
+        self.unknown_entity_refresh = config.get('unknown_entity_refresh', 30)
+        self.entity_ranges = config.get('entity_ranges', {})
+        self.entity_options = config.get('entity_options', {})
+        self._registry = None
+        self._updated = 0.0
+        self._attempted = 0.0
+        self._lock = threading.Lock()
+        self.metrics = {'validated': 0, 'rejected': 0, 'refreshes': 0, 'refresh_errors': 0}
+
+    def update(self, states, services):
+        """Replaces the cache from raw /states and /services responses"""
+        entities = {state['entity_id']: state.get('attributes') or {} for state in states}
+        names, ambiguous = {}, set()
+        for entity_id, attributes in entities.items():
+            name = normalize_name(str(attributes.get('friendly_name') or ''))
+            if name:
+                if name in names:
+                    ambiguous.add(name)
+                names[name] = entity_id
+        for name in ambiguous:
+            del names[name]
+        schemas = {domain['domain']: domain.get('services') or {} for domain in services if domain.get('domain')}
+        self._registry = (entities, names, schemas)
+        self._updated = time.monotonic()
+
+    def refresh(self, max_age=None):
+        """Fetches schemas and entities unless they are younger than max_age seconds"""
+        with self._lock:
+            now = time.monotonic()
+            if max_age is not None and (
+                    (self._registry is not None and now - self._updated < max_age) or now - self._attempted < max_age):
+                return False
+            self._attempted = now
+            try:
+                states, services = self.fetch()
+                self.update(states, services)
+                self.metrics['refreshes'] += 1
+                ha_logger.info(f"Service schema cache refreshed: {len(states)} entities, {len(services)} domains")
+                return True
+            except Exception as e:
+                self.metrics['refresh_errors'] += 1
+                ha_logger.warning(f"Service schema refresh failed: {e}")
+                return False
+
+    def _resolve(self, name, entities, names):
+        key = str(name).strip().lower()
+        if key in entities or key == 'all':
+            return key
+        return names.get(normalize_name(str(name)))
+
+    def _resolve_entities(self, entity_id):
+        entities, names, _ = self._registry
+        requested = entity_id if isinstance(entity_id, list) else str(entity_id or '').split(',')
+        resolved, unknown = [], []
+        for name in (str(name).strip() for name in requested):
+            if name:
+                match = self._resolve(name, entities, names)
+                if match is None:
+                    unknown.append(name)
+                elif match not in resolved:
+                    resolved.append(match)
+        return resolved, unknown
+
+    def validate(self, api_call):
+        """
+        Checks an api_call against the cache: entities exist, the service exists
+        for the domain and targets them, parameters are known, typed and in range.
+        Returns (normalized call, [errors]); the call may be sent when errors is empty.
+        """
+        if not self.enabled:
+            return api_call, []
+        if not isinstance(api_call, dict):
+            return api_call, ["api_call must be an object with action, entity_id and parameters"]
+        self.refresh(max_age=self.ttl)
+        if self._registry is None:
+            return api_call, []
+
+        entity_ids, unknown = self._resolve_entities(api_call.get('entity_id'))
+        if unknown and self.refresh(max_age=self.unknown_entity_refresh):
+            entity_ids, unknown = self._resolve_entities(api_call.get('entity_id'))
+        entities, _, schemas = self._registry
+
+        errors = []
+        for name in unknown:
+            close = difflib.get_close_matches(name.lower(), entities, n=3, cutoff=0.6)
+            errors.append(f"unknown entity '{name}'" + (f" (did you mean {', '.join(close)}?)" if close else ''))
+        if not entity_ids and not unknown:
+            errors.append("missing entity_id")
+
+        action = str(api_call.get('action') or '').strip().lower()
+        entity_domains = {entity_id.split('.')[0] for entity_id in entity_ids if entity_id != 'all'}
+        if action and '.' not in action and len(entity_domains) == 1:
+            action = f"{next(iter(entity_domains))}.{action}"
+        domain, _, service_name = action.partition('.')
+        service = None
+        if not action:
+            errors.append("missing action")
+        elif domain not in schemas:
+            errors.append(f"unknown service domain '{domain}'")
+        elif service_name not in schemas[domain]:
+            errors.append(f"unknown service '{action}'; {domain} services: {', '.join(sorted(schemas[domain]))}")
+        else:
+            service = schemas[domain][service_name]
+            allowed = _target_domains(service)
+            for entity_id in entity_ids:
+                if allowed and entity_id != 'all' and entity_id.split('.')[0] not in allowed:
+                    errors.append(f"{action} cannot target {entity_id} (accepts {', '.join(sorted(allowed))})")
+
+        parameters = api_call.get('parameters') or {}
+        normalized = {}
+        if not isinstance(parameters, dict):
+            errors.append("parameters must be an object")
+        elif service is not None:
+            normalized = self._check_parameters(action, service, parameters, entity_ids, entities, errors)
+
+        self.metrics['validated'] += 1
+        if errors:
+            self.metrics['rejected'] += 1
+            return api_call, errors
+        call = dict(api_call, action=action, parameters=normalized)
+        call['entity_id'] = entity_ids[0] if len(entity_ids) == 1 else entity_ids
+        return call, []
+
+    def _check_parameters(self, action, service, parameters, entity_ids, entities, errors):
+        fields = _service_fields(service)
+        normalized = {}
+        for name, value in parameters.items():
+            if fields and name not in fields:
+                errors.append(f"unknown parameter '{name}' for {action}; accepted: {', '.join(sorted(fields))}")
+                continue
+            value, error = _normalize_value(value, (fields.get(name) or {}).get('selector') or {})
+            if error:
+                errors.append(f"{name}: {error}")
+                continue
+            for entity_id in entity_ids:
+                value, error = self._check_entity_limits(name, value, entity_id, entities.get(entity_id) or {})
+                if error:
+                    errors.append(error)
+                    break
+            normalized[name] = value
+
+        for name, field in fields.items():
+            if (field or {}).get('required') and name != 'entity_id' and name not in parameters:
+                errors.append(f"missing required parameter '{name}' for {action}")
+        return normalized
+
+    def _check_entity_limits(self, name, value, entity_id, attributes):
+        """Range and option limits a parameter has on one entity (e.g. min_temp/max_temp)"""
+        if name in self.entity_ranges:
+            low, high = (attributes.get(key) for key in self.entity_ranges[name])
+            if low is not None or high is not None:
+                try:
+                    value = _number(value)
+                except (TypeError, ValueError):
+                    return value, f"{name}: expected a number, got {value!r}"
+                if (low is not None and value < low) or (high is not None and value > high):
+                    return value, f"{name} {value} is outside {low}-{high} for {entity_id}"
+        options = attributes.get(self.entity_options.get(name))
+        if isinstance(options, list) and options:
+            match = _match_option(value, options)
+            if match is None:
+                return value, f"{name} '{value}' is not supported by {entity_id} (supported: {', '.join(map(str, options))})"
+            value = match
+        return value, None
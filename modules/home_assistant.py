@@ -1,106 +1,279 @@
 # modules/home_assistant.py
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 import requests
 from config.config import *
+from modules.command_debounce import CommandDebouncer
+from modules.command_queue import FAILED, RETRY, SENT, CommandQueue
+from modules.ha_schema import ServiceSchemaCache
 from modules.logger import ha_logger
+from modules.tracing import tracer
+from modules.recorder import recorder
 
 HA_URL = HA_CONFIG.get('url')
 
-def get_ha_states():
-    """Retrieve current states from Home Assistant."""
-    headers = {
-        'Authorization': f'Bearer {HA_TOKEN}',
-        'Content-Type': 'application/json',
-    }
-    
-    try:
-        ha_logger.info(f"Fetching Home Assistant data from: {HA_URL}")
-        states_response = requests.get(f"{HA_URL}/states", headers=headers)
-        states_response.raise_for_status()
-        states = states_response.json()
-
-        ha_logger.debug(f"Retrieved HA States: {states}")
-
-        services_response = requests.get(f"{HA_URL}/services", headers=headers)
-        services_response.raise_for_status()
-        services = services_response.json()
-
-        services_by_domain = {}
-        for service_domain in services:
-            domain = service_domain.get('domain')
-            if domain and domain not in HA_CONFIG.get('excluded_domains'):
-                if domain not in services_by_domain:
-                    services_by_domain[domain] = []
-                domain_services = service_domain.get('services', {})
-                services_by_domain[domain].extend(domain_services.keys())
-
-        filtered_data = {
-            "services": services_by_domain,
-            "entities": []
+# Pooled HTTP connections shared by every caller and household (thread-safe for these
+# requests); one connection pool is kept per HA host
+ha_session = requests.Session()
+for _scheme in ('http://', 'https://'):
+    ha_session.mount(_scheme, requests.adapters.HTTPAdapter(
+        pool_connections=HOUSEHOLD_CONFIG.get('max_active', 10),
+        pool_maxsize=HA_CONFIG.get('pool_size', 10)
+    ))
+
+# Responses meaning HA (or its proxy) is temporarily unavailable; the call is queued
+RETRYABLE_STATUS = (502, 503, 504)
+
+
+class HomeAssistantClient:
+    """
+    One Home Assistant endpoint (URL and token) with its service-schema cache,
+    offline command queue, debouncer and the last fetched home state. The HTTP
+    connection pool is shared by all clients.
+    """
+
+    def __init__(self, url=HA_URL, token=HA_TOKEN, queue_path=None, household=None):
+        self.url = url
+        self.token = token
+        self.household = household
+        # Validates api_calls locally; every home-state fetch refreshes it for free
+        self.service_schemas = ServiceSchemaCache(self.fetch_states_and_services)
+        # Calls that cannot reach HA wait here and are sent once it is back
+        queue_config = dict(COMMAND_QUEUE_CONFIG, path=queue_path) if queue_path else COMMAND_QUEUE_CONFIG
+        self.command_queue = CommandQueue(self._send_queued, queue_config)
+        # Merges rapid adjustments of one entity into a single request
+        self.command_debouncer = CommandDebouncer(self.send_api_call)
+        # Last successfully fetched home state and when it was fetched
+        self.states = None
+        self.states_at = None
+
+    @property
+    def headers(self):
+        return {
+            'Authorization': f'Bearer {self.token}',
+            'Content-Type': 'application/json',
         }
 
-        for state in states:
-            entity_id = state['entity_id']
-            domain = entity_id.split('.')[0]
-            
-            if domain in HA_CONFIG.get('excluded_domains'):
-                continue
-                
-            if any(entity_id.startswith(prefix) for prefix in HA_CONFIG.get('excluded_sensor_prefixes')):
-                continue
-                
-            important_attrs = HA_CONFIG.get('important_attributes').get(domain, HA_CONFIG.get('important_attributes').get('default'))
-            
-            filtered_state = {
-                'entity_id': entity_id,
-                'state': state['state'],
-                'domain': domain,
-                'attributes': {
-                    k: v for k, v in state['attributes'].items()
-                    if k in important_attrs
-                }
-            }
-            filtered_data["entities"].append(filtered_state)
-        
-        ha_logger.info("Successfully processed Home Assistant states and services")
-        return filtered_data
-
-    except requests.exceptions.RequestException as e:
-        ha_logger.error(f"Network error while fetching HA data: {str(e)}")
-        return None
-    except Exception as e:
-        ha_logger.error(f"Unexpected error while fetching HA data: {str(e)}")
-        return None
+    def fetch_states_and_services(self):
+        """Raw /states and /services responses; raises on HTTP errors."""
+        with tracer.span('ha.get_states') as span:
+            states_response = ha_session.get(f"{self.url}/states", headers=self.headers,
+                                             timeout=HA_CONFIG.get('request_timeout'))
+            states_response.raise_for_status()
+            states = states_response.json()
+            span.set(payload_bytes=len(states_response.content), entities=len(states))
 
-def process_api_call(api_call):
-    """Process Home Assistant API calls."""
-    service = api_call.get('action')
-    entity_id = api_call.get('entity_id')
-    parameters = api_call.get('parameters', {})
-
-    headers = {
-        'Authorization': f'Bearer {HA_TOKEN}',
-        'Content-Type': 'application/json',
-    }
+        ha_logger.debug("Retrieved %d HA states: %s", len(states), states)
 
-    if not service or not entity_id:
-        ha_logger.error(f"Invalid API call data - Missing service or entity_id: {api_call}")
-        return
+        with tracer.span('ha.get_services') as span:
+            services_response = ha_session.get(f"{self.url}/services", headers=self.headers,
+                                               timeout=HA_CONFIG.get('request_timeout'))
+            services_response.raise_for_status()
+            services = services_response.json()
+            span.set(payload_bytes=len(services_response.content))
+        return states, services
 
-    service_url = f"{HA_URL}/services/{service.replace('.', '/')}"
-    payload = {'entity_id': entity_id}
-    payload.update(parameters)
+    def get_states(self):
+        """Retrieve current states from Home Assistant."""
+        try:
+            started = time.perf_counter()
+            ha_logger.info(f"Fetching Home Assistant data from: {self.url}")
+            states, services = self.fetch_states_and_services()
+            self.service_schemas.update(states, services)
+            filtered_data = filter_states(states, services)
+            self.states, self.states_at = filtered_data, time.time()
+            ha_logger.info("Successfully processed Home Assistant states and services")
+            recorder.capture('ha_states', time.perf_counter() - started, data=filtered_data)
+            return filtered_data
+
+        except requests.exceptions.RequestException as e:
+            ha_logger.error(f"Network error while fetching HA data: {str(e)}")
+            return None
+        except Exception as e:
+            ha_logger.error(f"Unexpected error while fetching HA data: {str(e)}")
+            return None
+
+    def post_service_call(self, api_call):
+        """POSTs one validated service call; returns the response, raises on network errors."""
+        service = api_call.get('action')
+        entity_id = api_call.get('entity_id')
+        parameters = api_call.get('parameters') or {}
+
+        service_url = f"{self.url}/services/{service.replace('.', '/')}"
+        payload = {'entity_id': entity_id}
+        payload.update(parameters)
 
-    try:
         ha_logger.info(f"Making API call to HA - Service: {service}, Entity: {entity_id}, Parameters: {parameters}")
-        response = requests.post(service_url, headers=headers, json=payload)
-        
+        started = time.perf_counter()
+        with tracer.span('ha.call_service', service=service, entity_id=entity_id) as span:
+            response = ha_session.post(service_url, headers=self.headers, json=payload,
+                                       timeout=HA_CONFIG.get('request_timeout'))
+            span.set(status=str(response.status_code))
+        recorder.capture('api_call', time.perf_counter() - started, call=api_call, status=response.status_code)
+        return response
+
+    def _send_queued(self, api_call):
+        """Delivers a queued call: SENT, RETRY while HA is unreachable, FAILED otherwise"""
+        try:
+            response = self.post_service_call(api_call)
+        except requests.exceptions.ConnectionError:
+            return RETRY
+        except requests.exceptions.RequestException as e:
+            # A read timeout may have executed the call; sending it again could repeat it
+            ha_logger.error(f"Queued HA command {api_call} failed: {e}")
+            return FAILED
+        if response.status_code in RETRYABLE_STATUS:
+            return RETRY
         if response.status_code in (200, 201):
-            ha_logger.info(f"Successfully executed HA command - Status: {response.status_code}")
-            ha_logger.debug(f"HA API Response: {response.text}")
-        else:
+            ha_logger.info(f"Delivered queued HA command {api_call.get('action')} for {api_call.get('entity_id')}")
+            return SENT
+        ha_logger.error(f"Queued HA command failed - Status: {response.status_code}, Response: {response.text}")
+        return FAILED
+
+    def process_api_call(self, api_call):
+        """
+        Process Home Assistant API calls.
+        Returns None on success or when the call was queued because HA is
+        unreachable, otherwise an error message for the LLM: validation errors
+        (checked against the cached service schemas before any request) or the
+        error Home Assistant returned.
+        """
+        api_call, errors = self.service_schemas.validate(api_call)
+        if errors:
+            ha_logger.warning(f"Rejected API call {api_call}: {'; '.join(errors)}")
+            return f"{api_call.get('action') if isinstance(api_call, dict) else api_call} rejected: {'; '.join(errors)}"
+
+        service = api_call.get('action')
+        entity_id = api_call.get('entity_id')
+
+        if not service or not entity_id:
+            ha_logger.error(f"Invalid API call data - Missing service or entity_id: {api_call}")
+            return f"Invalid API call, action and entity_id are required: {api_call}"
+
+        if self.command_debouncer.submit(api_call):
+            ha_logger.info(f"Holding {service} for {entity_id} to merge with follow-up adjustments")
+            return None
+        return self.send_api_call(api_call)
+
+    def send_api_call(self, api_call):
+        """Sends a validated call now, or queues it while HA is unreachable; returns an error message or None"""
+        service = api_call.get('action')
+        entity_id = api_call.get('entity_id')
+
+        # Keeps order behind queued calls for the same entity, and skips a doomed request while HA is down
+        if self.command_queue.should_queue(api_call):
+            self.command_queue.enqueue(api_call)
+            return None
+
+        try:
+            response = self.post_service_call(api_call)
+            if response.status_code in (200, 201):
+                ha_logger.info(f"Successfully executed HA command - Status: {response.status_code}")
+                ha_logger.debug("HA API Response: %s", response.text)
+                return None
+            if response.status_code in RETRYABLE_STATUS and self.command_queue.enabled:
+                ha_logger.warning(f"Home Assistant unavailable (HTTP {response.status_code}), queueing {service}")
+                self.command_queue.enqueue(api_call)
+                return None
             ha_logger.error(f"Failed to execute HA command - Status: {response.status_code}, Response: {response.text}")
+            return f"{service} on {entity_id} failed with HTTP {response.status_code}: {response.text[:300]}"
+
+        except requests.exceptions.ConnectionError as e:
+            ha_logger.error(f"Network error during HA API call: {str(e)}")
+            if self.command_queue.enabled:
+                self.command_queue.enqueue(api_call)
+                return None
+            return f"{service} on {entity_id} failed: Home Assistant is unreachable"
+        except requests.exceptions.RequestException as e:
+            ha_logger.error(f"Network error during HA API call: {str(e)}")
+            return f"{service} on {entity_id} timed out; Home Assistant may or may not have executed it"
+        except Exception as e:
+            ha_logger.error(f"Unexpected error during HA API call: {str(e)}")
+            return f"{service} on {entity_id} failed: {e}"
+
+    def close(self):
+        """Sends held calls and stops the queue drain; queued calls stay on disk"""
+        self.command_debouncer.flush()
+        self.command_queue.close()
+
+
+def filter_states(states, services):
+    """Reduces raw /states and /services responses to the entities and services the prompt shows"""
+    services_by_domain = {}
+    for service_domain in services:
+        domain = service_domain.get('domain')
+        if domain and domain not in HA_CONFIG.get('excluded_domains'):
+            if domain not in services_by_domain:
+                services_by_domain[domain] = []
+            domain_services = service_domain.get('services', {})
+            services_by_domain[domain].extend(domain_services.keys())
+
+    filtered_data = {
+        "services": services_by_domain,
+        "entities": []
+    }
+
+    for state in states:
+        entity_id = state['entity_id']
+        domain = entity_id.split('.')[0]
+
+        if domain in HA_CONFIG.get('excluded_domains'):
+            continue
+
+        if any(entity_id.startswith(prefix) for prefix in HA_CONFIG.get('excluded_sensor_prefixes')):
+            continue
+
+        important_attrs = HA_CONFIG.get('important_attributes').get(domain, HA_CONFIG.get('important_attributes').get('default'))
+
+        filtered_state = {
+            'entity_id': entity_id,
+            'state': state['state'],
+            'domain': domain,
+            'attributes': {
+                k: v for k, v in state['attributes'].items()
+                if k in important_attrs
+            }
+        }
+        filtered_data["entities"].append(filtered_state)
+    return filtered_data
+
+
+# The configured home; households (modules/household.py) bring their own clients
+default_client = HomeAssistantClient()
+service_schemas = default_client.service_schemas
+command_queue = default_client.command_queue
+command_debouncer = default_client.command_debouncer
+
+_current_client = ContextVar('ha_client', default=None)
+
+def current_client():
+    """The client of the household whose turn is running, else the configured home"""
+    return _current_client.get() or default_client
+
+@contextmanager
+def using_client(client):
+    """Routes get_ha_states() and process_api_call() in this context (and its tasks/threads) to client"""
+    token = _current_client.set(client)
+    try:
+        yield client
+    finally:
+        _current_client.reset(token)
+
+def get_ha_states():
+    """Retrieve current states from Home Assistant."""
+    return current_client().get_states()
+
+def process_api_call(api_call):
+    """Process Home Assistant API calls; see HomeAssistantClient.process_api_call()."""
+    return current_client().process_api_call(api_call)
+
+async def async_get_ha_states():
+    """Non-blocking get_ha_states() for use inside an event loop."""
+    return await asyncio.to_thread(get_ha_states)
+
 
-    except requests.exceptions.RequestException as e:
-        ha_logger.error(f"Network error during HA API call: {str(e)}")
-    except Exception as e:
-        ha_logger.error(f"Unexpected error during HA API call: {str(e)}")
\ No newline at end of file
+async def async_process_api_call(api_call):
+    """Non-blocking process_api_call() for use inside an event loop."""
+    return await asyncio.to_thread(process_api_call, api_call)
@@ -0,0 +1,225 @@
+# modules/household.py
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from config.config import APP_CONFIG, DATA_DIR, HOUSEHOLD_CONFIG, STORAGE_CONFIG
+from modules.data.AsyncDatabaseManager import AsyncDatabaseManager
+from modules.data.DatabaseFactory import create_database_manager, uses_mongodb
+from modules.home_assistant import HomeAssistantClient, default_client, using_client
+from modules.logger import app_logger
+
+DEFAULT_HOUSEHOLD = 'default'
+
+_VALID_ID = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+def session_key(household_id, session_id):
+    """Session store key; the default home keeps plain session ids"""
+    household_id = household_id or DEFAULT_HOUSEHOLD
+    return session_id if household_id == DEFAULT_HOUSEHOLD else f"{household_id}/{session_id}"
+
+
+class Household:
+    """One home: its HA client, database and the system prompt rendered from its state"""
+
+    def __init__(self, household_id, ha, db, async_db):
+        self.id = household_id
+        self.ha = ha
+        self.db = db
+        self.async_db = async_db
+        self.prompt = None
+        self.active_turns = 0
+        # Handles given out by HouseholdRegistry.acquire() and not yet released
+        self.leases = 0
+        self.last_active = time.monotonic()
+        self.closed = False
+
+    @property
+    def in_use(self):
+        return bool(self.leases or self.active_turns)
+
+    @contextmanager
+    def activate(self):
+        """Routes get_ha_states()/process_api_call() made in this context to this home"""
+        self.last_active = time.monotonic()
+        self.active_turns += 1
+        try:
+            with using_client(self.ha):
+                yield self
+        finally:
+            self.active_turns -= 1
+            self.last_active = time.monotonic()
+
+    def session_key(self, session_id):
+        return session_key(self.id, session_id)
+
+
+class HouseholdRegistry:
+    """
+    Homes served by one process, created on first use and kept in an LRU of
+    'max_active' entries; homes idle for 'idle_timeout' seconds are closed by
+    evict_idle(). Each home gets its own HA client (URL, token, schema cache,
+    command queue) and database (MongoDB db_name or SQLite file), while the
+    MongoClient, the HTTP connection pool and the DB thread pool are shared.
+    The 'default' home is the one configured in HA_CONFIG/STORAGE_CONFIG and
+    is never evicted, nor are homes leased by acquire() or running a turn.
+    Homes are loaded outside the registry lock, one load per home at a time.
+    """
+
+    def __init__(self, config=HOUSEHOLD_CONFIG, storage_config=STORAGE_CONFIG):
+        self.homes = dict(config.get('homes', {}))
+        self.max_active = config.get('max_active', 100)
+        self.idle_timeout = config.get('idle_timeout', 1800)
+        self.storage_config = storage_config
+        self._active = OrderedDict()
+        # household_id -> Future of a load in progress
+        self._loading = {}
+        self._lock = threading.RLock()
+        self._mongo_client = None
+        self._executor = ThreadPoolExecutor(max_workers=APP_CONFIG['io_workers'], thread_name_prefix='db')
+        self.metrics = {'created': 0, 'evicted': 0}
+
+    def register(self, household_id, home):
+        """Adds a home ({'ha_url', 'ha_token', 'db_name' or 'sqlite_path'}) at runtime"""
+        if not _VALID_ID.match(household_id):
+            raise ValueError(f"Invalid household id: {household_id!r}")
+        self.homes[household_id] = home
+
+    def known(self, household_id):
+        household_id = household_id or DEFAULT_HOUSEHOLD
+        return household_id == DEFAULT_HOUSEHOLD or household_id in self.homes
+
+    @property
+    def active(self):
+        return len(self._active)
+
+    def get(self, household_id=None):
+        """The household, loading it on first use; None for an unknown id. May be evicted once idle"""
+        return self._get(household_id, lease=False)
+
+    def acquire(self, household_id=None):
+        """Like get(), but the household is not evicted until release()"""
+        return self._get(household_id, lease=True)
+
+    def release(self, household):
+        with self._lock:
+            household.leases -= 1
+            household.last_active = time.monotonic()
+
+    def _get(self, household_id, lease):
+        household_id = household_id or DEFAULT_HOUSEHOLD
+        while True:
+            with self._lock:
+                household = self._active.get(household_id)
+                if household is not None:
+                    self._active.move_to_end(household_id)
+                    household.leases += lease
+                    return household
+                if not self.known(household_id):
+                    return None
+                loading = self._loading.get(household_id)
+                if loading is None:
+                    loading = self._loading[household_id] = Future()
+                    break
+            # Another thread is loading this home; look it up again once it is done
+            loading.result()
+
+        # Database setup and connections happen without holding the lock
+        try:
+            household = self._create(household_id)
+        except BaseException as e:
+            with self._lock:
+                del self._loading[household_id]
+            loading.set_exception(e)
+            raise
+        with self._lock:
+            del self._loading[household_id]
+            self._active[household_id] = household
+            household.leases += lease
+            self.metrics['created'] += 1
+            self._evict_over_capacity()
+        loading.set_result(household)
+        return household
+
+    def _shared_mongo_client(self):
+        if self._mongo_client is None:
+            from pymongo import MongoClient
+            self._mongo_client = MongoClient('mongodb://localhost:27017/')
+        return self._mongo_client
+
+    def _create(self, household_id):
+        if household_id == DEFAULT_HOUSEHOLD:
+            # Set up by MainClass.setup_database() at startup
+            db = create_database_manager(self.storage_config)
+            ha = default_client
+        else:
+            home = self.homes[household_id]
+            db_name = home.get('db_name') or f"home_{household_id}"
+            if uses_mongodb(self.storage_config):
+                from modules.data.DatabaseSetup import DatabaseSetup
+                client = self._shared_mongo_client()
+                DatabaseSetup(client, db_name).setup()
+                db = create_database_manager(self.storage_config, client=client, db_name=db_name)
+            else:
+                db = create_database_manager(
+                    self.storage_config, sqlite_path=home.get('sqlite_path') or str(DATA_DIR / f"{db_name}.db")
+                )
+            ha = HomeAssistantClient(
+                home['ha_url'], home['ha_token'],
+                queue_path=str(DATA_DIR / f"command_queue-{household_id}.jsonl"),
+                household=household_id
+            )
+        app_logger.info(f"Loaded household {household_id}")
+        return Household(household_id, ha, db, AsyncDatabaseManager(db, executor=self._executor))
+
+    def _evict_over_capacity(self):
+        for household_id, household in list(self._active.items()):
+            if len(self._active) <= self.max_active:
+                return
+            if household_id != DEFAULT_HOUSEHOLD and not household.in_use:
+                self._evict(household_id)
+
+    def evict_idle(self):
+        """Closes homes without turns for 'idle_timeout' seconds; returns their ids"""
+        cutoff = time.monotonic() - self.idle_timeout
+        with self._lock:
+            idle = [
+                household_id for household_id, household in self._active.items()
+                if household_id != DEFAULT_HOUSEHOLD and not household.in_use and household.last_active < cutoff
+            ]
+            for household_id in idle:
+                self._evict(household_id)
+        return idle
+
+    def _evict(self, household_id):
+        household = self._active.pop(household_id)
+        self._close(household)
+        self.metrics['evicted'] += 1
+        app_logger.info(f"Evicted household {household_id}")
+
+    def _close(self, household):
+        household.closed = True
+        try:
+            if household.ha is not default_client:
+                household.ha.close()
+            household.db.close()
+        except Exception as e:
+            app_logger.error(f"Error closing household {household.id}: {e}")
+
+    def households(self):
+        with self._lock:
+            return list(self._active.values())
+
+    def close(self):
+        """Closes every loaded home and the shared clients"""
+        with self._lock:
+            for household in self._active.values():
+                self._close(household)
+            self._active.clear()
+        self._executor.shutdown()
+        if self._mongo_client is not None:
+            self._mongo_client.close()
+            self._mongo_client = None
@@ -0,0 +1,196 @@
+# modules/llm_scheduler.py
+import itertools
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from config.config import LLM_SCHEDULER_CONFIG
+from modules.logger import openai_logger
+from modules.tracing import tracer
+
+# Priority class and fairness key of LLM calls made in this context; calls are background
+# unless a user turn marks its context interactive
+_current_request = ContextVar('llm_request', default=('background', None))
+
+
+@contextmanager
+def llm_context(priority=None, session=None):
+    """LLM calls made in this context (and threads started from it) use this priority and session"""
+    current_priority, current_session = _current_request.get()
+    token = _current_request.set((priority or current_priority, session if session is not None else current_session))
+    try:
+        yield
+    finally:
+        _current_request.reset(token)
+
+
+class TokenBucket:
+    """Refills 'per_minute' units a minute, holding at most 'burst_seconds' worth; may go into debt after a correction"""
+
+    def __init__(self, per_minute, burst_seconds=60):
+        self.rate = per_minute / 60
+        self.capacity = self.rate * burst_seconds
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Seconds until 'amount' can be taken; a request larger than the bucket only needs it full"""
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount):
+        self.level -= amount
+
+
+class _Request:
+    __slots__ = ('priority', 'session', 'tokens', 'queued_at')
+
+    def __init__(self, priority, session, tokens):
+        self.priority = priority
+        self.session = session
+        self.tokens = tokens
+        self.queued_at = time.monotonic()
+
+
+class LLMScheduler:
+    """
+    Admission control in front of the chat completions API.
+
+    Calls wait for a free slot ('max_concurrent' in flight), one request from
+    the requests-per-minute bucket and their estimated tokens from the
+    tokens-per-minute bucket. Waiting calls are served by priority class in
+    the order of 'priorities', and round-robin across sessions within a
+    class, so one session's burst does not hold up the others. Estimates are
+    corrected with the usage the API reports. A rate-limit response pauses
+    all calls for its Retry-After.
+    """
+
+    def __init__(self, config=LLM_SCHEDULER_CONFIG):
+        self.enabled = config.get('enabled', True)
+        self.max_concurrent = config.get('max_concurrent', 16)
+        self.priorities = list(config.get('priorities', ('interactive', 'background')))
+        self.completion_reserve = config.get('completion_reserve', 1000)
+        self.max_wait = config.get('max_wait', 120)
+        self.rate_limit_pause = config.get('rate_limit_pause', 5)
+        burst = config.get('burst_seconds', 10)
+        self.requests = TokenBucket(config.get('requests_per_minute', 500), burst)
+        self.tokens = TokenBucket(config.get('tokens_per_minute', 200000), burst)
+        # priority -> session -> waiting requests; sessions rotate to the end when served
+        self._queues = {priority: OrderedDict() for priority in self.priorities}
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._anonymous = itertools.count()
+        self._cond = threading.Condition()
+        self.metrics = {
+            'in_flight': 0, 'waiting': {priority: 0 for priority in self.priorities},
+            'granted': 0, 'timeouts': 0, 'rate_limited': 0, 'last_wait_ms': None, 'max_wait_ms': 0
+        }
+
+    def estimate_tokens(self, messages):
+        """Prompt tokens at ~4 characters each plus the reply reserve; cheap, corrected after the call"""
+        return sum(len(message.get('content') or '') for message in messages) // 4 + self.completion_reserve
+
+    @contextmanager
+    def slot(self, messages):
+        """Waits for admission; the caller reports actual usage with the yielded function"""
+        if not self.enabled:
+            yield lambda total_tokens: None
+            return
+        priority, session = _current_request.get()
+        if priority not in self._queues:
+            priority = self.priorities[-1]
+        request = _Request(priority, session if session is not None else next(self._anonymous),
+                           self.estimate_tokens(messages))
+        self._acquire(request)
+        reported = []
+        try:
+            yield reported.append
+        finally:
+            self._release(request, reported[-1] if reported else None)
+
+    def _head(self):
+        """The request to admit next: first class with waiters, its least recently served session"""
+        for sessions in self._queues.values():
+            if sessions:
+                return next(iter(sessions.values()))[0]
+        return None
+
+    def _wait_time(self, request, now):
+        """Seconds until the request could be admitted, None while all slots are taken"""
+        if self._in_flight >= self.max_concurrent:
+            return None
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        return max(self._paused_until - now, self.requests.wait_time(1), self.tokens.wait_time(request.tokens))
+
+    def _acquire(self, request):
+        with self._cond:
+            sessions = self._queues[request.priority]
+            sessions.setdefault(request.session, deque()).append(request)
+            self.metrics['waiting'][request.priority] += 1
+            deadline = request.queued_at + self.max_wait
+            try:
+                while True:
+                    now = time.monotonic()
+                    if now >= deadline:
+                        self.metrics['timeouts'] += 1
+                        raise TimeoutError(f"No LLM capacity within {self.max_wait} seconds")
+                    wait = self._wait_time(request, now) if self._head() is request else None
+                    if wait == 0:
+                        break
+                    self._cond.wait(min(wait if wait is not None else deadline - now, deadline - now))
+            except BaseException:
+                self._dequeue(request, rotate=False)
+                self._cond.notify_all()
+                raise
+            self._dequeue(request, rotate=True)
+            self.requests.take(1)
+            self.tokens.take(request.tokens)
+            self._in_flight += 1
+            self.metrics['in_flight'] = self._in_flight
+            self.metrics['granted'] += 1
+            # The next request in line may be admissible too
+            self._cond.notify_all()
+
+        waited = time.monotonic() - request.queued_at
+        self.metrics['last_wait_ms'] = round(waited * 1000, 1)
+        self.metrics['max_wait_ms'] = max(self.metrics['max_wait_ms'], self.metrics['last_wait_ms'])
+        tracer.observe('llm.queue_wait', waited)
+        if waited > 1:
+            openai_logger.info(f"LLM call ({request.priority}) waited {waited:.1f}s for capacity")
+
+    def _dequeue(self, request, rotate):
+        """Removes a request from its session queue; a served session moves behind the others"""
+        sessions = self._queues[request.priority]
+        queue = sessions[request.session]
+        queue.remove(request)
+        if not queue:
+            del sessions[request.session]
+        elif rotate:
+            sessions.move_to_end(request.session)
+        self.metrics['waiting'][request.priority] -= 1
+        tracer.set_gauge('llm_queue_depth', sum(self.metrics['waiting'].values()))
+
+    def _release(self, request, total_tokens):
+        with self._cond:
+            self._in_flight -= 1
+            self.metrics['in_flight'] = self._in_flight
+            if total_tokens is not None:
+                # Return the unused part of the estimate, or charge the excess
+                self.tokens.take(total_tokens - request.tokens)
+            self._cond.notify_all()
+
+    def rate_limited(self, retry_after=None):
+        """Pauses all admissions after a rate-limit response"""
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + (retry_after or self.rate_limit_pause))
+            self.metrics['rate_limited'] += 1
+        openai_logger.warning(f"LLM rate limited, pausing calls for {retry_after or self.rate_limit_pause}s")
+
+
+llm_scheduler = LLMScheduler()
@@ -1,37 +1,140 @@
 # modules/logger.py
+import atexit
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+import random
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from config import LOG_CONFIG
 
-def setup_logger(name, log_file, level=logging.INFO):
+# Records are formatted without process details; skip collecting them
+# (see "Optimization" in the logging HOWTO)
+logging.logProcesses = False
+logging.logMultiprocessing = False
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message (+ exception)"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).strftime(LOG_CONFIG['date_format']),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps each record with the probability configured for its level"""
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = {logging.getLevelName(level): rate for level, rate in rates.items()}
+
+    def filter(self, record):
+        rate = self.rates.get(record.levelno, 1.0)
+        return rate >= 1.0 or random.random() < rate
+
+
+class AsyncLogHandler(QueueHandler):
+    """
+    Hands records to the background writer without blocking the caller.
+    The message is rendered and truncated here; if the queue is full the
+    record is dropped and counted instead of stalling the turn.
+    """
+
+    def __init__(self, log_queue, max_chars):
+        super().__init__(log_queue)
+        self.max_chars = max_chars
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Each logger has this handler only, so the record can be reduced in place
+        message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        if self.max_chars and len(message) > self.max_chars:
+            message = f"{message[:self.max_chars]}... [truncated {len(message) - self.max_chars} chars]"
+        record.msg, record.args, record.exc_info = message, None, None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _LogRouter(logging.Handler):
+    """Writes each record to the file handler of the logger that produced it"""
+
+    def __init__(self):
+        super().__init__()
+        self.handlers = {}
+
+    def handle(self, record):
+        handler = self.handlers.get(record.name)
+        if handler:
+            handler.handle(record)
+
+    def close(self):
+        for handler in self.handlers.values():
+            handler.close()
+        super().close()
+
+
+_log_queue = queue.Queue(LOG_CONFIG['queue_size'])
+_router = _LogRouter()
+_listener = QueueListener(_log_queue, _router)
+_listener.start()
+
+
+def _stop_listener():
+    """Drains the queue and closes the log files"""
+    _listener.stop()
+    _router.close()
+
+
+atexit.register(_stop_listener)
+
+
+def setup_logger(name, log_file, level=LOG_CONFIG['level']):
     """Configure and return a logger instance"""
-    # Create formatter
-    formatter = logging.Formatter(
-        fmt=LOG_CONFIG['format'],
-        datefmt=LOG_CONFIG['date_format']
-    )
+    if LOG_CONFIG['json']:
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(
+            fmt=LOG_CONFIG['format'],
+            datefmt=LOG_CONFIG['date_format']
+        )
 
-    # Create handlers
+    # File writes happen on the listener thread
     file_handler = RotatingFileHandler(
         log_file,
         maxBytes=100*1024*1024,  # 100MB
-        backupCount=5
+        backupCount=5,
+        encoding='utf-8'
     )
     file_handler.setFormatter(formatter)
+    _router.handlers[name] = file_handler
 
-    console_handler = logging.FileHandler(log_file)
-    console_handler.setFormatter(formatter)
+    queue_handler = AsyncLogHandler(_log_queue, LOG_CONFIG['max_message_chars'])
+    queue_handler.addFilter(SamplingFilter(LOG_CONFIG['sampling']))
 
     # Create and configure logger
     logger = logging.getLogger(name)
     logger.setLevel(level)
-    
+
     # Remove existing handlers to avoid duplicates
     logger.handlers = []
-    
-    # Add handlers
-    logger.addHandler(file_handler)
-    # logger.addHandler(console_handler)
+    logger.propagate = False
+
+    logger.addHandler(queue_handler)
 
     return logger
 
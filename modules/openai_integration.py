@@ -1,20 +1,39 @@
 # modules/openai_integration.py
 
+import asyncio
 import json
-from openai import OpenAI, APIError, APIConnectionError, RateLimitError
-from config.config import OPENAI_API_KEY, AI_MODEL_NAME
+import threading
+import time
+from config.config import OPENAI_API_KEY, AI_MODEL_NAME, LLM_SCHEDULER_CONFIG
 from modules.logger import openai_logger
+from modules.tracing import tracer
+from modules.recorder import recorder
 from modules.home_assistant import process_api_call
+from modules.llm_scheduler import llm_scheduler
 
-try:
-    client = OpenAI(api_key=OPENAI_API_KEY)
-    openai_logger.info("OpenAI client initialized successfully")
-except Exception as e:
-    openai_logger.error(f"Failed to initialize OpenAI client: {str(e)}", exc_info=True)
-    raise
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """Returns the OpenAI client, importing and building it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                # Importing openai is a large share of startup time, so it waits until needed
+                from openai import OpenAI
+                try:
+                    _client = OpenAI(api_key=OPENAI_API_KEY)
+                    openai_logger.info("OpenAI client initialized successfully")
+                except Exception as e:
+                    openai_logger.error(f"Failed to initialize OpenAI client: {str(e)}", exc_info=True)
+                    raise
+    return _client
 
 def send_to_gpt(conversation_history, name, location, message, date):
     """Sends a message to GPT and receives a response."""
+    client = get_client()
+    from openai import APIError, APIConnectionError, RateLimitError
     try:
         prompt = f"""   User: {name}
                         Location: {location}
@@ -26,16 +45,17 @@ def send_to_gpt(conversation_history, name, location, message, date):
         openai_logger.info(f"User Request - Name: {name}, Location: {location}")
         openai_logger.info(f"User Message: {message}")
         
-        chat_completion = client.chat.completions.create(
-            messages=conversation_history,
-            model=AI_MODEL_NAME,
-            max_tokens=15000,
-            temperature=0.7,
-        )
+        started = time.perf_counter()
+        with tracer.span('llm.completion', model=AI_MODEL_NAME, messages=len(conversation_history)) as span:
+            chat_completion = _create_completion(client, conversation_history)
 
-        response = chat_completion.choices[0].message.content
+            response = chat_completion.choices[0].message.content
+            if usage := getattr(chat_completion, 'usage', None):
+                span.set(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+            span.set(response_bytes=len(response or ''))
+        recorder.capture('llm', time.perf_counter() - started, response=response)
         openai_logger.info(f"GPT Response received - Length: {len(response)} characters")
-        openai_logger.info(f"GPT Response: {response}")
+        openai_logger.debug("GPT Response: %s", response)
         
         if isinstance(response, dict):
             response = json.dumps(response)
@@ -57,6 +77,38 @@ def send_to_gpt(conversation_history, name, location, message, date):
         openai_logger.error(f"Unexpected error: {str(e)}", exc_info=True)
         raise Exception(f"Unexpected error occurred: {str(e)}")
 
+def _create_completion(client, messages):
+    """One chat completion through the LLM scheduler, retried there after rate-limit responses."""
+    from openai import RateLimitError
+    for attempt in range(LLM_SCHEDULER_CONFIG.get('rate_limit_retries', 0) + 1):
+        with llm_scheduler.slot(messages) as report_usage:
+            try:
+                chat_completion = client.chat.completions.create(
+                    messages=messages,
+                    model=AI_MODEL_NAME,
+                    max_tokens=15000,
+                    temperature=0.7,
+                )
+            except RateLimitError as e:
+                llm_scheduler.rate_limited(_retry_after(e))
+                if attempt == LLM_SCHEDULER_CONFIG.get('rate_limit_retries', 0):
+                    raise
+                continue
+            if usage := getattr(chat_completion, 'usage', None):
+                report_usage(usage.total_tokens)
+            return chat_completion
+
+def _retry_after(error):
+    """Seconds from a rate-limit response's Retry-After header, if present."""
+    try:
+        return float(error.response.headers.get('retry-after'))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+async def async_send_to_gpt(conversation_history, name, location, message, date):
+    """Non-blocking send_to_gpt() for use inside an event loop."""
+    return await asyncio.to_thread(send_to_gpt, conversation_history, name, location, message, date)
+
 def parse_and_execute(response):
     """Parses GPT's response and executes commands."""
     try:
@@ -71,7 +123,7 @@ def parse_and_execute(response):
                 openai_logger.info("Successfully parsed JSON response")
             except json.JSONDecodeError as e:
                 openai_logger.error(f"JSON parsing failed: {str(e)}")
-                openai_logger.debug(f"Invalid JSON content: {response}")
+                openai_logger.debug("Invalid JSON content: %s", response)
                 raise Exception("Invalid response format from GPT")
             
         if 'message' in parsed_response:
@@ -87,7 +139,10 @@ def parse_and_execute(response):
             for index, api_call in enumerate(api_calls, 1):
                 openai_logger.info(f"API Call {index}/{total_calls}: {api_call}")
                 try:
-                    process_api_call(api_call)
+                    if error := process_api_call(api_call):
+                        openai_logger.error(f"API Call {index}/{total_calls} failed: {error}")
+                        print(f"Error executing command {index}: {error}")
+                        continue
                     openai_logger.info(f"API Call {index}/{total_calls} executed successfully")
                 except Exception as e:
                     openai_logger.error(f"API Call {index}/{total_calls} failed: {str(e)}")
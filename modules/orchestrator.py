@@ -0,0 +1,169 @@
+# modules/orchestrator.py
+import asyncio
+import datetime
+import signal
+import threading
+from config.config import APP_CONFIG
+from modules.conversation_history import get_system_prompt, refresh_system_prompt
+from modules.llm_scheduler import llm_context
+from modules.logger import app_logger
+from modules.openai_integration import get_client
+
+
+class TurnOrchestrator:
+    """
+    Event-loop driver for MainClass.
+    While waiting for input, the next system prompt is fetched and rendered in
+    the background, so pressing Enter goes straight to the LLM. Ctrl+C cancels
+    the running turn; pressing it while idle exits.
+    """
+
+    def __init__(self, assistant, refresh_interval=None, prompt_reader=input):
+        self.assistant = assistant
+        self.refresh_interval = refresh_interval or APP_CONFIG['prompt_refresh_interval']
+        self.prompt_reader = prompt_reader
+        self._prompt = None
+        self._prompt_ready = None
+        self._refresh_now = None
+        self._inputs = None
+        self._want_input = threading.Event()
+        self._turn = None
+        self._stopping = None
+
+    async def _prefetch_loop(self):
+        """Keeps a freshly rendered system prompt ready"""
+        while True:
+            prompt = await asyncio.to_thread(get_system_prompt)
+            if prompt:
+                self._prompt = prompt
+                self._prompt_ready.set()
+                app_logger.info("System prompt prefetched")
+            try:
+                await asyncio.wait_for(self._refresh_now.wait(), timeout=self.refresh_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._refresh_now.clear()
+
+    async def _warm_up_client(self):
+        """Builds the LLM client ahead of the first turn; failures resurface on first use"""
+        try:
+            await asyncio.to_thread(get_client)
+        except Exception as e:
+            app_logger.warning(f"LLM client warm-up failed: {e}")
+
+    def _start_input_reader(self, loop):
+        """Reads stdin on a daemon thread so a pending input() never blocks shutdown"""
+        def reader():
+            while True:
+                self._want_input.wait()
+                self._want_input.clear()
+                try:
+                    line = self.prompt_reader("Your message: ")
+                except (EOFError, KeyboardInterrupt):
+                    line = None
+                loop.call_soon_threadsafe(self._inputs.put_nowait, line)
+                if line is None:
+                    return
+
+        threading.Thread(target=reader, name='input-reader', daemon=True).start()
+
+    def _on_interrupt(self):
+        if self._turn and not self._turn.done():
+            app_logger.info("Cancelling current turn (KeyboardInterrupt)")
+            self._turn.cancel()
+        else:
+            self._stopping.set()
+            self._inputs.put_nowait(None)
+
+    async def _next_message(self):
+        while True:
+            self._want_input.set()
+            line = await self._inputs.get()
+            if line is None:
+                return None
+            message = line.strip()
+            if message:
+                return message
+
+    async def run_turn(self, message):
+        """Applies the prefetched prompt and runs one turn; returns False if it was cancelled"""
+        if not self._prompt_ready.is_set():
+            try:
+                await asyncio.wait_for(self._prompt_ready.wait(), timeout=self.refresh_interval)
+            except asyncio.TimeoutError:
+                app_logger.warning("No prefetched system prompt, fetching inline")
+        self.assistant.conversation_history = await asyncio.to_thread(
+            refresh_system_prompt, self.assistant.conversation_history, self._prompt
+        )
+
+        date = datetime.datetime.now().strftime("%Y-%m-%d %H:%M %A")
+        app_logger.info(f"Processing user message: '{message}' at {date}")
+        # The task copies the context, so its LLM calls are admitted as interactive
+        with llm_context(priority='interactive'):
+            self._turn = asyncio.create_task(self.assistant.run_turn_async(message, date))
+        try:
+            await self._turn
+            return True
+        except asyncio.CancelledError:
+            if self._stopping.is_set():
+                raise
+            print("\nTurn cancelled.")
+            return False
+        finally:
+            self._turn = None
+            # Actions may have changed the home state: render the next prompt now
+            self._refresh_now.set()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self._prompt_ready = asyncio.Event()
+        self._refresh_now = asyncio.Event()
+        self._stopping = asyncio.Event()
+        self._inputs = asyncio.Queue()
+
+        try:
+            loop.add_signal_handler(signal.SIGINT, self._on_interrupt)
+        except (NotImplementedError, RuntimeError):
+            pass  # Signal handlers are unavailable on some platforms/threads
+
+        prefetch = asyncio.create_task(self._prefetch_loop())
+        # Database setup and the LLM client warm up while the user types the first message
+        setup = asyncio.create_task(asyncio.to_thread(self.assistant.setup_database))
+        warm_up = asyncio.create_task(self._warm_up_client())
+        try:
+            self._start_input_reader(loop)
+
+            while True:
+                message = await self._next_message()
+                if message is None:
+                    app_logger.info("Program terminated by user")
+                    print("\nProgram terminated by user.")
+                    break
+                if message.lower() in ['quit', 'exit', 'bye']:
+                    app_logger.info("User requested exit")
+                    print("Goodbye!")
+                    break
+
+                await setup
+
+                try:
+                    if await self.run_turn(message):
+                        await asyncio.to_thread(self.assistant.end_turn)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    app_logger.error(f"Loop iteration error: {e}")
+                    print("An error occurred. Continuing with next input...")
+
+        except Exception as e:
+            app_logger.error(f"Fatal error occurred: {e}")
+            print("A fatal error occurred. Please check the logs.")
+        finally:
+            prefetch.cancel()
+            warm_up.cancel()
+            setup.cancel()
+            try:
+                loop.remove_signal_handler(signal.SIGINT)
+            except (NotImplementedError, RuntimeError):
+                pass
+            self.assistant.shutdown()
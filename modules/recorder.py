@@ -0,0 +1,183 @@
+# modules/recorder.py
+import contextvars
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from config.config import RECORD_CONFIG
+from modules.logger import app_logger
+
+# Values under these keys drive control flow on replay and are kept verbatim
+KEEP_KEYS = {
+    'function', 'action', 'entity_id', 'domain', 'role', 'status', 'state',
+    'need_response', 'unit', 'category', 'services'
+}
+# Whole-string dates/timestamps only; text that merely starts with a date is anonymized
+DATE_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}([ T]\d{2}:\d{2}(:\d{2}(\.\d+)?)?(Z|[+-]\d{2}:?\d{2})?)?')
+# Entity domains whose object_id is usually a person's name; it is pseudonymized
+PERSONAL_DOMAINS = {'person', 'device_tracker'}
+
+_current_turn = contextvars.ContextVar('recorded_turn', default=None)
+
+
+class Anonymizer:
+    """
+    Replaces free text with stable pseudonyms. The same input maps to the same
+    token within one recording (so a name written by one DB call still matches
+    the read in the next), but the salt is never stored, so tokens cannot be
+    reversed or correlated across recordings.
+    """
+
+    def __init__(self):
+        self._salt = os.urandom(16)
+
+    def token(self, text):
+        digest = hashlib.blake2b(text.encode('utf-8'), key=self._salt, digest_size=5).hexdigest()
+        return f"anon-{digest}"
+
+    def entity_id(self, value):
+        """Keeps entity ids except the name part of person/device_tracker ids"""
+        if isinstance(value, list):
+            return [self.entity_id(v) for v in value]
+        if isinstance(value, str):
+            domain, dot, object_id = value.partition('.')
+            if dot and domain in PERSONAL_DOMAINS:
+                return f"{domain}.{self.token(object_id).replace('-', '_')}"
+        return value
+
+    def value(self, value, key=None):
+        if key == 'entity_id':
+            return self.entity_id(value)
+        if key in KEEP_KEYS:
+            return value
+        if isinstance(value, dict):
+            return {k: self.value(v, k) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self.value(v, key) for v in value]
+        if isinstance(value, str):
+            if DATE_PATTERN.fullmatch(value) or not value.strip():
+                return value
+            return self.token(value)
+        return value
+
+    def response(self, response):
+        """Anonymizes an LLM response, keeping its JSON structure when it has one"""
+        try:
+            return json.dumps(self.value(json.loads(response)), ensure_ascii=False)
+        except (TypeError, ValueError):
+            # Invalid JSON is replayed as invalid JSON so retries are reproduced
+            return '#' * len(response or '')
+
+
+class RecordedTurn:
+    def __init__(self, recorder, user, location, message):
+        self.recorder = recorder
+        self.user = user
+        self.location = location
+        self.message = message
+        self.events = []
+        self.start = None
+
+    def __enter__(self):
+        self._token = _current_turn.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        _current_turn.reset(self._token)
+        self.recorder._write_turn(self, duration, exc_type)
+        return False
+
+
+class _NoopTurn:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_TURN = _NoopTurn()
+
+
+class TraceRecorder:
+    """
+    Opt-in capture of real turns for replay: the user message, every LLM
+    response, HA state fetch, HA service call and DB call batch, with timings.
+    Payloads are anonymized before they are written.
+    """
+
+    def __init__(self, config=RECORD_CONFIG):
+        self.enabled = config.get('enabled', False)
+        self.path = config.get('file')
+        self.anonymizer = Anonymizer()
+        self._lock = threading.Lock()
+        self._started = time.time()
+        self._turns = 0
+
+    def turn(self, user, location, message):
+        """Context manager around one user turn"""
+        if not self.enabled:
+            return NOOP_TURN
+        return RecordedTurn(self, user, location, message)
+
+    def capture(self, kind, duration, **payload):
+        """Records one external call; HA state fetches outside a turn are written on their own"""
+        if not self.enabled:
+            return
+        turn = _current_turn.get()
+        event = {'kind': kind, 'duration_ms': round(duration * 1000, 3), **self._anonymize(kind, payload)}
+        if turn is not None:
+            event['offset_ms'] = round((time.perf_counter() - duration - turn.start) * 1000, 3)
+            turn.events.append(event)
+        else:
+            self._write({'type': 'event', 'at_s': round(time.time() - self._started, 3), **event})
+
+    def _anonymize(self, kind, payload):
+        if kind == 'llm':
+            return {'response': self.anonymizer.response(payload.get('response'))}
+        return self.anonymizer.value(payload)
+
+    def _write_turn(self, turn, duration, exc_type):
+        with self._lock:
+            self._turns += 1
+            number = self._turns
+        self._write({
+            'type': 'turn',
+            'turn': number,
+            'at_s': round(time.time() - duration - self._started, 3),
+            'user': self.anonymizer.token(turn.user or ''),
+            'location': self.anonymizer.token(turn.location or ''),
+            'message': self.anonymizer.token(turn.message or ''),
+            'duration_ms': round(duration * 1000, 3),
+            'error': exc_type.__name__ if exc_type else None,
+            'events': sorted(turn.events, key=lambda e: e.get('offset_ms', 0))
+        })
+
+    def _write(self, record):
+        try:
+            line = json.dumps(record, ensure_ascii=False, default=str) + '\n'
+            with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+        except Exception as e:
+            app_logger.error(f"Error writing recording: {e}")
+
+
+def load_recording(path):
+    """Returns (turns, state_events) from a recording file, turns in arrival order"""
+    turns, events = [], []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            (turns if record.get('type') == 'turn' else events).append(record)
+    turns.sort(key=lambda t: t['at_s'])
+    return turns, events
+
+
+recorder = TraceRecorder()
@@ -0,0 +1,130 @@
+# modules/state_encoding.py
+import math
+import re
+from modules.logger import app_logger
+
+# Short keys of the attributes the verbose format shows, per domain (a weather or sensor
+# 'temperature' is not a target temperature); listed in the legend when used
+_THERMOSTAT_KEYS = {'current_temperature': 'cur', 'temperature': 'set'}
+ATTRIBUTE_KEYS = {
+    'light': {'brightness': 'b'},
+    'climate': _THERMOSTAT_KEYS,
+    'water_heater': _THERMOSTAT_KEYS,
+    'cover': {'current_position': 'pos'}
+}
+ATTRIBUTE_LEGEND = {
+    'b': 'brightness 0-255',
+    'cur': 'current temperature °C',
+    'set': 'target temperature °C',
+    'pos': 'position %'
+}
+
+_TOKEN_PIECE = re.compile(r"\w+|[^\w\s]")
+_encoding = None
+
+
+def count_tokens(text):
+    """
+    Tokens of a text for the configured model: exact with tiktoken when it is
+    installed and its encoding is available, otherwise an estimate (one token
+    per punctuation mark, one per 4 characters of each word)
+    """
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding('o200k_base')
+        except Exception as e:
+            app_logger.debug("tiktoken unavailable, estimating tokens: %s", e)
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text))
+    return sum(max(1, math.ceil(len(piece) / 4)) for piece in _TOKEN_PIECE.findall(text))
+
+
+def token_counter_name():
+    """'tiktoken' or 'estimate', whichever count_tokens() uses"""
+    count_tokens('')
+    return 'tiktoken' if _encoding else 'estimate'
+
+
+def _format_value(value):
+    if isinstance(value, (list, tuple)):
+        return '/'.join(str(v) for v in value)
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _entity_label(object_id, attributes):
+    """Object id, followed by the friendly name when it says more than the id"""
+    name = attributes.get('friendly_name')
+    if not name or name.casefold().replace(' ', '_') == object_id.casefold():
+        return object_id
+    return f'{object_id} "{name}"'
+
+
+def encode_compact(data):
+    """
+    Compact encoding of the home state: entities grouped by domain with the
+    domain prefix stripped, entities sharing a state listed together, short
+    attribute keys and services only for domains that have entities
+    """
+    if not data:
+        return "Error: Could not fetch home state"
+
+    entities_by_domain = {}
+    for entity in data["entities"]:
+        entities_by_domain.setdefault(entity["domain"], []).append(entity)
+    services = data.get("services") or {}
+
+    used_keys = set()
+    lines = []
+    for domain, entities in sorted(entities_by_domain.items()):
+        domain_services = services.get(domain)
+        lines.append(f"{domain} [{','.join(domain_services)}]:" if domain_services else f"{domain}:")
+        attribute_keys = ATTRIBUTE_KEYS.get(domain, {})
+
+        # Entities sharing a state are listed together, in first-seen order
+        groups = {}
+        for entity in entities:
+            attributes = entity.get('attributes') or {}
+            state = entity['state']
+            unit = attributes.get('unit_of_measurement')
+            if unit:
+                state = f"{state}{unit}" if unit in ('%', '°C', '°F') else f"{state} {unit}"
+            object_id = entity['entity_id'].split('.', 1)[1]
+            parts = [_entity_label(object_id, attributes)]
+            for key, value in attributes.items():
+                short = attribute_keys.get(key)
+                if short and value is not None:
+                    used_keys.add(short)
+                    parts.append(f"{short}={_format_value(value)}")
+            groups.setdefault(state, []).append(' '.join(parts))
+        for state, members in groups.items():
+            lines.append(f"  {state}: {'; '.join(members)}")
+
+    legend = "Entities are listed as <domain> [services]: then <state>: <id>; <id>... " \
+             "The entity_id is <domain>.<id>; quoted text is the device name."
+    if used_keys:
+        legend += " Attributes: " + ', '.join(
+            f"{key}={ATTRIBUTE_LEGEND[key]}" for key in ATTRIBUTE_LEGEND if key in used_keys
+        ) + "."
+    return f"Home State (compact). {legend}\n" + '\n'.join(lines) + '\n'
+
+
+def compare_encodings(data):
+    """Characters and tokens of a snapshot in both encodings"""
+    from modules.conversation_history import format_home_structure
+    verbose = format_home_structure(data)
+    compact = encode_compact(data)
+    report = {
+        'entities': len(data.get('entities', [])),
+        'counter': token_counter_name(),
+        'verbose_chars': len(verbose),
+        'compact_chars': len(compact),
+        'verbose_tokens': count_tokens(verbose),
+        'compact_tokens': count_tokens(compact)
+    }
+    report['reduction_pct'] = round(100 * (1 - report['compact_tokens'] / max(report['verbose_tokens'], 1)), 1)
+    return report
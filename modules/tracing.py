@@ -0,0 +1,254 @@
+# modules/tracing.py
+import contextvars
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config.config import TRACE_CONFIG
+from modules.logger import app_logger
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_current_turn = contextvars.ContextVar('current_turn', default=None)
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+class _NoopSpan:
+    """Returned when tracing is disabled; every operation is a no-op"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """One timed phase; numeric attributes are also exported as counters"""
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.turn = _current_turn.get()
+        self.parent = _current_span.get()
+        self.start = None
+        self.duration = None
+        self.error = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self._token = _current_span.set(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.error = exc_type.__name__
+        self.tracer._finish_span(self)
+        return False
+
+
+class Turn(Span):
+    """Root span of one user turn, collecting the spans that ran inside it"""
+
+    def __init__(self, tracer, attrs):
+        super().__init__(tracer, 'turn', attrs)
+        self.turn_id = uuid.uuid4().hex[:12]
+        self.spans = []
+        self.started_at = time.time()
+
+    def __enter__(self):
+        self._turn_token = _current_turn.set(self)
+        return super().__enter__()
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_turn.reset(self._turn_token)
+        return super().__exit__(exc_type, exc, tb)
+
+
+class Histogram:
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                self.buckets[index] += 1
+
+
+class Tracer:
+    """
+    Span instrumentation for turns and their phases (HA, prompt build, LLM, DB).
+
+    Durations feed per-phase latency histograms and numeric span attributes
+    (tokens, bytes, retries, ...) feed per-phase counters, both rendered in the
+    Prometheus text format. Finished turns are appended to a JSONL trace file.
+    When disabled, span() returns a shared no-op object.
+    """
+
+    def __init__(self, config=TRACE_CONFIG):
+        self.enabled = config.get('enabled', False)
+        self.trace_file = config.get('trace_file')
+        self.config = config
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._errors = {}
+        self._gauges = {}
+        self._metrics_server = None
+
+    def turn(self, **attrs):
+        """Context manager around one user turn"""
+        if not self.enabled:
+            return NOOP_SPAN
+        return Turn(self, attrs)
+
+    def span(self, name, **attrs):
+        """Context manager around one phase; nested in the current turn if any"""
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(self, name, attrs)
+
+    def annotate(self, **attrs):
+        """Adds attributes to the current turn"""
+        turn = _current_turn.get() if self.enabled else None
+        if turn is not None:
+            turn.set(**attrs)
+
+    def observe(self, phase, seconds):
+        """Adds a duration measured outside a span (e.g. time a command spent queued)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._histograms.setdefault(phase, Histogram()).observe(seconds)
+
+    def set_gauge(self, name, value):
+        """Sets a current value (e.g. queue depth), rendered as assistant_<name>"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges[name] = value
+
+    def _finish_span(self, span):
+        with self._lock:
+            self._histograms.setdefault(span.name, Histogram()).observe(span.duration)
+            for key, value in span.attrs.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    counter = (key, span.name)
+                    self._counters[counter] = self._counters.get(counter, 0) + value
+            if span.error:
+                self._errors[span.name] = self._errors.get(span.name, 0) + 1
+
+        if isinstance(span, Turn):
+            self._write_trace(span)
+        elif span.turn is not None:
+            span.turn.spans.append({
+                'name': span.name,
+                'parent': span.parent,
+                'offset_ms': round((span.start - span.turn.start) * 1000, 3),
+                'duration_ms': round(span.duration * 1000, 3),
+                'error': span.error,
+                **span.attrs
+            })
+
+    def _write_trace(self, turn):
+        if not self.trace_file:
+            return
+        record = {
+            'turn_id': turn.turn_id,
+            'timestamp': turn.started_at,
+            'duration_ms': round(turn.duration * 1000, 3),
+            'error': turn.error,
+            **turn.attrs,
+            'spans': sorted(turn.spans, key=lambda s: s['offset_ms'])
+        }
+        try:
+            line = json.dumps(record, ensure_ascii=False, default=str) + '\n'
+            with self._lock, open(self.trace_file, 'a', encoding='utf-8') as f:
+                f.write(line)
+        except Exception as e:
+            app_logger.error(f"Error writing trace: {e}")
+
+    def render_metrics(self):
+        """Returns all metrics in the Prometheus text exposition format"""
+        with self._lock:
+            histograms = {name: (list(h.buckets), h.count, h.sum) for name, h in self._histograms.items()}
+            counters = dict(self._counters)
+            errors = dict(self._errors)
+            gauges = dict(self._gauges)
+
+        lines = [
+            '# HELP assistant_phase_duration_seconds Duration of turns and their phases',
+            '# TYPE assistant_phase_duration_seconds histogram'
+        ]
+        for phase, (buckets, count, total) in sorted(histograms.items()):
+            for bound, value in zip(LATENCY_BUCKETS, buckets):
+                lines.append(f'assistant_phase_duration_seconds_bucket{{phase="{phase}",le="{bound}"}} {value}')
+            lines.append(f'assistant_phase_duration_seconds_bucket{{phase="{phase}",le="+Inf"}} {count}')
+            lines.append(f'assistant_phase_duration_seconds_sum{{phase="{phase}"}} {total}')
+            lines.append(f'assistant_phase_duration_seconds_count{{phase="{phase}"}} {count}')
+
+        lines += ['# TYPE assistant_phase_errors_total counter']
+        lines += [f'assistant_phase_errors_total{{phase="{phase}"}} {value}' for phase, value in sorted(errors.items())]
+
+        for key in sorted({key for key, _ in counters}):
+            lines.append(f'# TYPE assistant_{key}_total counter')
+            for (name, phase), value in sorted(counters.items()):
+                if name == key:
+                    lines.append(f'assistant_{key}_total{{phase="{phase}"}} {value}')
+        for name, value in sorted(gauges.items()):
+            lines += [f'# TYPE assistant_{name} gauge', f'assistant_{name} {value}']
+        return '\n'.join(lines) + '\n'
+
+    def start_metrics_server(self, host=None, port=None):
+        """Serves /metrics on a background thread"""
+        if not self.enabled or self._metrics_server:
+            return None
+        tracer = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') != '/metrics':
+                    self.send_error(404)
+                    return
+                body = tracer.render_metrics().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self._metrics_server = ThreadingHTTPServer(
+                (host or self.config.get('metrics_host', '127.0.0.1'), port or self.config.get('metrics_port', 9464)),
+                MetricsHandler
+            )
+        except OSError as e:
+            app_logger.error(f"Could not start metrics endpoint: {e}")
+            return None
+        threading.Thread(target=self._metrics_server.serve_forever, name='metrics', daemon=True).start()
+        app_logger.info(f"Metrics endpoint listening on {self._metrics_server.server_address}")
+        return self._metrics_server
+
+
+tracer = Tracer()
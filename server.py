@@ -0,0 +1,428 @@
+# server.py
+"""
+ASGI entry point serving many users at once.
+
+    uvicorn server:app --host 0.0.0.0 --port 8000
+
+Endpoints:
+    POST   /sessions           {"user", "location", "household"?}  -> {"session_id"}
+    DELETE /sessions/{id}?household=
+    POST   /chat               {"message", "session_id"?, "user"?, "location"?, "household"?}
+                                                                  -> {"session_id", "messages"}
+    POST   /ha/events          HA state_changed event(s)          -> {"accepted", "matched"}
+                               (when EVENT_INGEST_CONFIG['enabled'])
+    GET    /health
+    GET    /metrics            Prometheus text (when TRACE_CONFIG['enabled'])
+    WS     /ws?session_id=&user=&location=&household=
+           send {"message": "..."} or {"type": "cancel"};
+           receive {"type": "message", "text"} ... {"type": "done"}
+
+"household" selects one of HOUSEHOLD_CONFIG['homes'] (default: the home in
+HA_CONFIG/STORAGE_CONFIG); unknown households get 404 / close code 4404.
+"""
+import asyncio
+import datetime
+import json
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+from config.config import EVENT_INGEST_CONFIG, SERVER_CONFIG
+from main import MainClass
+from modules.conversation_history import (
+    close_session_store,
+    get_session_store,
+    get_system_prompt,
+    load_conversation_history,
+    refresh_system_prompt,
+    save_conversation_history
+)
+from modules.data.DatabaseFactory import uses_mongodb
+from modules.event_ingest import EventIngestor, subscribe_ha_events
+from modules.home_assistant import command_debouncer, command_queue, service_schemas, using_client
+from modules.household import HouseholdRegistry, session_key
+from modules.llm_scheduler import llm_context, llm_scheduler
+from modules.logger import app_logger
+from modules.openai_integration import get_client
+from modules.tracing import tracer
+
+
+class ChatSession:
+    """Per-session conversation state on top of its household's clients"""
+
+    def __init__(self, session_id, household, user=None, location=None):
+        self.session_id = session_id
+        self.household = household
+        self.key = household.session_key(session_id)
+        self.assistant = MainClass(
+            db=household.db,
+            async_db=household.async_db,
+            conversation_history=[{"role": "system", "content": ""}],
+            name=user,
+            location=location
+        )
+        self.lock = asyncio.Lock()
+        self.last_active = time.monotonic()
+        self.loaded = False
+
+    async def run_turn(self, message, prompt, on_message):
+        """Runs one turn; on_message is called for every assistant message"""
+        async with self.lock:
+            self.last_active = time.monotonic()
+            if not self.loaded:
+                # Restores the conversation of a session evicted here or served by another process
+                self.assistant.conversation_history = await asyncio.to_thread(
+                    load_conversation_history, session_id=self.key, system_prompt=prompt
+                )
+                self.loaded = True
+            self.assistant.speak = on_message
+            self.assistant.conversation_history = refresh_system_prompt(
+                self.assistant.conversation_history, prompt
+            )
+            date = datetime.datetime.now().strftime("%Y-%m-%d %H:%M %A")
+            try:
+                await self.assistant.run_turn_async(message, date)
+                self.assistant.trim_history()
+                save_conversation_history(self.assistant.conversation_history, session_id=self.key)
+            finally:
+                self.last_active = time.monotonic()
+
+
+class AssistantServer:
+    """Minimal ASGI application (HTTP + WebSocket) with isolated chat sessions"""
+
+    def __init__(self, config=SERVER_CONFIG):
+        self.config = config
+        self.db = None
+        self.households = HouseholdRegistry()
+        self.sessions = OrderedDict()
+        self.active_turns = 0
+        self._turn_slots = None
+        self._background = []
+        self.ingestor = None
+
+    # Lifecycle
+    async def startup(self):
+        self.db = self.households.get().db
+        if uses_mongodb():
+            # Sessions live in the default home's database, on its MongoDB client
+            get_session_store(client=self.db.client, db_name=self.db.db_name)
+        self._turn_slots = asyncio.Semaphore(self.config['max_concurrent_turns'])
+        # LLM and HA calls run via asyncio.to_thread; size the default pool to the turn slots
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=self.config['max_concurrent_turns'] + 4, thread_name_prefix="turn")
+        )
+        await asyncio.gather(
+            asyncio.to_thread(MainClass.setup_database),
+            self._refresh_prompt(self.households.get()),
+            self._warm_up_client()
+        )
+        self._background = [
+            asyncio.create_task(self._prompt_refresher()),
+            asyncio.create_task(self._session_reaper())
+        ]
+        if EVENT_INGEST_CONFIG['enabled']:
+            self.ingestor = EventIngestor(self.db).start()
+            if EVENT_INGEST_CONFIG['subscribe']:
+                self._background.append(asyncio.create_task(subscribe_ha_events(self.ingestor)))
+        app_logger.info("Server started")
+
+    async def shutdown(self):
+        for task in self._background:
+            task.cancel()
+        self.sessions.clear()
+        if self.ingestor:
+            await asyncio.to_thread(self.ingestor.close)
+        await asyncio.to_thread(command_debouncer.flush)
+        await asyncio.to_thread(command_queue.close)
+        # Flushes sessions while the default home's client is still open
+        await asyncio.to_thread(close_session_store)
+        await asyncio.to_thread(self.households.close)
+        app_logger.info("Server stopped")
+
+    async def _warm_up_client(self):
+        try:
+            await asyncio.to_thread(get_client)
+        except Exception as e:
+            app_logger.warning(f"LLM client warm-up failed: {e}")
+
+    async def _refresh_prompt(self, household):
+        # using_client rather than activate() so refreshes don't keep the home from going idle
+        with using_client(household.ha):
+            prompt = await asyncio.to_thread(get_system_prompt)
+        if prompt:
+            household.prompt = prompt
+
+    async def _prompt_refresher(self):
+        """One home-state prompt per household for all its sessions, rendered off the request path"""
+        while True:
+            await asyncio.sleep(self.config['prompt_refresh_interval'])
+            for household in self.households.households():
+                try:
+                    await self._refresh_prompt(household)
+                except Exception as e:
+                    app_logger.error(f"Error refreshing system prompt of household {household.id}: {e}")
+
+    async def _session_reaper(self):
+        while True:
+            await asyncio.sleep(60)
+            cutoff = time.monotonic() - self.config['session_idle_timeout']
+            for key, session in list(self.sessions.items()):
+                if session.last_active < cutoff and not session.lock.locked():
+                    del self.sessions[key]
+                    app_logger.info(f"Evicted idle session {key}")
+            await asyncio.to_thread(self.households.evict_idle)
+
+    # Sessions
+    async def get_household(self, household_id=None):
+        """
+        The household, loaded off the event loop on first use; None if unknown.
+        It is leased so eviction cannot close it mid-request: the caller
+        releases it with self.households.release() when done.
+        """
+        if not self.households.known(household_id):
+            return None
+        return await asyncio.to_thread(self.households.acquire, household_id)
+
+    def create_session(self, household, user=None, location=None, session_id=None):
+        if len(self.sessions) >= self.config['max_sessions']:
+            # Drop the least recently used idle session to make room
+            for key, session in self.sessions.items():
+                if not session.lock.locked():
+                    del self.sessions[key]
+                    break
+            else:
+                return None
+        session = ChatSession(session_id or uuid.uuid4().hex, household, user, location)
+        self.sessions[session.key] = session
+        app_logger.info(f"Created session {session.key} for user {user}")
+        return session
+
+    def get_session(self, household, session_id, user=None, location=None):
+        key = household.session_key(session_id) if session_id else None
+        session = self.sessions.get(key) if key else None
+        if session is None or session.household is not household:
+            # Unknown ids (or ids of an evicted household) are recreated so their stored conversation is picked up
+            return self.create_session(household, user, location, session_id)
+        self.sessions.move_to_end(key)
+        if user:
+            session.assistant.default_name = user
+        if location:
+            session.assistant.default_location = location
+        return session
+
+    async def run_turn(self, session, message, on_message):
+        household = session.household
+        async with self._turn_slots:
+            self.active_turns += 1
+            try:
+                # LLM calls of this turn queue fairly against other sessions' calls
+                with household.activate(), llm_context(priority='interactive', session=session.key):
+                    if household.prompt is None:
+                        await self._refresh_prompt(household)
+                    await session.run_turn(message, household.prompt, on_message)
+            finally:
+                self.active_turns -= 1
+
+    # ASGI
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        elif scope['type'] == 'websocket':
+            await self._websocket(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            event = await receive()
+            if event['type'] == 'lifespan.startup':
+                try:
+                    await self.startup()
+                    await send({'type': 'lifespan.startup.complete'})
+                except Exception as e:
+                    app_logger.error(f"Server startup failed: {e}")
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+            elif event['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _respond(self, send, status, body):
+        payload = json.dumps(body, ensure_ascii=False, default=str).encode('utf-8')
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(payload)).encode())]
+        })
+        await send({'type': 'http.response.body', 'body': payload})
+
+    async def _read_json(self, receive):
+        body = b''
+        while True:
+            event = await receive()
+            body += event.get('body', b'')
+            if not event.get('more_body'):
+                break
+        return json.loads(body) if body else {}
+
+    async def _http(self, scope, receive, send):
+        method, path = scope['method'], scope['path'].rstrip('/')
+        try:
+            if method == 'GET' and path == '/health':
+                return await self._respond(send, 200, {
+                    'sessions': len(self.sessions),
+                    'active_turns': self.active_turns,
+                    'households': {
+                        'active': self.households.active,
+                        **self.households.metrics,
+                        'queued_commands': {
+                            household.id: household.ha.command_queue.metrics['depth']
+                            for household in self.households.households()
+                        }
+                    },
+                    'events': self.ingestor.metrics if self.ingestor else None,
+                    'llm': llm_scheduler.metrics,
+                    'ha_schema': service_schemas.metrics,
+                    'command_queue': command_queue.metrics,
+                    'debounce': command_debouncer.metrics
+                })
+
+            if method == 'GET' and path == '/metrics':
+                body = tracer.render_metrics().encode('utf-8')
+                await send({
+                    'type': 'http.response.start',
+                    'status': 200,
+                    'headers': [(b'content-type', b'text/plain; version=0.0.4'), (b'content-length', str(len(body)).encode())]
+                })
+                return await send({'type': 'http.response.body', 'body': body})
+
+            if method == 'POST' and path == '/sessions':
+                data = await self._read_json(receive)
+                household = await self.get_household(data.get('household'))
+                if household is None:
+                    return await self._respond(send, 404, {'error': 'Unknown household'})
+                session = self.create_session(household, data.get('user'), data.get('location'))
+                self.households.release(household)
+                if session is None:
+                    return await self._respond(send, 503, {'error': 'Too many active sessions'})
+                return await self._respond(send, 201, {'session_id': session.session_id})
+
+            if method == 'DELETE' and path.startswith('/sessions/'):
+                household_id = parse_qs(scope.get('query_string', b'').decode()).get('household', [None])[0]
+                if not self.households.known(household_id):
+                    return await self._respond(send, 404, {'error': 'Unknown household'})
+                key = session_key(household_id, path.rsplit('/', 1)[-1])
+                removed = self.sessions.pop(key, None)
+                await asyncio.to_thread(get_session_store().delete, key)
+                return await self._respond(send, 200 if removed else 404, {'deleted': bool(removed)})
+
+            if method == 'POST' and path == '/ha/events' and self.ingestor:
+                token = EVENT_INGEST_CONFIG['webhook_token']
+                if token and dict(scope['headers']).get(b'x-ingest-token', b'').decode() != token:
+                    return await self._respond(send, 401, {'error': 'Invalid ingest token'})
+                data = await self._read_json(receive)
+                events = data if isinstance(data, list) else [data]
+                matched = sum(self.ingestor.ingest(event) for event in events)
+                return await self._respond(send, 202, {'accepted': len(events), 'matched': matched})
+
+            if method == 'POST' and path == '/chat':
+                data = await self._read_json(receive)
+                message = (data.get('message') or '').strip()
+                if not message:
+                    return await self._respond(send, 400, {'error': 'Missing message'})
+                household = await self.get_household(data.get('household'))
+                if household is None:
+                    return await self._respond(send, 404, {'error': 'Unknown household'})
+                try:
+                    session = self.get_session(household, data.get('session_id'), data.get('user'),
+                                               data.get('location'))
+                    if session is None:
+                        return await self._respond(send, 503, {'error': 'Too many active sessions'})
+                    messages = []
+                    await self.run_turn(session, message, messages.append)
+                finally:
+                    self.households.release(household)
+                return await self._respond(send, 200, {'session_id': session.session_id, 'messages': messages})
+
+            await self._respond(send, 404, {'error': 'Not found'})
+        except json.JSONDecodeError:
+            await self._respond(send, 400, {'error': 'Invalid JSON'})
+        except Exception as e:
+            app_logger.error(f"HTTP request error: {e}")
+            await self._respond(send, 500, {'error': 'Internal error'})
+
+    async def _websocket(self, scope, receive, send):
+        if scope['path'].rstrip('/') != '/ws':
+            await send({'type': 'websocket.close', 'code': 4404})
+            return
+        query = {k: v[0] for k, v in parse_qs(scope.get('query_string', b'').decode()).items()}
+
+        event = await receive()
+        if event['type'] != 'websocket.connect':
+            return
+        household = await self.get_household(query.get('household'))
+        if household is None:
+            await send({'type': 'websocket.close', 'code': 4404})
+            return
+        # The home stays leased while the socket is open
+        try:
+            await self._websocket_session(household, query, receive, send)
+        finally:
+            self.households.release(household)
+
+    async def _websocket_session(self, household, query, receive, send):
+        session = self.get_session(household, query.get('session_id'), query.get('user'), query.get('location'))
+        if session is None:
+            await send({'type': 'websocket.close', 'code': 1013})
+            return
+        await send({'type': 'websocket.accept'})
+
+        outgoing = asyncio.Queue()
+
+        async def sender():
+            while True:
+                await send({'type': 'websocket.send', 'text': json.dumps(await outgoing.get(), ensure_ascii=False)})
+
+        async def turn(message):
+            try:
+                await self.run_turn(session, message, lambda text: outgoing.put_nowait({'type': 'message', 'text': text}))
+                outgoing.put_nowait({'type': 'done'})
+            except asyncio.CancelledError:
+                outgoing.put_nowait({'type': 'cancelled'})
+            except Exception as e:
+                app_logger.error(f"WebSocket turn error: {e}")
+                outgoing.put_nowait({'type': 'error', 'text': 'An error occurred'})
+
+        sender_task = asyncio.create_task(sender())
+        turn_task = None
+        outgoing.put_nowait({'type': 'session', 'session_id': session.session_id})
+        try:
+            while True:
+                event = await receive()
+                if event['type'] == 'websocket.disconnect':
+                    break
+                text = event.get('text') or (event.get('bytes') or b'').decode('utf-8')
+                try:
+                    data = json.loads(text)
+                except json.JSONDecodeError:
+                    data = {'message': text}
+                if not isinstance(data, dict):
+                    # Valid JSON that is not an object (5, [], "hi") is a plain message too
+                    data = {'message': text}
+
+                if data.get('type') == 'cancel':
+                    if turn_task and not turn_task.done():
+                        turn_task.cancel()
+                    continue
+                message = (data.get('message') or '').strip()
+                if message:
+                    turn_task = asyncio.create_task(turn(message))
+        finally:
+            if turn_task and not turn_task.done():
+                turn_task.cancel()
+            sender_task.cancel()
+
+
+app = AssistantServer()